@@ -0,0 +1,296 @@
+"""
+輕量 HTTP 檢測（yt_recorder_http）的測試，以本機的 http.server 模擬頻道頁面。
+
+    python -m pytest test_yt_recorder_http.py
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from yt_recorder_http import HttpSession, LightProbe, parse_live_page
+from yt_recorder_scheduler import LIVE_STATUS_NOT_LIVE
+from yt_recorder_ytdlp import ExtractionError
+
+# yt-dlp 擷取沒有直播的頻道 /live 網址時實際輸出的 stderr（UserNotLive）
+NOT_LIVE_STDERR = (
+    "ERROR: [youtube:tab] @channel: The channel is not currently live."
+)
+
+
+def live_page(video_id=None, live_now=False, upcoming=False):
+    """組出類似頻道 /live 頁面的 HTML（只含解析用到的部分）。"""
+    if video_id:
+        canonical = f"https://www.youtube.com/watch?v={video_id}"
+    else:
+        canonical = "https://www.youtube.com/channel/UCxxxxxxxxxxxxxxxxxxxxxx"
+    flags = []
+    if live_now:
+        flags.append('"isLiveNow":true')
+    if upcoming:
+        flags.append('"isUpcoming":true')
+    return (
+        f'<html><head><link rel="canonical" href="{canonical}"></head>'
+        f"<body><script>var ytInitialPlayerResponse = {{{','.join(flags)}}};"
+        "</script></body></html>"
+    )
+
+
+class StubPage:
+    """
+    stub 伺服器回應的頁面；etag / last_modified 設定時支援條件式請求，
+    status 不是 200 時回應該錯誤。requests 記錄每個請求帶的條件式標頭。
+    """
+
+    def __init__(self) -> None:
+        self.status = 200
+        self.body = live_page()
+        self.etag = None
+        self.last_modified = None
+        self.requests = []
+
+
+class StubServer:
+    def __init__(self) -> None:
+        self.page = StubPage()
+        page = self.page
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                page.requests.append(
+                    (
+                        self.headers.get("If-None-Match"),
+                        self.headers.get("If-Modified-Since"),
+                    )
+                )
+                if page.status != 200:
+                    self.send_response(page.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if (
+                    page.etag
+                    and self.headers.get("If-None-Match") == page.etag
+                ) or (
+                    page.last_modified
+                    and self.headers.get("If-Modified-Since")
+                    == page.last_modified
+                ):
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = page.body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if page.etag:
+                    self.send_header("ETag", page.etag)
+                if page.last_modified:
+                    self.send_header("Last-Modified", page.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/@channel/live"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stub = StubServer()
+        self.addCleanup(self.stub.close)
+        self.probe = LightProbe(HttpSession(timeout=5), log=lambda m: None)
+        self.addCleanup(self.probe.close)
+
+
+class ParseLivePageTest(unittest.TestCase):
+    def test_live(self):
+        page = live_page("abcdefghijk", live_now=True)
+        self.assertEqual(parse_live_page(page), ("abcdefghijk", True, False))
+
+    def test_upcoming(self):
+        page = live_page("abcdefghijk", upcoming=True)
+        self.assertEqual(parse_live_page(page), ("abcdefghijk", False, True))
+
+    def test_offline(self):
+        self.assertEqual(parse_live_page(live_page()), (None, False, False))
+
+
+class ConditionalRequestTest(StubServerTestCase):
+    def test_etag_not_modified(self):
+        self.stub.page.etag = '"v1"'
+        first = self.probe.check(self.stub.url)
+        second = self.probe.check(self.stub.url)
+        self.assertTrue(first.changed)
+        self.assertFalse(second.changed)
+        self.assertTrue(second.not_modified)
+        self.assertEqual(self.stub.page.requests, [(None, None), ('"v1"', None)])
+        self.assertEqual(self.probe.stats()["not_modified"], 1)
+
+    def test_if_modified_since_not_modified(self):
+        stamp = "Sat, 17 Oct 2026 00:00:00 GMT"
+        self.stub.page.last_modified = stamp
+        self.probe.check(self.stub.url)
+        second = self.probe.check(self.stub.url)
+        self.assertTrue(second.not_modified)
+        self.assertEqual(self.stub.page.requests[-1], (None, stamp))
+
+    def test_new_etag_is_revalidated(self):
+        self.stub.page.etag = '"v1"'
+        self.probe.check(self.stub.url)
+        self.stub.page.etag = '"v2"'
+        self.stub.page.body = live_page("abcdefghijk", live_now=True)
+        result = self.probe.check(self.stub.url)
+        self.assertTrue(result.changed)
+        self.assertFalse(result.not_modified)
+        self.assertEqual(result.video_id, "abcdefghijk")
+        self.assertTrue(result.live_now)
+        self.assertEqual(self.stub.page.requests[-1], ('"v1"', None))
+
+    def test_keep_alive_connection_reused(self):
+        for _ in range(3):
+            self.probe.check(self.stub.url)
+        self.assertEqual(self.probe.session.connections_opened, 1)
+
+
+class FingerprintTest(StubServerTestCase):
+    """伺服器不提供 ETag / Last-Modified 時以頁面摘要判斷是否改變。"""
+
+    def test_same_body_is_unchanged(self):
+        self.stub.page.body = live_page("abcdefghijk", upcoming=True)
+        self.assertTrue(self.probe.check(self.stub.url).changed)
+        result = self.probe.check(self.stub.url)
+        self.assertFalse(result.changed)
+        self.assertFalse(result.not_modified)
+        self.assertEqual(result.video_id, "abcdefghijk")
+
+    def test_unrelated_markup_change_is_unchanged(self):
+        self.probe.check(self.stub.url)
+        self.stub.page.body = live_page() + "<!-- 0123456789 -->"
+        self.assertFalse(self.probe.check(self.stub.url).changed)
+
+    def test_new_video_id_is_changed(self):
+        self.stub.page.body = live_page("abcdefghijk", upcoming=True)
+        self.probe.check(self.stub.url)
+        self.stub.page.body = live_page("lmnopqrstuv", upcoming=True)
+        result = self.probe.check(self.stub.url)
+        self.assertTrue(result.changed)
+        self.assertEqual(result.video_id, "lmnopqrstuv")
+
+    def test_upcoming_to_live_is_changed(self):
+        self.stub.page.body = live_page("abcdefghijk", upcoming=True)
+        self.probe.check(self.stub.url)
+        self.stub.page.body = live_page("abcdefghijk", live_now=True)
+        result = self.probe.check(self.stub.url)
+        self.assertTrue(result.changed)
+        self.assertTrue(result.live_now)
+
+    def test_server_error_forces_full_probe(self):
+        self.probe.check(self.stub.url)
+        self.stub.page.status = 503
+        result = self.probe.check(self.stub.url)
+        self.assertTrue(result.changed)
+        self.assertEqual(result.error, "HTTP 503")
+
+
+class LightSkipTest(StubServerTestCase):
+    """
+    RecorderEngine 以 LightProbe 略過完整擷取，最多連續 LIGHT_MAX_SKIPS 次。
+
+    完整擷取只替換最底層的 _extract_info，讓它像實際的 yt-dlp 一樣對
+    離線頻道丟出 UserNotLive 錯誤，經過 _probe_channel_full 的錯誤處理。
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.dict(
+            os.environ,
+            {
+                "XDG_DATA_HOME": os.path.join(tmp.name, "data"),
+                "XDG_CACHE_HOME": os.path.join(tmp.name, "cache"),
+            },
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        from yt_recorder_core import RecorderEngine
+
+        self.engine = RecorderEngine(
+            download_dir=tmp.name, log=lambda m: None, light_probe=True
+        )
+        self.addCleanup(self.engine.close)
+        self.engine.light_probe.close()
+        self.engine.light_probe = self.probe
+        self.full_probes = 0
+        self.stderr = NOT_LIVE_STDERR
+
+        def extract_info(url, timeout, extra_args=None, **kwargs):
+            self.full_probes += 1
+            raise ExtractionError(self.stderr)
+
+        self.engine._extract_info = extract_info
+
+    def test_offline_channel_is_not_an_error(self):
+        result = self.engine.probe_channel(self.stub.url)
+        self.assertFalse(result.error)
+        self.assertEqual(result.live_status, LIVE_STATUS_NOT_LIVE)
+        self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 1)
+        self.assertEqual(self.engine.light_skipped, 1)
+
+    def test_probe_error_is_not_skipped(self):
+        self.stderr = "ERROR: [youtube:tab] @channel: HTTP Error 429"
+        for _ in range(2):
+            self.assertTrue(self.engine.probe_channel(self.stub.url).error)
+        self.assertEqual(self.full_probes, 2)
+        self.assertEqual(self.engine.light_skipped, 0)
+
+    def test_fallback_to_full_probe_after_max_skips(self):
+        limit = self.engine.LIGHT_MAX_SKIPS
+        for _ in range(limit + 1):
+            self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 1)
+        self.assertEqual(self.engine.light_skipped, limit)
+
+        self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 2)
+        self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 2)
+        self.assertEqual(self.engine.light_skipped, limit + 1)
+
+    def test_changed_page_forces_full_probe(self):
+        self.engine.probe_channel(self.stub.url)
+        self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 1)
+        self.stub.page.body = live_page("abcdefghijk", live_now=True)
+        self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 2)
+
+    def test_not_modified_skips_full_probe(self):
+        self.stub.page.etag = '"v1"'
+        for _ in range(3):
+            self.engine.probe_channel(self.stub.url)
+        self.assertEqual(self.full_probes, 1)
+        self.assertEqual(self.probe.stats()["not_modified"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
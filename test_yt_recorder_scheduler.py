@@ -0,0 +1,175 @@
+"""
+檢測結果與排程間隔（yt_recorder_scheduler、RecorderEngine 的檢測結果）的測試。
+
+    python -m pytest test_yt_recorder_scheduler.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from yt_recorder_scheduler import (
+    LIVE_STATUS_NOT_LIVE,
+    ChannelScheduler,
+    ProbeResult,
+)
+
+# yt-dlp 擷取沒有直播的頻道 /live 網址時實際輸出的 stderr（UserNotLive）
+NOT_LIVE_STDERR = (
+    "ERROR: [youtube:tab] @channel: The channel is not currently live."
+)
+CHANNEL_URL = "https://www.youtube.com/@channel/live"
+
+
+def make_engine(test: unittest.TestCase, **kwargs):
+    """在暫存目錄建立 RecorderEngine（索引與快取不寫到使用者目錄）。"""
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    patcher = mock.patch.dict(
+        os.environ,
+        {
+            "XDG_DATA_HOME": os.path.join(tmp.name, "data"),
+            "XDG_CACHE_HOME": os.path.join(tmp.name, "cache"),
+        },
+    )
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+    from yt_recorder_core import RecorderEngine
+
+    engine = RecorderEngine(
+        download_dir=tmp.name, log=lambda m: None, light_probe=False, **kwargs
+    )
+    test.addCleanup(engine.close)
+    return engine
+
+
+def make_scheduler(**kwargs) -> ChannelScheduler:
+    kwargs.setdefault("jitter", 0)
+    return ChannelScheduler(lambda url: None, lambda channel: None, **kwargs)
+
+
+class NotLiveProbeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = make_engine(self)
+
+    def test_not_live_error_is_idle_result(self):
+        result = self.engine._probe_error_result(CHANNEL_URL, NOT_LIVE_STDERR)
+        self.assertFalse(result.error)
+        self.assertFalse(result.live)
+        self.assertEqual(result.live_status, LIVE_STATUS_NOT_LIVE)
+
+    def test_other_errors_stay_errors(self):
+        result = self.engine._probe_error_result(
+            CHANNEL_URL, "ERROR: [youtube] abcdefghijk: HTTP Error 429"
+        )
+        self.assertTrue(result.error)
+
+    def test_not_live_backs_off(self):
+        scheduler = make_scheduler()
+        channel = scheduler.add_channel(CHANNEL_URL, 60)
+        delays = []
+        for _ in range(4):
+            result = self.engine._probe_error_result(
+                CHANNEL_URL, NOT_LIVE_STDERR
+            )
+            before = time.monotonic()
+            scheduler._complete(channel, result)
+            delays.append(channel.next_due - before)
+        self.assertEqual(channel.idle_streak, 4)
+        self.assertEqual(channel.error_count, 0)
+        # 每次乘上 idle_backoff，最長為 interval * max_idle_factor
+        self.assertAlmostEqual(delays[0], 60 * 1.5, delta=1)
+        self.assertAlmostEqual(delays[1], 60 * 1.5**2, delta=1)
+        self.assertAlmostEqual(delays[3], 60 * 4, delta=1)
+        self.assertEqual(
+            scheduler.next_delay(
+                channel,
+                self.engine._probe_error_result(CHANNEL_URL, NOT_LIVE_STDERR),
+                time.time(),
+            ),
+            60 * 4,
+        )
+
+
+class CadenceTest(unittest.TestCase):
+    def test_learned_interval_for_offline_channel(self):
+        scheduler = make_scheduler(cadence=lambda url, now: 42.0)
+        channel = scheduler.add_channel(CHANNEL_URL, 60)
+        result = ProbeResult(live_status=LIVE_STATUS_NOT_LIVE)
+        self.assertEqual(scheduler.next_delay(channel, result, time.time()), 42.0)
+
+
+class ErrorDelayTest(unittest.TestCase):
+    def test_error_uses_learned_interval(self):
+        scheduler = make_scheduler(cadence=lambda url, now: 42.0)
+        channel = scheduler.add_channel(CHANNEL_URL, 60)
+        error = ProbeResult(error=True)
+        self.assertEqual(scheduler.next_delay(channel, error, time.time()), 42.0)
+
+    def test_error_keeps_current_backoff(self):
+        scheduler = make_scheduler()
+        channel = scheduler.add_channel(CHANNEL_URL, 60)
+        for _ in range(2):
+            scheduler._complete(
+                channel, ProbeResult(live_status=LIVE_STATUS_NOT_LIVE)
+            )
+        before = time.monotonic()
+        scheduler._complete(channel, ProbeResult(error=True))
+        self.assertAlmostEqual(channel.next_due - before, 60 * 1.5**2, delta=1)
+
+    def test_error_keeps_upcoming_schedule(self):
+        scheduler = make_scheduler(jitter=0.5)
+        channel = scheduler.add_channel(CHANNEL_URL, 3600)
+        start = time.time() + 1000
+        scheduler._complete(
+            channel,
+            ProbeResult(live_status="is_upcoming", release_timestamp=start),
+        )
+        for _ in range(20):
+            before = time.monotonic()
+            scheduler._complete(channel, ProbeResult(error=True))
+            self.assertLessEqual(
+                channel.next_due - before,
+                start - time.time() - scheduler.upcoming_lead + 1,
+            )
+
+    def test_error_keeps_idle_streak(self):
+        scheduler = make_scheduler()
+        channel = scheduler.add_channel(CHANNEL_URL, 60)
+        scheduler._complete(channel, ProbeResult(live_status=LIVE_STATUS_NOT_LIVE))
+        scheduler._complete(channel, ProbeResult(error=True))
+        self.assertEqual(channel.idle_streak, 1)
+        self.assertEqual(channel.error_count, 1)
+
+
+class StopDuringRateLimitTest(unittest.TestCase):
+    """限流排隊中的檢測在停止監控時立即取消，不會拖住 stop / close。"""
+
+    def setUp(self) -> None:
+        self.engine = make_engine(self, account_rate_per_minute=1)
+        # 用完帳號 bucket 的 burst，之後每個 token 要等 60 秒
+        for _ in range(self.engine.ACCOUNT_RATE_BURST):
+            self.engine._acquire_ytdlp_slot(CHANNEL_URL, 0)
+        threading.Timer(0.2, self.engine.stop_event.set).start()
+
+    def test_probe_is_cancelled(self):
+        started = time.monotonic()
+        result = self.engine.probe_channel(CHANNEL_URL)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(result.error)
+        self.assertEqual(self.engine.rate_limiter.stats()["cancelled"], 1)
+
+    def test_batch_probe_is_cancelled(self):
+        urls = [f"https://www.youtube.com/@channel{i}/live" for i in range(3)]
+        started = time.monotonic()
+        results = self.engine.probe_channels(urls)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(all(results[url].error for url in urls))
+
+
+if __name__ == "__main__":
+    unittest.main()
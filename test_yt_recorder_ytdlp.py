@@ -0,0 +1,97 @@
+"""
+yt-dlp 輔助工具（yt_recorder_ytdlp）的測試。
+
+    python -m pytest test_yt_recorder_ytdlp.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from yt_recorder_ytdlp import WorkerError, YtdlpCacheDir, _Worker
+
+
+class ShouldPurgeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = YtdlpCacheDir(tmp.name, log=lambda m: None)
+
+    def test_warnings_do_not_purge(self):
+        stderr = "\n".join(
+            [
+                "WARNING: [youtube] abcdefghijk: nsig extraction failed: "
+                "Some formats may be missing",
+                "WARNING: [youtube] abcdefghijk: HTTP Error 403: Forbidden. "
+                "Retrying (1/3)...",
+                "ERROR: [youtube:tab] @channel: "
+                "The channel is not currently live.",
+            ]
+        )
+        self.assertFalse(self.cache.should_purge(stderr))
+
+    def test_error_lines_purge(self):
+        for line in (
+            "ERROR: unable to download video data: HTTP Error 403: Forbidden",
+            "ERROR: [youtube] abcdefghijk: Signature extraction failed: "
+            "Some formats may be missing",
+        ):
+            self.assertTrue(self.cache.should_purge(f"WARNING: x\n{line}\n"))
+
+    def test_worker_error_message(self):
+        # worker 回傳的 DownloadError 訊息同樣以 "ERROR:" 開頭
+        self.assertTrue(
+            self.cache.should_purge("ERROR: [youtube] x: HTTP Error 403: Forbidden")
+        )
+        self.assertFalse(self.cache.should_purge("HTTP Error 403: Forbidden"))
+
+
+@unittest.skipIf(os.name == "nt", "替身 worker 以 shebang 執行")
+class WorkerReceiveTest(unittest.TestCase):
+    """
+    _Worker.receive() 的逾時：以替身「python」取代 worker，
+    它忽略參數、直接把 body 寫到 stdout。
+    """
+
+    def start_worker(self, body: str) -> _Worker:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "python")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"#!{sys.executable}\nimport sys, time\n{body}\n")
+        os.chmod(path, 0o755)
+        worker = _Worker(path, 0)
+        self.addCleanup(worker.process.kill)
+        return worker
+
+    def test_partial_line_times_out(self):
+        worker = self.start_worker(
+            "sys.stdout.write('{\"ready\": tr'); sys.stdout.flush()\n"
+            "time.sleep(30)"
+        )
+        started = time.monotonic()
+        with self.assertRaisesRegex(WorkerError, "逾時"):
+            worker.receive(0.5)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_large_reply(self):
+        worker = self.start_worker(
+            "import json\n"
+            "print(json.dumps({'info': 'x' * 4000000}))\n"
+            "time.sleep(30)"
+        )
+        self.assertEqual(len(worker.receive(10)["info"]), 4000000)
+        with self.assertRaisesRegex(WorkerError, "逾時"):
+            worker.receive(0.2)
+
+    def test_exit_is_reported(self):
+        worker = self.start_worker("print('{}')")
+        self.assertEqual(worker.receive(10), {})
+        with self.assertRaisesRegex(WorkerError, "已結束"):
+            worker.receive(10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+延後補抓直播錄製中缺少的片段。
+
+yt-dlp 錄製直播時，重試後仍失敗的片段會被略過，輸出檔少一段卻不報錯。
+錄製中以 FormatFragments（yt_recorder_recording）依格式記錄取得的片段
+編號，結束後把缺口交給 Backfiller：單一背景執行緒在錄製結束一段時間後才處理，
+一次只處理一個檔案，失敗時延後重試（直播結束後 YouTube 需要時間產生
+存檔），不和進行中的錄製搶頻寬。
+
+實際的補抓（下載缺少的時間範圍並接回原檔）由呼叫端提供的 run(task)
+執行，回傳 yt_recorder_index 的補抓狀態。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from yt_recorder_index import BACKFILL_DONE, BACKFILL_FAILED, BACKFILL_PENDING
+
+
+@dataclass
+class BackfillTask:
+    path: str
+    video_id: str
+    # 補抓用的影片網址（watch?v=）
+    url: str
+    # 缺少的片段編號區間 (first, last)
+    runs: list[tuple[int, int]]
+    attempts: int = 0
+
+    @property
+    def gap_fragments(self) -> int:
+        return sum(last - first + 1 for first, last in self.runs)
+
+
+class Backfiller:
+    """
+    補抓工作的排程：依預定時間依序執行，一次一個。
+
+    run(task) 回傳 BACKFILL_DONE / BACKFILL_FAILED，或 BACKFILL_PENDING
+    表示稍後重試；重試 max_attempts 次仍未完成視為失敗。每個工作的最終
+    狀態（以及每次重試）以 on_state(task, state) 通知呼叫端。
+    """
+
+    def __init__(
+        self,
+        run: Callable[[BackfillTask], str],
+        on_state: Callable[[BackfillTask, str], None],
+        max_attempts: int = 6,
+        retry_delay: float = 1800.0,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.run = run
+        self.on_state = on_state
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = float(retry_delay)
+        self.log = log
+        # 設定後不再開始新的補抓，進行中的 yt-dlp / 後製也會停止等待
+        self.stop_event = threading.Event()
+
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, int, BackfillTask]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._running: Optional[BackfillTask] = None
+
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.fragments = 0
+
+    def schedule(self, task: BackfillTask, delay: float = 0.0) -> None:
+        """delay 秒後補抓這個檔案的缺口。"""
+        with self._cond:
+            if self.stop_event.is_set():
+                return
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._seq), task)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="backfill", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "pending": len(self._heap),
+                "running": self._running.path if self._running else None,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retries": self.retries,
+                "fragments": self.fragments,
+            }
+
+    def close(self) -> None:
+        """停止排程；尚未完成的工作仍記錄在索引中，下次啟動時繼續。"""
+        with self._cond:
+            self.stop_event.set()
+            self._heap.clear()
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+
+    def _next(self) -> Optional[BackfillTask]:
+        with self._cond:
+            while not self.stop_event.is_set():
+                if self._heap:
+                    due = self._heap[0][0] - time.monotonic()
+                    if due <= 0:
+                        self._running = heapq.heappop(self._heap)[2]
+                        return self._running
+                    self._cond.wait(due)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _loop(self) -> None:
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            try:
+                state = self.run(task)
+            except Exception as e:
+                self.log(f"補抓錯誤 ({task.path}): {e}")
+                state = BACKFILL_PENDING
+            with self._cond:
+                self._running = None
+            if self.stop_event.is_set():
+                return
+            if state == BACKFILL_PENDING:
+                task.attempts += 1
+                if task.attempts >= self.max_attempts:
+                    state = BACKFILL_FAILED
+            with self._cond:
+                if state == BACKFILL_DONE:
+                    self.completed += 1
+                    self.fragments += task.gap_fragments
+                elif state == BACKFILL_FAILED:
+                    self.failed += 1
+                else:
+                    self.retries += 1
+            try:
+                self.on_state(task, state)
+            except Exception as e:
+                self.log(f"補抓狀態更新錯誤 ({task.path}): {e}")
+            if state == BACKFILL_PENDING:
+                self.schedule(task, self.retry_delay)
@@ -0,0 +1,923 @@
+"""
+效能量測工具。
+
+用法：
+    python yt_recorder_bench.py pool --url https://www.youtube.com/@頻道/live
+    python yt_recorder_bench.py cadence --synthetic 5
+    python yt_recorder_bench.py light [--url https://www.youtube.com/@頻道/live]
+    python yt_recorder_bench.py websub --channels 20
+    python yt_recorder_bench.py ratelimit --channels 50
+    python yt_recorder_bench.py batch --url https://www.youtube.com/@頻道/live
+    python yt_recorder_bench.py remux --url https://www.youtube.com/watch?v=...
+    python yt_recorder_bench.py postprocess --file 錄好的影片.mp4
+"""
+
+import argparse
+import bisect
+import hashlib
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from yt_recorder_cadence import (
+    WEEK_SECONDS,
+    CadencePlanner,
+    ChannelHistory,
+)
+from yt_recorder_core import RecorderEngine
+from yt_recorder_http import HttpSession, LightProbe
+from yt_recorder_postprocess import (
+    JOB_PROBE,
+    JOB_THUMBNAIL,
+    PostJob,
+    PostProcessor,
+)
+from yt_recorder_ratelimit import RateLimiter, account_key, destination_key
+from yt_recorder_recording import format_bytes
+from yt_recorder_scheduler import ChannelScheduler, ChannelState, ProbeResult
+from yt_recorder_websub import (
+    CALLBACK_PATH,
+    WebSubReceiver,
+    channel_id_from_topic,
+    sign,
+)
+from yt_recorder_ytdlp import (
+    ExtractionError,
+    YtdlpWorkerPool,
+    base_ytdlp_args,
+    extract_batch_subprocess,
+    find_ffmpeg_executable,
+    find_ytdlp_executable,
+)
+
+
+def _measure(
+    label: str, count: int, concurrency: int, job: Callable[[], None]
+) -> float:
+    """以 concurrency 個執行緒執行 count 次 job，印出並回傳每秒次數。"""
+    errors = 0
+
+    def _run(_: int) -> bool:
+        try:
+            job()
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for ok in executor.map(_run, range(count)):
+            if not ok:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{label:<12} {count} 次 / {elapsed:.2f} 秒 = {rate:.2f} 次/秒"
+        f"（失敗 {errors} 次）"
+    )
+    return rate
+
+
+def bench_pool(opts: argparse.Namespace) -> None:
+    """比較子行程模式與常駐 worker 池模式的檢測吞吐量。"""
+    exe = find_ytdlp_executable()
+    args = base_ytdlp_args(opts.browser)
+
+    results: dict[str, float] = {}
+
+    if exe:
+
+        def _subprocess_probe() -> None:
+            result = subprocess.run(
+                [exe] + args + ["--dump-single-json", opts.url],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=opts.timeout,
+            )
+            if result.returncode != 0:
+                raise ExtractionError(result.stderr.strip())
+
+        results["subprocess"] = _measure(
+            "subprocess", opts.count, opts.workers, _subprocess_probe
+        )
+    else:
+        print("找不到 yt-dlp 可執行檔，略過子行程模式。")
+
+    pool = YtdlpWorkerPool(size=opts.workers)
+    try:
+        def _pool_probe() -> None:
+            pool.extract(args, opts.url, opts.timeout)
+
+        # 先各做一次暖機，量測的是穩定狀態的吞吐量
+        _measure("pool(warmup)", opts.workers, opts.workers, _pool_probe)
+        if pool.available:
+            results["pool"] = _measure(
+                "pool", opts.count, opts.workers, _pool_probe
+            )
+    finally:
+        pool.close()
+
+    if "subprocess" in results and "pool" in results and results["subprocess"]:
+        print(f"加速倍率: {results['pool'] / results['subprocess']:.1f}x")
+
+
+def _synthetic_starts(
+    channels: int, weeks: int, end: float, seed: int
+) -> dict[str, list[float]]:
+    """產生假的開播紀錄：每個頻道有 1–3 個固定時段（±20 分鐘），偶爾臨時開播。"""
+    rng = random.Random(seed)
+    begin = end - weeks * WEEK_SECONDS
+    data: dict[str, list[float]] = {}
+    for i in range(channels):
+        slots = [
+            rng.randrange(WEEK_SECONDS // 3600) * 3600
+            for _ in range(rng.randint(1, 3))
+        ]
+        starts = []
+        for week in range(weeks):
+            for slot in slots:
+                if rng.random() < 0.85:
+                    starts.append(
+                        begin + week * WEEK_SECONDS + slot
+                        + rng.uniform(-1200, 1200)
+                    )
+            if rng.random() < 0.3:
+                starts.append(
+                    begin + week * WEEK_SECONDS + rng.uniform(0, WEEK_SECONDS)
+                )
+        data[f"synthetic://channel-{i}"] = sorted(starts)
+    return data
+
+
+def _replay(
+    starts: dict[str, list[float]],
+    begin: float,
+    end: float,
+    delay: Callable[[str, float], Optional[float]],
+    fallback: float,
+) -> tuple[int, list[float]]:
+    """依 delay 模擬檢測，回傳 (檢測次數, 每次開播的偵測延遲)。"""
+    probes = 0
+    delays: list[float] = []
+    for url, channel_starts in starts.items():
+        times = []
+        t = begin
+        while t < end:
+            times.append(t)
+            t += delay(url, t) or fallback
+        probes += len(times)
+        for start in channel_starts:
+            if not begin <= start < end:
+                continue
+            i = bisect.bisect_left(times, start)
+            if i < len(times):
+                delays.append(times[i] - start)
+    return probes, delays
+
+
+def bench_cadence(opts: argparse.Namespace) -> None:
+    """
+    離線重播：以前 train_weeks 週的開播紀錄學習檢測頻率，在之後的期間
+    比較「固定間隔」與「學習頻率」在相同檢測預算下的偵測延遲。
+    """
+    if opts.synthetic:
+        now = time.time()
+        data = _synthetic_starts(
+            opts.synthetic, opts.train_weeks + opts.test_weeks, now, opts.seed
+        )
+    else:
+        history = ChannelHistory(opts.history)
+        data = {url: history.starts(url) for url in history.channels()}
+        history.close()
+        now = max((max(s) for s in data.values() if s), default=time.time())
+    if not data:
+        print("沒有開播紀錄可重播。")
+        return
+
+    test_begin = now - opts.test_weeks * WEEK_SECONDS
+    train = ChannelHistory(":memory:")
+    for url, channel_starts in data.items():
+        for i, start in enumerate(channel_starts):
+            if start < test_begin:
+                train.record_start(url, f"replay-{i}", start)
+
+    budget = opts.budget or len(data) * 3600.0 / opts.interval
+    fixed_interval = 3600.0 * len(data) / budget
+    planner = CadencePlanner(train, budget, min_samples=opts.min_samples)
+    planner.set_channels({url: fixed_interval for url in data})
+
+    print(
+        f"{len(data)} 個頻道，訓練 {opts.train_weeks} 週 / "
+        f"測試 {opts.test_weeks} 週，預算每小時 {budget:.0f} 次檢測"
+    )
+    for label, delay in (
+        ("fixed", lambda url, t: fixed_interval),
+        ("learned", planner.delay),
+    ):
+        probes, delays = _replay(data, test_begin, now, delay, fixed_interval)
+        hours = (now - test_begin) / 3600
+        if delays:
+            delays.sort()
+            p90 = delays[min(len(delays) - 1, int(len(delays) * 0.9))]
+            print(
+                f"{label:<8} 檢測 {probes} 次（{probes / hours:.1f} 次/小時），"
+                f"偵測 {len(delays)} 場：平均延遲 "
+                f"{statistics.mean(delays):.0f} 秒，中位數 "
+                f"{statistics.median(delays):.0f} 秒，p90 {p90:.0f} 秒"
+            )
+        else:
+            print(f"{label:<8} 檢測 {probes} 次，測試期間沒有開播")
+    train.close()
+
+
+class _StubChannel:
+    """本機假頻道：/live 頁面在 live_after 次請求後變成直播中。"""
+
+    def __init__(self, live_after: int, page_kib: int) -> None:
+        self.live_after = live_after
+        # 模擬真實頁面的大小
+        self.padding = "x" * (page_kib * 1024)
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+
+    def page(self) -> bytes:
+        with self.lock:
+            self.requests += 1
+            live = self.requests > self.live_after
+        if live:
+            canonical = "https://www.youtube.com/watch?v=abcdefghijk"
+            state = '"isLiveNow":true'
+        else:
+            canonical = "https://www.youtube.com/@stub"
+            state = '"isLiveNow":false'
+        return (
+            f'<html><head><link rel="canonical" href="{canonical}"></head>'
+            f"<body><script>{state}</script>{self.padding}</body></html>"
+        ).encode()
+
+
+def _stub_server(channel: _StubChannel) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            with channel.lock:
+                channel.connections += 1
+
+        def do_GET(self) -> None:
+            body = channel.page()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                with channel.lock:
+                    channel.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_light(opts: argparse.Namespace) -> None:
+    """
+    以本機假頻道比較：每次新連線、不帶 ETag 的請求 vs LightProbe
+    （keep-alive + 條件式請求），並確認直播狀態改變時會被偵測到。
+    指定 --url 時另外比較實際頻道上 LightProbe 與完整 yt-dlp 擷取。
+    """
+    stub = _StubChannel(live_after=opts.count * 2, page_kib=opts.page_kib)
+    server = _stub_server(stub)
+    url = f"http://127.0.0.1:{server.server_address[1]}/@stub/live"
+    try:
+        def _plain() -> None:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                response.read()
+
+        before = stub.connections
+        _measure("urllib", opts.count, 1, _plain)
+        print(f"{'':<12} 新建連線 {stub.connections - before} 次")
+
+        probe = LightProbe(log=print)
+        before = stub.connections
+        _measure("light", opts.count, 1, lambda: probe.check(url))
+        print(
+            f"{'':<12} 新建連線 {stub.connections - before} 次，"
+            f"304 回應 {stub.not_modified} 次"
+        )
+
+        # 讓假頻道開始直播，確認 LightProbe 回報改變
+        stub.live_after = 0
+        result = probe.check(url)
+        ok = result.changed and result.live_now and result.video_id
+        print(f"直播狀態改變偵測: {'OK' if ok else '失敗'} ({result})")
+        probe.close()
+    finally:
+        server.shutdown()
+
+    if not opts.url:
+        return
+    probe = LightProbe(log=print)
+    _measure("light(real)", opts.real_count, 1, lambda: probe.check(opts.url))
+    print(f"{'':<12} {probe.stats()}")
+    probe.close()
+
+    pool = YtdlpWorkerPool(size=1)
+    args = base_ytdlp_args(opts.browser) + ["--ignore-no-formats-error"]
+    try:
+        _measure(
+            "yt-dlp",
+            opts.real_count,
+            1,
+            lambda: pool.extract(args, opts.url, opts.timeout),
+        )
+    finally:
+        pool.close()
+
+
+class _StubHub:
+    """
+    本機替身 hub：接受訂閱請求（202）、以 GET 向回呼網址確認 challenge，
+    publish() 時把 Atom 通知簽章後 POST 給該 topic 的訂閱者。
+    """
+
+    def __init__(self, lease_seconds: int = 3600) -> None:
+        self.lease_seconds = lease_seconds
+        # channel ID → (回呼網址, secret)
+        self.subscribers: dict[str, tuple[str, Optional[str]]] = {}
+        self.lock = threading.Lock()
+        self.session = HttpSession()
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                self.send_response(202)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                threading.Thread(
+                    target=hub._verify,
+                    args=({k: v[0] for k, v in form.items()},),
+                    daemon=True,
+                ).start()
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/subscribe"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _verify(self, form: dict[str, str]) -> None:
+        challenge = hashlib.sha1(str(random.random()).encode()).hexdigest()
+        query = urllib.parse.urlencode(
+            {
+                "hub.mode": form["hub.mode"],
+                "hub.topic": form["hub.topic"],
+                "hub.challenge": challenge,
+                "hub.lease_seconds": self.lease_seconds,
+            }
+        )
+        callback = form["hub.callback"]
+        status, _, body = self.session.request(f"{callback}?{query}")
+        channel_id = channel_id_from_topic(form["hub.topic"])
+        if status == 200 and body.decode() == challenge and channel_id:
+            with self.lock:
+                self.subscribers[channel_id] = (
+                    callback,
+                    form.get("hub.secret"),
+                )
+
+    def publish(self, channel_id: str, video_id: str) -> None:
+        with self.lock:
+            subscriber = self.subscribers.get(channel_id)
+        if subscriber is None:
+            return
+        callback, secret = subscriber
+        body = _atom_entry(channel_id, video_id)
+        headers = {"Content-Type": "application/atom+xml"}
+        if secret:
+            headers["X-Hub-Signature"] = sign(secret, body)
+        self.session.request(callback, headers, method="POST", body=body)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.session.close()
+
+
+def _atom_entry(channel_id: str, video_id: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"'
+        ' xmlns="http://www.w3.org/2005/Atom">'
+        f"<entry><id>yt:video:{video_id}</id>"
+        f"<yt:videoId>{video_id}</yt:videoId>"
+        f"<yt:channelId>{channel_id}</yt:channelId>"
+        "<title>stub</title></entry></feed>"
+    ).encode()
+
+
+def _run_detection(
+    opts: argparse.Namespace,
+    live_at: dict[str, float],
+    interval: float,
+    on_started: Optional[Callable[[ChannelScheduler], None]] = None,
+    on_live_start: Optional[Callable[[str], None]] = None,
+) -> tuple[list[float], int]:
+    """
+    以假檢測（固定耗時）跑 ChannelScheduler，回傳每個頻道從開播到
+    on_live 的延遲與總檢測次數。on_live_start(url) 在頻道開播的瞬間呼叫。
+    """
+    start = time.monotonic()
+    detected: dict[str, float] = {}
+    done = threading.Event()
+
+    def _probe(url: str) -> ProbeResult:
+        time.sleep(opts.probe_ms / 1000)
+        live = time.monotonic() - start >= live_at[url]
+        return ProbeResult(live=live, info={"id": url} if live else None)
+
+    def _on_live(channel: ChannelState) -> None:
+        detected[channel.url] = time.monotonic() - start - live_at[channel.url]
+        if len(detected) == len(live_at):
+            done.set()
+
+    scheduler = ChannelScheduler(
+        probe=_probe,
+        on_live=_on_live,
+        max_concurrency=8,
+        log=lambda message: None,
+        adaptive=False,
+    )
+    for url in live_at:
+        scheduler.add_channel(url, interval, delay=random.uniform(0, interval))
+    runner = threading.Thread(target=scheduler.run, daemon=True)
+    runner.start()
+    if on_started:
+        on_started(scheduler)
+
+    for url, offset in sorted(live_at.items(), key=lambda item: item[1]):
+        wait = start + offset - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        if on_live_start:
+            on_live_start(url)
+    done.wait(max(live_at.values()) + interval * 2 + 5)
+    scheduler.stop()
+    runner.join()
+    probes = sum(c.probe_count for c in scheduler.channels())
+    return list(detected.values()), probes
+
+
+def bench_websub(opts: argparse.Namespace) -> None:
+    """
+    以本機替身 hub 量測 WebSub：訂閱確認、通知送達延遲、簽章檢查，
+    以及「開播 → 交給錄製（on_live）」的延遲與檢測次數：
+    一般輪詢 vs WebSub + 放慢 WEBSUB_POLL_FACTOR 倍的備援輪詢。
+    假設開播時 hub 立即送出通知；實際上 YouTube 不保證直播開始時會推送。
+    """
+    rng = random.Random(opts.seed)
+    ids = [f"UCstub{i:04d}" for i in range(opts.channels)]
+    urls = {cid: f"https://www.youtube.com/channel/{cid}/live" for cid in ids}
+    live_at = {
+        urls[cid]: rng.uniform(opts.interval, opts.duration) for cid in ids
+    }
+
+    delays, probes = _run_detection(opts, live_at, opts.interval)
+    print(
+        f"{'輪詢':<8} 間隔 {opts.interval:.0f} 秒：開播到偵測平均 "
+        f"{statistics.mean(delays):.2f} 秒，最長 {max(delays):.2f} 秒，"
+        f"檢測 {probes} 次"
+    )
+
+    hub = _StubHub()
+    secret = "bench-secret"
+    delivered: list[float] = []
+    published: dict[str, float] = {}
+    holder: dict[str, ChannelScheduler] = {}
+
+    def _on_notify(channel_id: str, video_id: str, received_at: float) -> None:
+        delivered.append(received_at - published[channel_id])
+        scheduler = holder.get("scheduler")
+        if scheduler:
+            scheduler.probe_now(urls[channel_id])
+
+    receiver = WebSubReceiver(
+        "",
+        on_notify=_on_notify,
+        listen_host="127.0.0.1",
+        listen_port=0,
+        hub_url=hub.url,
+        secret=secret,
+        log=lambda message: None,
+    )
+    receiver.callback_url = (
+        f"http://127.0.0.1:{receiver.listen_port}{CALLBACK_PATH}"
+    )
+    try:
+        started = time.perf_counter()
+        for cid in ids:
+            receiver.subscribe(cid)
+        while receiver.stats()["active"] < len(ids):
+            if time.perf_counter() - started > 10:
+                break
+            time.sleep(0.01)
+        stats = receiver.stats()
+        print(
+            f"訂閱確認 {stats['active']}/{len(ids)} 個頻道，"
+            f"{time.perf_counter() - started:.2f} 秒"
+        )
+
+        # 簽章錯誤的通知不應觸發檢測
+        HttpSession().request(
+            receiver.callback_url,
+            {"X-Hub-Signature": "sha1=0"},
+            method="POST",
+            body=_atom_entry(ids[0], "forged00000"),
+        )
+        print(
+            f"偽造通知被拒絕: "
+            f"{'OK' if receiver.stats()['bad_signatures'] == 1 else '失敗'}"
+        )
+        # 超過大小上限的通知不讀取內容，直接回應 413
+        status, _, _ = HttpSession().request(
+            receiver.callback_url,
+            method="POST",
+            body=b"x" * (receiver.MAX_BODY + 1),
+        )
+        print(f"過大的通知被拒絕: {'OK' if status == 413 else '失敗'}")
+
+        by_url = {url: cid for cid, url in urls.items()}
+
+        def _go_live(url: str) -> None:
+            cid = by_url[url]
+            published[cid] = time.time()
+            hub.publish(cid, f"live{cid[-5:]}")
+
+        slow = opts.interval * opts.poll_factor
+        delays, probes = _run_detection(
+            opts,
+            live_at,
+            slow,
+            on_started=lambda scheduler: holder.update(scheduler=scheduler),
+            on_live_start=_go_live,
+        )
+        print(
+            f"{'WebSub':<8} 備援輪詢 {slow:.0f} 秒：開播到偵測平均 "
+            f"{statistics.mean(delays):.2f} 秒，最長 {max(delays):.2f} 秒，"
+            f"檢測 {probes} 次"
+        )
+        if delivered:
+            print(
+                f"{'':<8} 通知送達平均 {1000 * statistics.mean(delivered):.1f} ms，"
+                f"最長 {1000 * max(delivered):.1f} ms"
+            )
+    finally:
+        receiver.close()
+        hub.close()
+
+
+def _peak(times: list[float], window: float) -> int:
+    """任意 window 秒內最多的請求數。"""
+    times = sorted(times)
+    return max(
+        (bisect.bisect_left(times, t + window) - i for i, t in enumerate(times)),
+        default=0,
+    )
+
+
+def bench_ratelimit(opts: argparse.Namespace) -> None:
+    """
+    多個相同間隔的頻道同時開始監控：比較不限流（jitter=0）與
+    RateLimiter + 排程 jitter 時的請求尖峰、總數與排隊等待。
+    """
+    keys = [
+        destination_key("https://www.youtube.com/"),
+        account_key(opts.browser),
+    ]
+    for label, limited in (("不限流", False), ("限流", True)):
+        limiter = (
+            RateLimiter(
+                {
+                    "host": (opts.rate, opts.burst),
+                    "account": (opts.rate, opts.burst),
+                }
+            )
+            if limited
+            else None
+        )
+        sent: list[float] = []
+        lock = threading.Lock()
+        start = time.monotonic()
+
+        def _probe(url: str) -> ProbeResult:
+            if limiter is not None:
+                limiter.acquire(keys)
+            with lock:
+                sent.append(time.monotonic() - start)
+            time.sleep(opts.probe_ms / 1000)
+            return ProbeResult()
+
+        scheduler = ChannelScheduler(
+            probe=_probe,
+            on_live=lambda channel: None,
+            max_concurrency=opts.channels,
+            log=lambda message: None,
+            adaptive=False,
+            jitter=0.1 if limited else 0.0,
+        )
+        for i in range(opts.channels):
+            scheduler.add_channel(
+                f"https://www.youtube.com/@c{i}/live", opts.interval
+            )
+        runner = threading.Thread(target=scheduler.run, daemon=True)
+        runner.start()
+        time.sleep(opts.duration)
+        with lock:
+            times = list(sent)
+        if limiter is not None:
+            depth = limiter.queue_depth()
+            # close() 會放行所有排隊中的請求，不計入結果
+            limiter.close()
+        scheduler.stop()
+        runner.join()
+
+        line = (
+            f"{label:<6} 請求 {len(times)} 次，1 秒內最多 {_peak(times, 1)} 次，"
+            f"10 秒內最多 {_peak(times, 10)} 次"
+        )
+        if limiter is not None:
+            stats = limiter.stats()
+            line += (
+                f"；延後 {stats['delayed']} 次，平均等待 {stats['avg_wait']} 秒，"
+                f"最長 {stats['max_wait']} 秒，結束時排隊 {depth}"
+            )
+        print(line)
+
+
+def bench_batch(opts: argparse.Namespace) -> None:
+    """
+    以不同批次大小擷取同一組網址：子行程模式（每批一個 yt-dlp）與
+    worker 池模式（每批一次往返），比較總時間與每個網址的平均成本。
+    """
+    exe = opts.exe or find_ytdlp_executable()
+    # 網址不足 count 個時重複使用，加上查詢參數讓每個網址都不同
+    # （批次結果以網址對應，重複的網址會被合併）
+    urls = []
+    for i in range(opts.count):
+        url = opts.url[i % len(opts.url)]
+        if i >= len(opts.url):
+            url += ("&" if "?" in url else "?") + f"bench={i}"
+        urls.append(url)
+    args = base_ytdlp_args(opts.browser) + ["--ignore-no-formats-error"]
+    sizes = [int(size) for size in opts.sizes.split(",")]
+
+    def _report(label: str, size: int, run: Callable[[list[str]], dict]) -> None:
+        ok = errors = 0
+        start = time.perf_counter()
+        for i in range(0, len(urls), size):
+            for outcome in run(urls[i : i + size]).values():
+                if isinstance(outcome, Exception):
+                    errors += 1
+                else:
+                    ok += 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<8} 批次 {size:>3}：{elapsed:.2f} 秒，"
+            f"每個網址 {1000 * elapsed / len(urls):.0f} ms"
+            f"（成功 {ok}，失敗 {errors}）"
+        )
+
+    if exe:
+        for size in sizes:
+            _report(
+                "子行程",
+                size,
+                lambda chunk: extract_batch_subprocess(
+                    exe, args, chunk, opts.timeout * len(chunk)
+                ),
+            )
+    else:
+        print("找不到 yt-dlp 執行檔，略過子行程模式")
+
+    pool = YtdlpWorkerPool(size=1)
+    try:
+        if pool.available:
+            for size in sizes:
+                _report(
+                    "worker",
+                    size,
+                    lambda chunk: pool.extract_batch(
+                        args, chunk, opts.timeout * len(chunk)
+                    ),
+                )
+    except Exception as e:
+        print(f"worker 池無法使用: {e}")
+    finally:
+        pool.close()
+
+
+def bench_remux(opts: argparse.Namespace) -> None:
+    """
+    以兩種模式錄製同一個會結束的直播（或短影片）：下載後合併 vs
+    即時轉封裝，比較總時間、收尾時間與磁碟用量峰值。
+    """
+    for label, stream in (("下載後合併", False), ("即時轉封裝", True)):
+        with tempfile.TemporaryDirectory(dir=opts.dir) as tmp:
+            engine = RecorderEngine(
+                download_dir=tmp,
+                cookies_from_browser=opts.browser,
+                log=print if opts.verbose else (lambda message: None),
+                light_probe=False,
+                stream_remux=stream,
+                stream_container=opts.container,
+            )
+            # 合併時的暫存檔存在時間很短，取樣要密一點
+            engine.DISK_SAMPLE_INTERVAL = opts.sample_interval
+            try:
+                start = time.perf_counter()
+                ok = engine.record_live_stream(opts.url)
+                elapsed = time.perf_counter() - start
+                stats = engine.output_stats()
+            finally:
+                engine.close()
+        if not ok or not stats["recordings"]:
+            print(f"{label}：錄製失敗（加上 --verbose 查看日誌）")
+            continue
+        print(
+            f"{label}：總時間 {elapsed:.1f} 秒，收尾 {stats['max_finalize']} 秒，"
+            f"磁碟用量峰值 {format_bytes(stats['max_peak_disk'])}"
+            f"（最終檔案的 {stats['avg_peak_ratio']} 倍）"
+        )
+
+
+def bench_postprocess(opts: argparse.Namespace) -> None:
+    """
+    把同一個檔案複製 count 份，以不同 worker 數做完整性檢查與縮圖，
+    比較總時間、每個工作的耗時與最大佇列深度。
+    """
+    ffmpeg = find_ffmpeg_executable()
+    ffprobe = find_ffmpeg_executable("ffprobe")
+    if not ffmpeg or not ffprobe:
+        print("找不到 ffmpeg / ffprobe")
+        return
+    ext = os.path.splitext(opts.file)[1]
+    with tempfile.TemporaryDirectory(dir=opts.dir) as tmp:
+        paths = []
+        for i in range(opts.count):
+            path = os.path.join(tmp, f"bench-{i}{ext}")
+            shutil.copyfile(opts.file, path)
+            paths.append(path)
+
+        for workers in (int(n) for n in opts.workers.split(",")):
+            processor = PostProcessor(workers)
+            done = threading.Semaphore(0)
+            max_depth = 0
+
+            def _after_probe(job: PostJob) -> None:
+                duration = job.result.get("duration") or 0
+                processor.submit(
+                    JOB_THUMBNAIL,
+                    ffmpeg,
+                    job.path,
+                    duration / 2,
+                    on_done=lambda _: done.release(),
+                )
+
+            start = time.perf_counter()
+            for path in paths:
+                processor.submit(JOB_PROBE, ffprobe, path, on_done=_after_probe)
+                max_depth = max(max_depth, processor.queue_depth())
+            for _ in paths:
+                done.acquire()
+            elapsed = time.perf_counter() - start
+            stats = processor.stats()
+            processor.close()
+            jobs = "，".join(
+                f"{kind} 平均 {job['avg']} 秒 / 等候 {job['avg_wait']} 秒"
+                for kind, job in sorted(stats["jobs"].items())
+            )
+            print(
+                f"worker {workers}：{elapsed:.2f} 秒（{len(paths)} 個檔案，"
+                f"失敗 {stats['failed']}，最大佇列 {max_depth}）；{jobs}"
+            )
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="YouTube 直播錄製效能量測")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pool", help="子行程 vs 常駐 worker 池 的檢測吞吐量")
+    p.add_argument("--url", required=True)
+    p.add_argument("--count", type=int, default=10)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--browser", default="chrome")
+    p.add_argument("--timeout", type=float, default=60)
+    p.set_defaults(func=bench_pool)
+
+    p = sub.add_parser("cadence", help="重播開播歷史，比較固定間隔與學習頻率")
+    p.add_argument("--history", help="history.sqlite3 路徑（預設為資料目錄）")
+    p.add_argument(
+        "--synthetic", type=int, default=0, help="改用 N 個頻道的假資料"
+    )
+    p.add_argument("--train-weeks", type=int, default=4)
+    p.add_argument("--test-weeks", type=int, default=2)
+    p.add_argument(
+        "--interval", type=float, default=300, help="固定間隔（決定預設預算）"
+    )
+    p.add_argument("--budget", type=float, help="每小時總檢測次數")
+    p.add_argument("--min-samples", type=int, default=3)
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_cadence)
+
+    p = sub.add_parser("light", help="HTTP 輕量檢測 vs 一般請求 / 完整擷取")
+    p.add_argument("--count", type=int, default=200)
+    p.add_argument("--page-kib", type=int, default=500)
+    p.add_argument("--url", help="另外對實際頻道比較 LightProbe 與 yt-dlp")
+    p.add_argument("--real-count", type=int, default=5)
+    p.add_argument("--browser", default="chrome")
+    p.add_argument("--timeout", type=float, default=60)
+    p.set_defaults(func=bench_light)
+
+    p = sub.add_parser("websub", help="本機替身 hub：WebSub 推播 vs 輪詢")
+    p.add_argument("--channels", type=int, default=20)
+    p.add_argument("--interval", type=float, default=5, help="輪詢間隔（秒）")
+    p.add_argument("--duration", type=float, default=15, help="開播時間分布（秒）")
+    p.add_argument("--poll-factor", type=float, default=4)
+    p.add_argument("--probe-ms", type=float, default=200, help="假檢測耗時")
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_websub)
+
+    p = sub.add_parser("ratelimit", help="多頻道同時檢測的請求尖峰 vs 限流")
+    p.add_argument("--channels", type=int, default=50)
+    p.add_argument("--interval", type=float, default=10, help="檢測間隔（秒）")
+    p.add_argument("--duration", type=float, default=30)
+    p.add_argument("--rate", type=float, default=240, help="每分鐘次數")
+    p.add_argument("--burst", type=float, default=5)
+    p.add_argument("--probe-ms", type=float, default=100, help="假檢測耗時")
+    p.add_argument("--browser", default="chrome")
+    p.set_defaults(func=bench_ratelimit)
+
+    p = sub.add_parser("batch", help="不同批次大小的多網址擷取")
+    p.add_argument(
+        "--url", action="append", required=True, help="可重複指定多個網址"
+    )
+    p.add_argument("--count", type=int, default=20, help="總擷取次數")
+    p.add_argument("--sizes", default="1,2,5,10")
+    p.add_argument("--exe", help="yt-dlp 執行檔（預設自動尋找）")
+    p.add_argument("--browser", default="chrome")
+    p.add_argument("--timeout", type=float, default=60)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("remux", help="下載後合併 vs 即時轉封裝的收尾時間與磁碟用量")
+    p.add_argument("--url", required=True, help="會結束的直播或短影片")
+    p.add_argument("--container", default="mp4", choices=["mp4", "mkv"])
+    p.add_argument("--dir", help="暫存輸出資料夾的位置（預設為系統暫存）")
+    p.add_argument("--sample-interval", type=float, default=0.5)
+    p.add_argument("--browser", default="chrome")
+    p.add_argument("--verbose", action="store_true")
+    p.set_defaults(func=bench_remux)
+
+    p = sub.add_parser("postprocess", help="不同 worker 數的後製吞吐量")
+    p.add_argument("--file", required=True, help="用來測試的影片檔")
+    p.add_argument("--count", type=int, default=8)
+    p.add_argument("--workers", default="1,2,4")
+    p.add_argument("--dir", help="暫存複本的位置（預設為系統暫存）")
+    p.set_defaults(func=bench_postprocess)
+
+    opts = parser.parse_args(argv)
+    opts.func(opts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
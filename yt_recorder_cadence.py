@@ -0,0 +1,275 @@
+"""
+依頻道歷史開播時間學習檢測頻率。
+
+ChannelHistory 以 SQLite 保存每個頻道觀察到的開播時間；
+HourOfWeekModel 把開播時間統計成「一週 168 個小時」的直方圖；
+CadencePlanner 在總檢測預算（每小時檢測次數）內分配各頻道、各時段的
+檢測間隔：常開播的時段密集檢測，其餘時段稀疏。
+
+分配方式：頻道 i 在第 h 小時的期望開播次數為 w_i(h)，檢測間隔 I 時
+平均偵測延遲約 I/2，在 Σ 檢測次數 固定下使 Σ w·I/2 最小的解為
+檢測頻率 ∝ sqrt(w)。
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from yt_recorder_index import default_data_root
+
+
+HOURS_PER_WEEK = 168
+WEEK_SECONDS = HOURS_PER_WEEK * 3600
+
+
+def hour_of_week(epoch: float) -> int:
+    """以本地時間計算的一週第幾小時（週一 00:00 為 0）。"""
+    dt = datetime.fromtimestamp(epoch)
+    return dt.weekday() * 24 + dt.hour
+
+
+class ChannelHistory:
+    """頻道 → 觀察到的開播時間（epoch 秒）。"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(default_data_root(), "history.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS live_starts (
+                channel_url TEXT NOT NULL,
+                video_id    TEXT NOT NULL,
+                started_at  REAL NOT NULL,
+                detected_at REAL NOT NULL,
+                PRIMARY KEY (channel_url, video_id)
+            )
+            """
+        )
+        self._conn.commit()
+        # 每次新增紀錄就遞增，CadencePlanner 據此判斷是否需要重新計算
+        self.version = 0
+
+    def record_start(
+        self,
+        channel_url: str,
+        video_id: str,
+        started_at: float,
+        detected_at: Optional[float] = None,
+    ) -> None:
+        """記錄一次開播；同一頻道的同一個 video ID 只記第一次。"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO live_starts (channel_url, video_id,"
+                " started_at, detected_at) VALUES (?, ?, ?, ?)",
+                (channel_url, video_id, started_at, detected_at or started_at),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                self.version += 1
+
+    def starts(
+        self, channel_url: str, since: Optional[float] = None
+    ) -> list[float]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT started_at FROM live_starts WHERE channel_url = ?"
+                " AND started_at >= ? ORDER BY started_at",
+                (channel_url, since or 0.0),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def channels(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT channel_url FROM live_starts"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class HourOfWeekModel:
+    """
+    一週 168 小時的開播直方圖。
+
+    每次開播分給當小時 0.5、前後各 0.25（開播時間常落在整點前後），
+    再加上 prior 的均勻值，避免從未開播的時段機率為 0。
+    rate(h) 為該小時的期望開播次數（每週）。
+    """
+
+    def __init__(
+        self,
+        starts: Iterable[float],
+        now: Optional[float] = None,
+        prior: float = 0.05,
+    ) -> None:
+        starts = list(starts)
+        now = time.time() if now is None else now
+        self.samples = len(starts)
+
+        counts = [0.0] * HOURS_PER_WEEK
+        for start in starts:
+            h = hour_of_week(start)
+            counts[h] += 0.5
+            counts[(h - 1) % HOURS_PER_WEEK] += 0.25
+            counts[(h + 1) % HOURS_PER_WEEK] += 0.25
+
+        # 觀察期間（週），至少一週
+        weeks = max(1.0, (now - min(starts)) / WEEK_SECONDS) if starts else 1.0
+        self.starts_per_week = self.samples / weeks
+
+        total = sum(counts) + prior * HOURS_PER_WEEK
+        self.probability = [(c + prior) / total for c in counts]
+
+    def rate(self, hour: int) -> float:
+        return self.starts_per_week * self.probability[hour]
+
+
+class CadencePlanner:
+    """
+    在總檢測預算內決定各頻道目前的檢測間隔。
+
+    budget_per_hour 為所有頻道合計每小時的檢測次數。歷史紀錄少於
+    min_samples 次的頻道不參與分配，維持各自設定的間隔（其用量先從
+    預算中扣除）。interval() 回傳 None 表示使用頻道原本的間隔。
+    """
+
+    def __init__(
+        self,
+        history: ChannelHistory,
+        budget_per_hour: float,
+        min_interval: float = 30.0,
+        max_interval: float = 3600.0,
+        min_samples: int = 3,
+        refresh_every: float = 3600.0,
+    ) -> None:
+        self.history = history
+        self.budget_per_hour = float(budget_per_hour)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+
+        self._lock = threading.Lock()
+        self._base_intervals: dict[str, float] = {}
+        self._models: dict[str, HourOfWeekModel] = {}
+        # 頻道 → 168 個小時各自的檢測間隔（秒）
+        self._plan: dict[str, list[float]] = {}
+        self._planned_version = -1
+        self._planned_at = 0.0
+
+    def set_channels(self, channels: dict[str, float]) -> None:
+        """設定要規劃的頻道（網址 → 設定的檢測間隔）。"""
+        with self._lock:
+            self._base_intervals = dict(channels)
+            self._planned_version = -1
+
+    def interval(
+        self, channel_url: str, now: Optional[float] = None
+    ) -> Optional[float]:
+        """目前時段的檢測間隔；未學習的頻道回傳 None。"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if (
+                self._planned_version != self.history.version
+                or now - self._planned_at > self.refresh_every
+            ):
+                self._replan(now)
+            plan = self._plan.get(channel_url)
+        if plan is None:
+            return None
+        return plan[hour_of_week(now)]
+
+    def delay(
+        self, channel_url: str, now: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        距離下次檢測的秒數。下一個小時的間隔較短時最多等到整點，
+        避免稀疏時段的長間隔跨過密集時段的開頭。
+        """
+        now = time.time() if now is None else now
+        interval = self.interval(channel_url, now)
+        if interval is None:
+            return None
+        with self._lock:
+            plan = self._plan.get(channel_url)
+        if plan is None:
+            return interval
+        h = hour_of_week(now)
+        if plan[(h + 1) % HOURS_PER_WEEK] < interval:
+            dt = datetime.fromtimestamp(now)
+            to_boundary = 3600 - (dt.minute * 60 + dt.second)
+            return min(interval, max(float(to_boundary), 1.0))
+        return interval
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """每個已學習頻道的樣本數、每週開播次數與最短 / 最長間隔。"""
+        with self._lock:
+            return {
+                url: {
+                    "samples": self._models[url].samples,
+                    "starts_per_week": round(
+                        self._models[url].starts_per_week, 2
+                    ),
+                    "min_interval": round(min(plan)),
+                    "max_interval": round(max(plan)),
+                }
+                for url, plan in self._plan.items()
+            }
+
+    def _replan(self, now: float) -> None:
+        self._models = {}
+        for url in self._base_intervals:
+            model = HourOfWeekModel(self.history.starts(url), now=now)
+            if model.samples >= self.min_samples:
+                self._models[url] = model
+
+        # 未學習的頻道照原本間隔檢測，先扣除其用量
+        budget = self.budget_per_hour
+        for url, base in self._base_intervals.items():
+            if url not in self._models:
+                budget -= 3600.0 / base
+        self._plan = plan_intervals(
+            self._models,
+            max(budget, 0.0),
+            self.min_interval,
+            self.max_interval,
+        )
+        self._planned_version = self.history.version
+        self._planned_at = now
+
+
+def plan_intervals(
+    models: dict[str, HourOfWeekModel],
+    budget_per_hour: float,
+    min_interval: float,
+    max_interval: float,
+) -> dict[str, list[float]]:
+    """依 sqrt(期望開播次數) 分配每週 budget_per_hour*168 次檢測。"""
+    weights = {
+        url: [math.sqrt(model.rate(h)) for h in range(HOURS_PER_WEEK)]
+        for url, model in models.items()
+    }
+    total = sum(sum(w) for w in weights.values())
+    plan: dict[str, list[float]] = {}
+    for url, w in weights.items():
+        intervals = []
+        for h in range(HOURS_PER_WEEK):
+            # 該小時的檢測次數（budget 是每小時，總量為 budget * 168）
+            probes = (
+                budget_per_hour * HOURS_PER_WEEK * w[h] / total if total else 0
+            )
+            interval = 3600.0 / probes if probes > 0 else max_interval
+            intervals.append(min(max(interval, min_interval), max_interval))
+        plan[url] = intervals
+    return plan
@@ -0,0 +1,2480 @@
+"""
+YouTube 直播錄製核心（不依賴 Tkinter）。
+
+RecorderEngine 包含 yt-dlp 呼叫、直播檢測、錄製與多頻道監控；
+GUI（yt_recorder_v5.py）與無介面常駐程式（yt_recorder_daemon.py）
+都只是它的前端，透過 log / on_status / on_error 回呼接收訊息。
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from yt_recorder_backfill import Backfiller, BackfillTask
+from yt_recorder_cadence import CadencePlanner, ChannelHistory
+from yt_recorder_http import HttpSession, LightProbe
+from yt_recorder_index import (
+    ACTION_APPEND,
+    ACTION_SKIP,
+    BACKFILL_DONE,
+    BACKFILL_FAILED,
+    BACKFILL_PENDING,
+    BACKFILL_UNMAPPABLE,
+    STATE_COMPLETED,
+    STATE_FAILED,
+    STATE_INTERRUPTED,
+    VERDICT_OK,
+    VERDICT_WARNING,
+    RecordingIndex,
+)
+from yt_recorder_postprocess import (
+    JOB_PROBE,
+    JOB_REMUX,
+    JOB_SPLICE,
+    JOB_THUMBNAIL,
+    JOB_VERIFY,
+    PostJob,
+    PostProcessor,
+)
+from yt_recorder_ratelimit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_PROBE,
+    PRIORITY_RECORD,
+    RateLimiter,
+    account_key,
+    destination_key,
+)
+from yt_recorder_recording import (
+    ChildProcess,
+    DiskUsageMeter,
+    FfmpegProgressParser,
+    FormatFragments,
+    ProcessSupervisor,
+    ProgressUpdate,
+    RecordingPool,
+    StallWatchdog,
+    Throttle,
+    describe_fragment_runs,
+    merge_fragment_runs,
+    format_bytes,
+    parse_progress_line,
+    progress_template_args,
+)
+from yt_recorder_scheduler import (
+    LIVE_STATUS_LIVE,
+    LIVE_STATUS_NOT_LIVE,
+    LIVE_STATUS_UPCOMING,
+    ChannelScheduler,
+    ChannelState,
+    ProbeResult,
+)
+from yt_recorder_segments import Segment, SegmentManifest
+from yt_recorder_websub import HUB_URL, WebSubReceiver
+from yt_recorder_ytdlp import (
+    CookieCache,
+    ExtractCache,
+    ExtractionCancelled,
+    ExtractionError,
+    WorkerError,
+    YtdlpCacheDir,
+    YtdlpWorkerPool,
+    base_ytdlp_args,
+    default_cache_root,
+    extract_batch_subprocess,
+    find_ffmpeg_executable,
+    find_ytdlp_executable,
+    probe_info_is_fresh,
+)
+
+
+# 串流轉封裝的容器 → (ffmpeg 輸出格式, 格式參數)
+STREAM_FORMATS = {
+    # 每個關鍵影格切一個 fragment，寫到一半的檔案也能播放
+    "mp4": ("mp4", {"movflags": "+frag_keyframe+empty_moov+default_base_moof"}),
+    "mkv": ("matroska", {}),
+}
+
+DEFAULT_COOKIE_TEST_URL = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+
+
+def default_download_dir() -> str:
+    return os.path.join(
+        os.path.expanduser("~"), "Downloads", "yt_recorder_downloads"
+    )
+
+
+def validate_url(url: str) -> bool:
+    pattern = re.compile(r"^https?://(www\.)?youtube\.com/.+$")
+    return bool(pattern.match(url))
+
+
+def safe_filename(name: str, max_length: int = 150) -> str:
+    """去掉檔名中不允許的字元（Windows 最嚴格的規則）並限制長度。"""
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip(" .")
+    return name[:max_length] or "live"
+
+
+def parse_channel_urls(text: str) -> list[str]:
+    """拆分以逗號或空白分隔的多個頻道網址（保留順序、去除重複）。"""
+    urls: list[str] = []
+    for part in re.split(r"[\s,]+", text.strip()):
+        if part and part not in urls:
+            urls.append(part)
+    return urls
+
+
+_UPCOMING_RE = re.compile(
+    r"(?:live event will begin|premieres) in (\d+|a few|an?) "
+    r"(second|minute|hour|day)s?",
+    re.IGNORECASE,
+)
+
+_UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_upcoming_delay(message: str) -> Optional[float]:
+    """
+    從 yt-dlp 的錯誤訊息（例如 "This live event will begin in 3 hours."）
+    取出距離開始的秒數；不是預定直播的訊息時回傳 None。
+    """
+    match = _UPCOMING_RE.search(message)
+    if not match:
+        if "live event will begin in a few moments" in message.lower():
+            return 0.0
+        return None
+    amount, unit = match.groups()
+    count = int(amount) if amount.isdigit() else 1
+    return float(count * _UNIT_SECONDS[unit.lower()])
+
+
+def is_not_live_message(message: str) -> bool:
+    """
+    yt-dlp 擷取沒有直播的頻道 /live 網址時的錯誤（UserNotLive），例如
+    "ERROR: [youtube:tab] @channel: The channel is not currently live."
+    這是頻道離線的正常結果，不是檢測失敗。
+    """
+    return "not currently live" in message.lower()
+
+
+def console_log(message: str) -> None:
+    """無介面時的預設日誌輸出。"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+@dataclass
+class CookieCheckResult:
+    ok: bool
+    # 失敗原因：not_found / extraction / timeout / error
+    reason: str = ""
+    title: str = ""
+    error: str = ""
+
+
+class RecorderEngine:
+    # 如果你使用的不是 Chrome 預設 Profile，可把這行改成例如 "chrome:Profile 1"
+    COOKIES_FROM_BROWSER = "chrome"
+
+    # 常駐 yt-dlp worker 數量（檢測 / Cookie 檢查用）
+    YTDLP_WORKERS = 2
+
+    # 偵測到直播後直接重用檢測取得的 info 開始錄製（省去第二次擷取）。
+    # 檢測的 info 只有從目前直播位置開始的格式，開播到偵測之間的內容
+    # （最多一個檢測間隔）會遺失，因此預設關閉：偵測到後立刻以
+    # --live-from-start 重新擷取，從頭錄製
+    REUSE_PROBE_INFO = False
+
+    # 檢測用的 yt-dlp 參數：預定直播也能取得 info（live_status、開始時間）
+    PROBE_ARGS = ["--ignore-no-formats-error"]
+    # 同時到期的頻道每幾個合成一次 yt-dlp 擷取（1 表示不合併）
+    PROBE_BATCH_SIZE = 5
+
+    # 同一網址在這個秒數內重複擷取時直接使用上次的結果（需小於最短檢測間隔）
+    PROBE_CACHE_TTL = 10
+
+    # 先以 HTTP 讀取頻道頁面，沒有變化時略過完整的 yt-dlp 擷取
+    LIGHT_PROBE = True
+    # 連續略過完整擷取的次數上限，之後強制做一次完整擷取
+    LIGHT_MAX_SKIPS = 10
+
+    # 所有 yt-dlp 呼叫共用的限流：每個目的地主機、每個帳號各一個 token bucket
+    # （每分鐘次數與可連續使用的次數）
+    RATE_PER_MINUTE = 30
+    RATE_BURST = 5
+    ACCOUNT_RATE_PER_MINUTE = 20
+    ACCOUNT_RATE_BURST = 5
+    # 限流佇列累積到這麼多個等待中的請求時警告（檢測跟不上設定的間隔）
+    RATE_BACKLOG_WARNING = 10
+
+    # WebSub 訂閱生效期間輪詢間隔放大的倍數（輪詢只作為漏接通知的備援）
+    WEBSUB_POLL_FACTOR = 4
+
+    # 錄製時把 yt-dlp 輸出的串流直接交給 ffmpeg 轉封裝成單一檔案
+    # （fragmented MP4 或 MKV），直播結束時檔案即可使用，不需要最後的合併；
+    # 這個模式一律從目前直播位置開始，不支援 --live-from-start
+    STREAM_REMUX = False
+    STREAM_CONTAINER = "mp4"
+    # yt-dlp 結束後等待 ffmpeg 寫完檔案的秒數上限
+    STREAM_FINALIZE_TIMEOUT = 30
+    # 分段輸出的每段秒數（0 表示不分段）；分段時一律使用即時轉封裝，
+    # 每段是可獨立播放的檔案，並維護每場直播的 *.manifest.json
+    SEGMENT_DURATION = 0
+    # 後製（完整性檢查、縮圖、轉封裝）行程池的 worker 數（0 表示不做後製）
+    POSTPROCESS_WORKERS = 2
+    # 後製時把即時轉封裝的 fragmented MP4 轉成一般 MP4（moov 在檔頭）
+    POSTPROCESS_REMUX = False
+    # 後製時為每個輸出檔擷取縮圖
+    THUMBNAILS = True
+    # 完成的輸出檔在背景完整讀過一次，檢查缺口、長度與影音同步，
+    # 結果寫入錄製索引（需要重新下載的檔案見 recording_index.needs_refetch()）
+    VERIFY_RECORDINGS = True
+    # 同一串流相鄰封包的時間差超過這個秒數視為缺口
+    VERIFY_GAP_THRESHOLD = 1.0
+    # 補抓錄製時 yt-dlp 略過的片段並接回原檔（需要後製行程池）。只有以
+    # --live-from-start 下載後合併的錄製，片段編號才能對應到直播時間；
+    # 其他錄製只記錄缺口數
+    BACKFILL_FRAGMENTS = True
+    # 錄製結束後等待這個秒數才開始補抓（讓後製與其他錄製先進行）
+    BACKFILL_DELAY = 120
+    # 補抓失敗（例如直播剛結束、存檔尚未產生）時的重試間隔與次數上限
+    BACKFILL_RETRY_DELAY = 1800
+    BACKFILL_MAX_ATTEMPTS = 6
+
+    # 錄製與補抓使用的格式
+    LIVE_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+
+    # 量測錄製佔用磁碟空間的間隔（秒）
+    DISK_SAMPLE_INTERVAL = 5.0
+
+    # 錄製結束後，同一頻道恢復檢測前的冷卻秒數
+    RECORD_COOLDOWN = 60
+
+    # 錄製進度更新狀態列 / 統計的最短間隔（秒）
+    PROGRESS_INTERVAL = 1.0
+
+    # 錄製超過這個秒數沒有任何進度就視為停滯並重新啟動 yt-dlp（0 表示停用）
+    STALL_TIMEOUT = 120
+    # 同一場錄製因停滯重新啟動的次數上限
+    STALL_MAX_RESTARTS = 5
+
+    # 錄製中遇到 HTTP 403：連續恢復次數上限與指數退避（秒）
+    FORBIDDEN_MAX_RETRIES = 6
+    FORBIDDEN_BACKOFF_BASE = 5
+    FORBIDDEN_BACKOFF_MAX = 120
+    # 從目前位置錄製遇到 403 後改從直播開頭算起的時間點重新下載，
+    # 往前多取的秒數（涵蓋直播延遲與時鐘誤差，寧可重疊也不漏）
+    FORBIDDEN_RESUME_MARGIN = 60
+
+    def __init__(
+        self,
+        download_dir: Optional[str] = None,
+        cookies_from_browser: Optional[str] = None,
+        ytdlp_workers: Optional[int] = None,
+        log: Callable[[str], None] = console_log,
+        on_status: Optional[Callable[[str], None]] = None,
+        on_error: Optional[Callable[[str, str], None]] = None,
+        progress_interval: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+        light_probe: Optional[bool] = None,
+        rate_per_minute: Optional[float] = None,
+        account_rate_per_minute: Optional[float] = None,
+        probe_cache_ttl: Optional[float] = None,
+        probe_batch_size: Optional[int] = None,
+        stream_remux: Optional[bool] = None,
+        stream_container: Optional[str] = None,
+        segment_duration: Optional[float] = None,
+        postprocess_workers: Optional[int] = None,
+        postprocess_remux: Optional[bool] = None,
+        thumbnails: Optional[bool] = None,
+        verify_recordings: Optional[bool] = None,
+        backfill_fragments: Optional[bool] = None,
+        reuse_probe_info: Optional[bool] = None,
+    ) -> None:
+        self.download_dir = download_dir or default_download_dir()
+        self.cookies_from_browser = (
+            cookies_from_browser or self.COOKIES_FROM_BROWSER
+        )
+        self.log = log
+        # 狀態列文字（錄製時間、等待秒數）
+        self.on_status = on_status or (lambda text: None)
+        # 需要使用者注意的錯誤（GUI 顯示對話框，常駐程式只寫日誌）
+        self.on_error = on_error or (
+            lambda title, message: self.log(f"{title}: {message}")
+        )
+
+        # 狀態 / 執行緒
+        self.monitor_thread: Optional[threading.Thread] = None
+        self.scheduler: Optional[ChannelScheduler] = None
+        self.recording_pool: Optional[RecordingPool] = None
+        self.stop_event = threading.Event()
+
+        self.rate_limiter = RateLimiter(
+            {
+                "host": (
+                    rate_per_minute or self.RATE_PER_MINUTE,
+                    self.RATE_BURST,
+                ),
+                "account": (
+                    account_rate_per_minute or self.ACCOUNT_RATE_PER_MINUTE,
+                    self.ACCOUNT_RATE_BURST,
+                ),
+            },
+            log=self.log,
+            backlog_warning=self.RATE_BACKLOG_WARNING,
+        )
+        self.probe_batch_size = int(
+            probe_batch_size or self.PROBE_BATCH_SIZE
+        )
+        # 檢測、Cookie 檢查同時擷取同一網址時共用一次擷取
+        self.extract_cache = ExtractCache(
+            self.PROBE_CACHE_TTL if probe_cache_ttl is None else probe_cache_ttl
+        )
+        self.ytdlp_pool = YtdlpWorkerPool(
+            size=ytdlp_workers or self.YTDLP_WORKERS, log=self.log
+        )
+        self.cookie_cache = CookieCache(self.cookies_from_browser, log=self.log)
+        self.ytdlp_cache = YtdlpCacheDir(log=self.log)
+        self.recording_index = RecordingIndex()
+        # 各頻道觀察到的開播時間，用於學習檢測頻率
+        self.channel_history = ChannelHistory()
+        self.cadence_planner: Optional[CadencePlanner] = None
+
+        use_light = self.LIGHT_PROBE if light_probe is None else light_probe
+        self.light_probe: Optional[LightProbe] = (
+            LightProbe(
+                HttpSession(cookie_file=self.cookie_cache.cookie_file),
+                log=self.log,
+            )
+            if use_light
+            else None
+        )
+        # 各頻道最近一次完整擷取的結果、頻道 ID 與連續略過次數
+        self._last_full_probe: dict[str, ProbeResult] = {}
+        self._channel_ids: dict[str, str] = {}
+        self._light_skips: dict[str, int] = {}
+        self.light_skipped = 0
+        # WebSub 推播（enable_websub() 後才有）
+        self.websub: Optional[WebSubReceiver] = None
+        # 監控中的頻道與設定的檢測間隔
+        self._base_intervals: dict[str, float] = {}
+        # 頻道網址 → 尚未確認的 WebSub 通知收到時間（epoch 秒）
+        self._websub_notified: dict[str, float] = {}
+        self.websub_triggers = 0
+        # 最近的「收到通知 → 第一個片段」延遲（秒）
+        self.websub_latencies: deque[float] = deque(maxlen=100)
+        # 所有 yt-dlp 下載 / 錄製子行程的輸出由同一條執行緒讀取
+        self.process_supervisor = ProcessSupervisor(log=self.log)
+        # 最近的「偵測到直播 → 第一個片段」延遲（秒）
+        self.first_fragment_latencies: deque[float] = deque(maxlen=100)
+        self.progress_interval = (
+            self.PROGRESS_INTERVAL
+            if progress_interval is None
+            else progress_interval
+        )
+        # 錄製中的最新進度（頻道網址 → ProgressUpdate），依 progress_interval 更新
+        self.recording_progress: dict[str, ProgressUpdate] = {}
+
+        self.stall_timeout = (
+            self.STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        )
+        self.stream_remux = (
+            self.STREAM_REMUX if stream_remux is None else stream_remux
+        )
+        self.stream_container = stream_container or self.STREAM_CONTAINER
+        if self.stream_container not in STREAM_FORMATS:
+            raise ValueError(f"不支援的容器格式: {self.stream_container}")
+        self.segment_duration = (
+            self.SEGMENT_DURATION
+            if segment_duration is None
+            else segment_duration
+        )
+        self.segments_completed = 0
+        workers = (
+            self.POSTPROCESS_WORKERS
+            if postprocess_workers is None
+            else postprocess_workers
+        )
+        # 錄製完成的檔案與段落交給獨立的行程池後製，不佔用錄製執行緒
+        self.postprocessor: Optional[PostProcessor] = (
+            PostProcessor(workers, log=self.log) if workers > 0 else None
+        )
+        self.postprocess_remux = (
+            self.POSTPROCESS_REMUX
+            if postprocess_remux is None
+            else postprocess_remux
+        )
+        self.thumbnails = self.THUMBNAILS if thumbnails is None else thumbnails
+        self.reuse_probe_info = (
+            self.REUSE_PROBE_INFO
+            if reuse_probe_info is None
+            else reuse_probe_info
+        )
+        if verify_recordings is None:
+            verify_recordings = self.VERIFY_RECORDINGS
+        # 驗證要讀完整個檔案，使用獨立的單一 worker，不拖慢縮圖與檢查
+        self.verifier: Optional[PostProcessor] = (
+            PostProcessor(1, log=self.log) if verify_recordings else None
+        )
+        self._postprocess_warned = False
+        if backfill_fragments is None:
+            backfill_fragments = self.BACKFILL_FRAGMENTS
+        self.backfiller: Optional[Backfiller] = None
+        if backfill_fragments and self.postprocessor is not None:
+            self.backfiller = Backfiller(
+                self._run_backfill,
+                self._on_backfill_state,
+                max_attempts=self.BACKFILL_MAX_ATTEMPTS,
+                retry_delay=self.BACKFILL_RETRY_DELAY,
+                log=self.log,
+            )
+            # 上次執行時尚未補抓完成的缺口
+            for entry in self.recording_index.pending_backfills():
+                self.backfiller.schedule(
+                    BackfillTask(
+                        entry["path"],
+                        entry["video_id"],
+                        entry["url"],
+                        entry["runs"],
+                        entry["attempts"],
+                    ),
+                    self.BACKFILL_DELAY,
+                )
+        # 片段缺口統計：追蹤的輸出數、有缺口的輸出數、缺少的片段數
+        self.fragment_outputs = 0
+        self.fragment_gap_outputs = 0
+        self.fragment_gaps = 0
+        # 正常結束的錄製：(磁碟用量峰值, 最終檔案大小, 收尾秒數)
+        self.output_measurements: deque[tuple[int, int, float]] = deque(
+            maxlen=100
+        )
+        # 停滯統計：偵測次數、重新啟動次數、放棄次數、恢復所需秒數
+        self.stall_count = 0
+        self.stall_restarts = 0
+        self.stall_give_ups = 0
+        self.stall_recovery_times: deque[float] = deque(maxlen=100)
+        # 無法從中斷處接續、改從目前直播位置重新開始時遺失的秒數
+        self.restart_gaps: deque[float] = deque(maxlen=100)
+        # 403 統計：偵測次數、恢復嘗試次數、成功次數、放棄次數、恢復所需秒數
+        self.forbidden_errors = 0
+        self.forbidden_recoveries = 0
+        self.forbidden_recovered = 0
+        self.forbidden_give_ups = 0
+        self.forbidden_recovery_times: deque[float] = deque(maxlen=100)
+
+    def close(self) -> None:
+        self.stop_monitoring()
+        self.rate_limiter.close()
+        self.process_supervisor.close()
+        if self.backfiller:
+            self.backfiller.close()
+        if self.postprocessor:
+            self.postprocessor.close()
+        if self.verifier:
+            self.verifier.close()
+        if self.websub:
+            self.websub.close()
+        if self.light_probe:
+            self.light_probe.close()
+        self.ytdlp_pool.close()
+        self.recording_index.close()
+        self.channel_history.close()
+
+    # ------------------------------------------------------------------
+    # 共用工具：yt-dlp 路徑與參數
+    # ------------------------------------------------------------------
+
+    def _get_ytdlp_executable(self) -> Optional[str]:
+        """取得可用的 yt-dlp 執行檔路徑（見 find_ytdlp_executable）。"""
+        return find_ytdlp_executable()
+
+    def _base_ytdlp_args(self) -> list[str]:
+        """所有 yt-dlp 呼叫共用的 Anti-403 + Cookie 參數（使用 Cookie 與 yt-dlp 快取）。"""
+        return base_ytdlp_args(
+            self.cookies_from_browser,
+            cookie_file=self.cookie_cache.cookie_file(),
+            cache_dir=self.ytdlp_cache.path,
+        )
+
+    def _purge_ytdlp_cache(self, reason: str) -> None:
+        """清除 yt-dlp 快取，並讓 worker 重新啟動以丟掉記憶體中的 player JS。"""
+        self.ytdlp_cache.purge(reason)
+        self.ytdlp_pool.recycle()
+        self.extract_cache.invalidate()
+
+    def _build_ytdlp_command(
+        self, extra_args: list[str], url: Optional[str] = None
+    ) -> list[str]:
+        """
+        組合完整 yt-dlp 命令列。找不到執行檔時丟 FileNotFoundError。
+
+        執行前須先以 _acquire_ytdlp_slot() 取得限流的 token。
+        """
+        exe = self._get_ytdlp_executable()
+        if not exe:
+            raise FileNotFoundError("yt-dlp executable not found")
+        cmd = [exe]
+        cmd.extend(extra_args)
+        if url:
+            cmd.append(url)
+        return cmd
+
+    def _acquire_ytdlp_slot(
+        self,
+        url: Optional[str],
+        priority: int,
+        stop_event: Optional[threading.Event] = None,
+    ) -> bool:
+        """
+        向全域限流取得一次 yt-dlp 呼叫的 token（目的地主機與帳號各一個）。
+        stop_event 設定而放棄等待時回傳 False。
+        """
+        waited = self.rate_limiter.acquire(
+            [destination_key(url), account_key(self.cookies_from_browser)],
+            priority,
+            stop_event,
+        )
+        if waited is None:
+            return False
+        if waited >= 5:
+            self.log(f"yt-dlp 呼叫受限流延後 {waited:.1f} 秒: {url}")
+        return True
+
+    def _extract_info(
+        self,
+        url: str,
+        timeout: float,
+        extra_args: Optional[list[str]] = None,
+        priority: int = PRIORITY_PROBE,
+        fresh: bool = False,
+    ) -> dict[str, Any]:
+        """
+        擷取影片資訊（不下載）。優先使用常駐 worker 池，失敗時改用子行程。
+
+        PROBE_CACHE_TTL 秒內以相同參數擷取同一網址時沿用上次的結果，
+        同時進行的相同擷取只執行一次（見 ExtractCache）；fresh=True 時
+        捨棄該網址的快取，但仍會與進行中的擷取合併。
+
+        錯誤看起來與 yt-dlp 快取有關時（403、簽章解析失敗）清除快取重試一次。
+        找不到 yt-dlp 丟 FileNotFoundError；擷取失敗丟 ExtractionError；
+        子行程逾時丟 subprocess.TimeoutExpired；檢測與錄製的擷取在停止監控時
+        放棄等待限流，丟 ExtractionCancelled。
+        """
+        if fresh:
+            self.extract_cache.invalidate(url)
+        return self.extract_cache.get(
+            (url, tuple(extra_args or ())),
+            lambda: self._extract_info_retrying(
+                url, timeout, extra_args, priority
+            ),
+        )
+
+    def _extract_info_retrying(
+        self,
+        url: str,
+        timeout: float,
+        extra_args: Optional[list[str]],
+        priority: int,
+    ) -> dict[str, Any]:
+        try:
+            return self._extract_info_once(url, timeout, extra_args, priority)
+        except ExtractionError as e:
+            if not self.ytdlp_cache.should_purge(str(e)):
+                raise
+            self._purge_ytdlp_cache("擷取時疑似快取造成的錯誤")
+            return self._extract_info_once(url, timeout, extra_args, priority)
+
+    def _extract_info_once(
+        self,
+        url: str,
+        timeout: float,
+        extra_args: Optional[list[str]] = None,
+        priority: int = PRIORITY_PROBE,
+    ) -> dict[str, Any]:
+        # Cookie 檢查等背景擷取不屬於監控，stop_event 停留在設定狀態時也要執行
+        stop_event = (
+            None if priority == PRIORITY_BACKGROUND else self.stop_event
+        )
+        if not self._acquire_ytdlp_slot(url, priority, stop_event):
+            raise ExtractionCancelled(url)
+        args = self._base_ytdlp_args() + (extra_args or [])
+        try:
+            if self.ytdlp_pool.available:
+                try:
+                    return self.ytdlp_pool.extract(args, url, timeout=timeout)
+                except WorkerError as e:
+                    self.log(f"yt-dlp worker 失敗，改用子行程: {e}")
+
+            command = self._build_ytdlp_command(
+                args + ["--dump-single-json"], url
+            )
+            result = subprocess.run(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
+            if result.returncode != 0:
+                raise ExtractionError(result.stderr.strip())
+            return json.loads(result.stdout)
+        except ExtractionError as e:
+            # Cookie 失效時讓快取重新匯出
+            self.cookie_cache.report_failure(str(e))
+            raise
+        finally:
+            self.ytdlp_cache.observe()
+
+    # ------------------------------------------------------------------
+    # yt-dlp 更新
+    # ------------------------------------------------------------------
+
+    def update_ytdlp(self) -> None:
+        """嘗試更新內建或系統的 yt-dlp（阻塞，結果寫入日誌）。"""
+        self.log("正在更新 yt-dlp，請稍候...")
+        exe = self._get_ytdlp_executable()
+        if exe and os.path.basename(exe).startswith("yt-dlp"):
+            # 優先更新內建二進位檔（支援 -U）
+            result = subprocess.run(
+                [exe, "-U"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            if result.stdout.strip():
+                self.log(result.stdout.strip())
+            if result.stderr.strip():
+                self.log(result.stderr.strip())
+            self.log("更新程序已結束。")
+        else:
+            # 備用：使用 pip 更新系統套件
+            cmd = ["pip3", "install", "--upgrade", "yt-dlp"]
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            if result.stdout.strip():
+                self.log(result.stdout.strip())
+            if result.stderr.strip():
+                self.log(result.stderr.strip())
+            self.log("已嘗試透過 pip 更新 yt-dlp。")
+
+    # ------------------------------------------------------------------
+    # 一般影片下載
+    # ------------------------------------------------------------------
+
+    def download_video(
+        self, url: str, retry_on_cache_error: bool = True
+    ) -> bool:
+        """下載一般影片，回傳是否成功。找不到 yt-dlp 時丟 FileNotFoundError。"""
+        output_dir = self.download_dir
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            self.log(f"無法建立資料夾: {e}")
+            return False
+
+        output_path = os.path.join(output_dir, "%(title)s-%(id)s.%(ext)s")
+
+        command = self._build_ytdlp_command(
+            self._base_ytdlp_args()
+            + [
+                "-f",
+                "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+                "--merge-output-format",
+                "mp4",
+                "-o",
+                output_path,
+                "--newline",
+                "--progress",
+            ],
+            url,
+        )
+
+        cache_error = False
+
+        def _on_line(line: str) -> None:
+            nonlocal cache_error
+            if "WARNING" in line and "Remote components" in line:
+                return
+            if "Destination:" in line or "Merging" in line:
+                self.log(line)
+            elif "[download]" in line and "%" in line:
+                self.log(line)
+            if self.ytdlp_cache.should_purge(line):
+                cache_error = True
+
+        try:
+            self._acquire_ytdlp_slot(url, PRIORITY_BACKGROUND)
+            returncode = self.process_supervisor.spawn(command, _on_line).wait()
+            self.ytdlp_cache.observe()
+            if returncode != 0 and cache_error and retry_on_cache_error:
+                self._purge_ytdlp_cache("下載時疑似快取造成的錯誤")
+                self.log("重新嘗試下載...")
+                return self.download_video(url, retry_on_cache_error=False)
+            if returncode == 0:
+                self.log("測試影片下載完成。")
+                return True
+            self.log(f"下載失敗，返回碼: {returncode}")
+            return False
+        except Exception as e:
+            self.log(f"下載錯誤: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Cookie 檢查
+    # ------------------------------------------------------------------
+
+    def check_cookies(
+        self, test_url: str = DEFAULT_COOKIE_TEST_URL, verbose: bool = True
+    ) -> CookieCheckResult:
+        """以 test_url 驗證目前 Cookie 是否可讀取影片資訊。"""
+        try:
+            info = self._extract_info(
+                test_url, timeout=60, priority=PRIORITY_BACKGROUND
+            )
+        except FileNotFoundError:
+            return CookieCheckResult(False, "not_found")
+        except ExtractionError as e:
+            stderr = str(e)
+            if "WARNING" not in stderr or "Remote components" not in stderr:
+                self.log(f"Cookie 檢查失敗: {stderr[:100]}")
+            return CookieCheckResult(False, "extraction", error=stderr)
+        except subprocess.TimeoutExpired:
+            self.log("Cookie 檢查超時 (60 秒)")
+            return CookieCheckResult(False, "timeout")
+        except Exception as e:
+            self.log(f"未知錯誤: {e}")
+            return CookieCheckResult(False, "error", error=str(e))
+
+        title = str(info.get("title") or "")
+        if verbose:
+            self.log(f"Cookie 有效，成功讀取影片: {title}")
+            stats = self.cookie_cache.stats()
+            self.log(
+                f"Cookie 快取：匯出 {stats['exports']} 次，"
+                f"命中 {stats['hits']} 次，"
+                f"上次匯出耗時 {stats['last_export_seconds']} 秒"
+            )
+            self.log(f"yt-dlp 快取統計: {self.ytdlp_cache.stats()}")
+        return CookieCheckResult(True, title=title)
+
+    # ------------------------------------------------------------------
+    # 直播檢測與錄製
+    # ------------------------------------------------------------------
+
+    def is_live(self, url: str) -> bool:
+        """
+        檢查指定網址是否正在直播（包含會員直播，只要 Cookie 有權限）。
+
+        使用 yt-dlp 的 is_live 欄位作判斷。
+        """
+        return self.probe_live(url) is not None
+
+    def probe_live(self, url: str) -> Optional[dict[str, Any]]:
+        """檢測直播；正在直播時回傳擷取到的 info dict（供錄製重用），否則 None。"""
+        result = self.probe_channel(url)
+        return result.info if result.live else None
+
+    def probe_channel(self, url: str) -> ProbeResult:
+        """
+        檢測直播並回傳 ProbeResult（含 live_status 與預定開始時間）。
+
+        檢測開始前收到的 WebSub 通知在沒有偵測到直播時即作廢，
+        只有促成錄製的通知才計入「通知 → 開始錄製」延遲。
+        """
+        started = time.time()
+        last = self._last_full_probe.get(url)
+        result = self._light_skip(url, last)
+        if result is None:
+            result = self._store_full_probe(
+                url, last, self._probe_channel_full(url)
+            )
+        self._settle_websub(url, result, started)
+        return result
+
+    def probe_channels(self, urls: list[str]) -> dict[str, ProbeResult]:
+        """
+        批次檢測多個頻道：各自先經過 LightProbe，需要完整擷取的頻道
+        以一次 yt-dlp 呼叫（worker 或子行程）一起擷取。
+        """
+        started = time.time()
+        results: dict[str, ProbeResult] = {}
+        lasts: dict[str, Optional[ProbeResult]] = {}
+        for url in urls:
+            last = self._last_full_probe.get(url)
+            skipped = self._light_skip(url, last)
+            if skipped is not None:
+                results[url] = skipped
+            else:
+                lasts[url] = last
+
+        if len(lasts) == 1:
+            url = next(iter(lasts))
+            full = {url: self._probe_channel_full(url)}
+        elif lasts:
+            full = self._probe_channels_full(list(lasts))
+        else:
+            full = {}
+        for url, last in lasts.items():
+            results[url] = self._store_full_probe(url, last, full[url])
+
+        for url, result in results.items():
+            self._settle_websub(url, result, started)
+        return results
+
+    def _settle_websub(
+        self, url: str, result: ProbeResult, started: float
+    ) -> None:
+        if result.live:
+            return
+        notified_at = self._websub_notified.get(url)
+        if notified_at is not None and notified_at <= started:
+            self._websub_notified.pop(url, None)
+
+    def _light_skip(
+        self, url: str, last: Optional[ProbeResult]
+    ) -> Optional[ProbeResult]:
+        """
+        先以 LightProbe 讀取頻道頁面；與上次完整擷取時相比沒有變化
+        （且上次不是直播中）就回傳上次的結果，最多連續 LIGHT_MAX_SKIPS 次。
+        需要完整擷取時回傳 None。
+        """
+        if (
+            self.light_probe is not None
+            and last is not None
+            and not last.live
+            and not last.error
+            and self._light_skips.get(url, 0) < self.LIGHT_MAX_SKIPS
+        ):
+            # 預定直播轉為直播不會改變 feed，這時改看 /live 頁面
+            channel_id = (
+                None
+                if last.live_status == LIVE_STATUS_UPCOMING
+                else self._channel_ids.get(url)
+            )
+            light = self.light_probe.check(url, channel_id)
+            if light.error is None and not light.changed:
+                self._light_skips[url] = self._light_skips.get(url, 0) + 1
+                self.light_skipped += 1
+                self.log(f"目前無直播（頁面未變更）: {url}")
+                return last
+        self._light_skips[url] = 0
+        return None
+
+    def _store_full_probe(
+        self, url: str, last: Optional[ProbeResult], result: ProbeResult
+    ) -> ProbeResult:
+        if result.error:
+            self._last_full_probe.pop(url, None)
+        else:
+            self._last_full_probe[url] = result
+            if self.light_probe is not None and last is None:
+                # 建立頁面基準，下次檢測才能判斷是否改變
+                self.light_probe.check(url, self._light_source(url, result))
+        return result
+
+    def _light_source(self, url: str, result: ProbeResult) -> Optional[str]:
+        if result.live_status == LIVE_STATUS_UPCOMING:
+            return None
+        return self._channel_ids.get(url)
+
+    def _probe_channel_full(self, url: str) -> ProbeResult:
+        """
+        以 --ignore-no-formats-error 完整擷取，讓尚未開始的預定直播也能
+        取得 info（live_status=is_upcoming、release_timestamp），
+        排程器據此決定下次檢測時間。
+        """
+        try:
+            info = self._extract_info(
+                url, timeout=30, extra_args=self.PROBE_ARGS
+            )
+        except FileNotFoundError:
+            self.log("找不到 yt-dlp，可執行檔遺失，無法檢測直播狀態。")
+            return ProbeResult(error=True)
+        except ExtractionCancelled:
+            # 停止監控，檢測取消
+            return ProbeResult(error=True)
+        except ExtractionError as e:
+            return self._probe_error_result(url, str(e))
+        except subprocess.TimeoutExpired:
+            self.log(f"檢測直播狀態超時: {url}")
+            return ProbeResult(error=True)
+        except Exception as e:
+            self.log(f"檢測直播狀態錯誤 ({url}): {e}")
+            return ProbeResult(error=True)
+        return self._probe_info_result(url, info)
+
+    def _probe_channels_full(self, urls: list[str]) -> dict[str, ProbeResult]:
+        """
+        一次 yt-dlp 呼叫完整擷取多個網址，逐一對應回 ProbeResult。
+
+        每個網址仍各自向限流取得 token（YouTube 端的請求數不變），
+        省下的是每次啟動 yt-dlp、載入 extractor 與 Cookie 的成本。
+        成功的結果放入擷取快取。
+        """
+        for url in urls:
+            if not self._acquire_ytdlp_slot(
+                url, PRIORITY_PROBE, self.stop_event
+            ):
+                # 停止監控，整批檢測取消
+                return {url: ProbeResult(error=True) for url in urls}
+        args = self._base_ytdlp_args() + self.PROBE_ARGS
+        timeout = 30.0 + 15.0 * len(urls)
+        outcomes: Optional[dict[str, Any]] = None
+        try:
+            if self.ytdlp_pool.available:
+                try:
+                    outcomes = self.ytdlp_pool.extract_batch(
+                        args, urls, timeout=timeout
+                    )
+                except WorkerError as e:
+                    self.log(f"yt-dlp worker 失敗，改用子行程: {e}")
+            if outcomes is None:
+                exe = self._get_ytdlp_executable()
+                if not exe:
+                    self.log("找不到 yt-dlp，可執行檔遺失，無法檢測直播狀態。")
+                    return {url: ProbeResult(error=True) for url in urls}
+                outcomes = extract_batch_subprocess(exe, args, urls, timeout)
+        except subprocess.TimeoutExpired:
+            self.log(f"批次檢測直播狀態超時（{len(urls)} 個頻道）")
+            return {url: ProbeResult(error=True) for url in urls}
+        except Exception as e:
+            self.log(f"批次檢測直播狀態錯誤（{len(urls)} 個頻道）: {e}")
+            return {url: ProbeResult(error=True) for url in urls}
+        finally:
+            self.ytdlp_cache.observe()
+
+        results: dict[str, ProbeResult] = {}
+        purge = False
+        for url in urls:
+            outcome = outcomes[url]
+            if isinstance(outcome, ExtractionError):
+                stderr = str(outcome)
+                self.cookie_cache.report_failure(stderr)
+                purge = purge or self.ytdlp_cache.should_purge(stderr)
+                results[url] = self._probe_error_result(url, stderr)
+            else:
+                self.extract_cache.put(
+                    (url, tuple(self.PROBE_ARGS)), outcome
+                )
+                results[url] = self._probe_info_result(url, outcome)
+        if purge:
+            # 不在批次內重試，下次檢測時使用新的快取
+            self._purge_ytdlp_cache("批次擷取時疑似快取造成的錯誤")
+        return results
+
+    def _probe_error_result(self, url: str, stderr: str) -> ProbeResult:
+        upcoming_in = parse_upcoming_delay(stderr)
+        if upcoming_in is not None:
+            return self._upcoming_result(url, time.time() + upcoming_in)
+        if is_not_live_message(stderr):
+            self.log(f"目前無直播: {url}")
+            return ProbeResult(live_status=LIVE_STATUS_NOT_LIVE)
+        if "members-only" in stderr.lower():
+            self.log(f"偵測到會員直播，但目前 Cookie 沒有權限: {url}")
+        else:
+            self.log(f"檢測直播狀態失敗 ({url}): {stderr[:120]}")
+        return ProbeResult(error=True)
+
+    def _probe_info_result(self, url: str, info: dict[str, Any]) -> ProbeResult:
+        live_status = info.get("live_status")
+        if info.get("channel_id"):
+            channel_id = str(info["channel_id"])
+            if self._channel_ids.get(url) != channel_id:
+                self._channel_ids[url] = channel_id
+                if self.websub and url in self._base_intervals:
+                    self.websub.subscribe(channel_id)
+        if info.get("is_live") is True:
+            self.log(f"偵測到直播（可能包含會員直播）: {url}")
+            return ProbeResult(
+                live=True, info=info, live_status=LIVE_STATUS_LIVE
+            )
+        if live_status == LIVE_STATUS_UPCOMING:
+            release = info.get("release_timestamp")
+            return self._upcoming_result(
+                url, float(release) if isinstance(release, (int, float)) else None
+            )
+        self.log(f"目前無直播: {url}")
+        return ProbeResult(live_status=live_status)
+
+    def _upcoming_result(
+        self, url: str, release_timestamp: Optional[float]
+    ) -> ProbeResult:
+        if release_timestamp:
+            start = datetime.fromtimestamp(release_timestamp)
+            self.log(
+                f"預定直播，預計 {start.strftime('%m-%d %H:%M')} 開始: {url}"
+            )
+        else:
+            self.log(f"預定直播（未公布開始時間）: {url}")
+        return ProbeResult(
+            live_status=LIVE_STATUS_UPCOMING,
+            release_timestamp=release_timestamp,
+        )
+
+    def _write_probe_info(self, info: dict[str, Any]) -> str:
+        """把檢測取得的 info 寫成 --load-info-json 用的暫存檔。"""
+        info_dir = os.path.join(default_cache_root(), "probe-info")
+        os.makedirs(info_dir, exist_ok=True)
+        path = os.path.join(
+            info_dir, f"{info.get('id', 'live')}-{int(time.time())}.info.json"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+        return path
+
+    def record_live_stream(
+        self,
+        url: str,
+        retry_on_cache_error: bool = True,
+        info: Optional[dict[str, Any]] = None,
+        detected_at: Optional[float] = None,
+        part: int = 0,
+        recover_forbidden: bool = True,
+    ) -> bool:
+        """
+        錄製直播（不在日誌顯示進度，只更新狀態列）。回傳是否正常結束。
+
+        info 為檢測時取得的 info dict。預設立刻以 --live-from-start 重新擷取
+        該影片，從開播處錄製；reuse_probe_info 開啟（或串流轉封裝）且網址
+        尚未過期時，改以 --load-info-json 直接開始下載（從目前直播位置開始），
+        省去第二次擷取。
+        detected_at（epoch 秒）用於計算偵測到第一個片段的延遲。
+        part > 0 表示續錄：不從頭下載，輸出到帶 -partN 的新檔案。
+        stream_remux 開啟時由 ffmpeg 即時轉封裝（見 _record_stream_remux），
+        從目前直播位置開始錄製；取不到直播資訊時改用一般錄製。
+        segment_duration > 0 時同樣即時轉封裝，但切成固定長度的段落檔。
+        錄製中遇到 HTTP 403 時更新 Cookie 與串流網址後以退避重試
+        （recover_forbidden=False 則不重試；retry_on_cache_error=False 時
+        不清除 yt-dlp 快取）。--live-from-start 錄製接續寫入同一個輸出；
+        從目前位置錄製則以 --live-from-start 從中斷前的位置下載到新的 -rN
+        檔案，不知道開播時間時從目前位置重新開始並記錄缺口。
+        """
+        if detected_at is None:
+            detected_at = time.time()
+        output_dir = self.download_dir
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            self.log(f"無法建立資料夾: {e}")
+            return False
+
+        suffix = f"-part{part}" if part else ""
+        output_path = os.path.join(
+            output_dir, f"%(title)s-%(id)s{suffix}.%(ext)s"
+        )
+
+        stream = self.stream_remux or self.segment_duration > 0
+        if stream and not find_ffmpeg_executable():
+            self.log("找不到 ffmpeg，無法即時轉封裝，改用一般錄製")
+            stream = False
+
+        # 串流轉封裝本來就從目前位置開始，可以直接重用檢測的 info
+        reuse = info is not None and (self.reuse_probe_info or stream)
+        info_path: Optional[str] = None
+        if reuse and probe_info_is_fresh(info, detected_at):
+            try:
+                info_path = self._write_probe_info(info)
+            except Exception as e:
+                self.log(f"無法寫入檢測資訊，改為重新擷取: {e}")
+        elif reuse:
+            self.log("檢測資訊的串流網址即將過期，重新擷取。")
+        if stream and info_path is None:
+            # 串流轉封裝要先知道標題與 ID 才能命名輸出檔
+            try:
+                info = self._extract_info(
+                    url, timeout=60, priority=PRIORITY_RECORD, fresh=True
+                )
+                info_path = self._write_probe_info(info)
+            except Exception as e:
+                self.log(f"無法取得直播資訊，改用一般錄製: {e}")
+                stream = False
+        stream_base = (
+            os.path.join(
+                output_dir,
+                f"{safe_filename(str(info.get('title') or ''))}"
+                f"-{info.get('id')}{suffix}",
+            )
+            if stream
+            else None
+        )
+
+        # 已知影片 ID 時直接擷取該影片，不必再由頻道的 /live 轉址
+        video_url = (
+            f"https://www.youtube.com/watch?v={info['id']}"
+            if info and info.get("id")
+            else url
+        )
+        if info_path:
+            source_args = ["--load-info-json", info_path]
+            source_url = None
+        elif part:
+            source_args = ["--wait-for-video", "5-60"]
+            source_url = video_url
+        else:
+            source_args = ["--live-from-start", "--wait-for-video", "5-60"]
+            source_url = video_url
+
+        try:
+            command = self._live_record_command(
+                source_args, source_url, "-" if stream else output_path
+            )
+        except FileNotFoundError:
+            self.log("找不到 yt-dlp，可執行檔遺失，無法開始錄製直播。")
+            self.on_error(
+                "錯誤",
+                "找不到內建 yt-dlp。\n\n"
+                "請重新安裝或確認打包時已包含 yt-dlp。",
+            )
+            return False
+
+        self.log("啟動直播錄製...")
+        child: Optional[ChildProcess] = None
+        start_time = time.time()
+        throttle = Throttle(self.progress_interval)
+        first_fragment_seen = False
+        watchdog = StallWatchdog(self.stall_timeout)
+        # 本次 yt-dlp 遇到 HTTP 403 的時間
+        forbidden_at: Optional[float] = None
+        # 重新啟動後等待第一個新進度：(原因, 起點)，用於計算恢復時間
+        recovering: Optional[tuple[str, float]] = None
+        forbidden_attempts = 0
+        # 這場錄製的檔案（依影片 ID 辨識）佔用的磁碟空間
+        disk_meter = DiskUsageMeter(output_dir, self.DISK_SAMPLE_INTERVAL)
+        video_id = str(info.get("id") or "") if info else ""
+        if video_id:
+            disk_meter.watch(f"-{video_id}{suffix}.")
+        if stream:
+            disk_meter.watch(f"-{video_id}{suffix}-")
+        manifest: Optional[SegmentManifest] = None
+        if stream and self.segment_duration > 0:
+            try:
+                manifest = SegmentManifest(
+                    stream_base,
+                    self.stream_container,
+                    self.segment_duration,
+                    video_id,
+                    str(info.get("title") or ""),
+                    url,
+                    os.path.join(default_cache_root(), "segments"),
+                )
+            except OSError as e:
+                self.log(f"無法建立分段清單: {e}")
+                return False
+        ok = False
+        # 最後一次有新資料的時間：到輸出檔完成的時間即為收尾時間
+        last_data_at = time.monotonic()
+        # 第一次有新資料的時間，用來估計輸出檔應有的長度
+        first_data_at: Optional[float] = None
+        # 串流轉封裝時本次 ffmpeg 已寫出的媒體時間，以及各輸出檔的預期長度
+        media_time = 0.0
+        expected_durations: dict[str, float] = {}
+        # 要交給後製的輸出檔（一般錄製由 yt-dlp 的輸出得知最終檔名）
+        outputs: list[str] = []
+        merged_path: Optional[str] = None
+        download_path: Optional[str] = None
+        # 取得的片段編號；串流轉封裝時每次啟動寫到新的檔案，各自追蹤
+        fragments = FormatFragments()
+        fragment_trackers: dict[str, list[FormatFragments]] = {}
+        # 每次啟動都從頭錄製時，片段編號才能對應到直播時間
+        from_start = "--live-from-start" in source_args
+
+        def _on_progress(progress: ProgressUpdate) -> None:
+            nonlocal first_fragment_seen, recovering, forbidden_attempts
+            nonlocal last_data_at, first_data_at, media_time
+            advanced = watchdog.observe(progress)
+            if advanced and progress.status != "finished":
+                last_data_at = time.monotonic()
+                if first_data_at is None:
+                    first_data_at = last_data_at
+            if progress.media_time:
+                media_time = progress.media_time
+            if advanced and recovering is not None:
+                kind, since = recovering
+                recovering = None
+                recovery = time.monotonic() - since
+                if kind == "403":
+                    self.forbidden_recovered += 1
+                    self.forbidden_recovery_times.append(recovery)
+                    forbidden_attempts = 0
+                else:
+                    self.stall_recovery_times.append(recovery)
+                self.log(f"錄製已恢復，中斷到恢復共 {recovery:.1f} 秒")
+            if not first_fragment_seen and (
+                progress.downloaded_bytes
+                or progress.fragment_index
+                or progress.media_time
+            ):
+                first_fragment_seen = True
+                latency = time.time() - detected_at
+                self.first_fragment_latencies.append(latency)
+                self.log(f"偵測到第一個片段的延遲: {latency:.1f} 秒")
+                notified_at = self._websub_notified.pop(url, None)
+                if notified_at is not None:
+                    latency = time.time() - notified_at
+                    self.websub_latencies.append(latency)
+                    self.log(f"WebSub 通知到開始錄製: {latency:.1f} 秒")
+            # 進度不寫日誌，且最多每 progress_interval 秒更新一次
+            if throttle.ready():
+                self.recording_progress[url] = progress
+                elapsed = int(time.time() - start_time)
+                h, rem = divmod(elapsed, 3600)
+                m, s = divmod(rem, 60)
+                self.on_status(
+                    f"錄製中... {h:02d}:{m:02d}:{s:02d} "
+                    f"({progress.describe()})"
+                )
+
+        def _on_line(line: str) -> None:
+            # 在子行程監督執行緒上執行，只做輕量處理
+            nonlocal forbidden_at, video_id, merged_path, download_path
+            progress = parse_progress_line(line)
+            if progress is not None:
+                fragments.observe(progress)
+                # 串流轉封裝時以 ffmpeg 的輸出進度為準
+                if not stream:
+                    _on_progress(progress)
+                return
+
+            if line.startswith("WARNING:") and "Remote components" in line:
+                return
+            if fragments.observe_line(line):
+                self.log(line)
+                return
+
+            # 只記錄重要事件：輸出檔名、合併、錯誤
+            if (
+                line.startswith("[download] Destination:")
+                or line.startswith("[Merger]")
+                or line.startswith("ERROR:")
+            ):
+                self.log(line)
+            if line.startswith("ERROR:"):
+                self.cookie_cache.report_failure(line)
+            if not stream:
+                # 合併後的檔名優先；沒有合併時就是唯一的下載檔
+                match = re.match(
+                    r'\[Merger\] Merging formats into "(.+)"$', line
+                )
+                if match:
+                    merged_path = match.group(1)
+                elif line.startswith("[download] Destination:"):
+                    download_path = line.split(":", 1)[1].strip()
+            if not video_id and line.startswith("[download] Destination:"):
+                match = re.search(
+                    rf"-([\w-]{{11}}){re.escape(suffix)}\.", line
+                )
+                if match:
+                    video_id = match.group(1)
+                    disk_meter.watch(f"-{video_id}{suffix}.")
+
+            if (
+                "HTTP Error 403" in line
+                and "Retrying" not in line
+                and forbidden_at is None
+            ):
+                self.log("偵測到 HTTP 403，準備更新 Cookie 與串流網址後恢復。")
+                self.forbidden_errors += 1
+                forbidden_at = time.monotonic()
+
+        def _collect_output() -> None:
+            """
+            一次 yt-dlp 結束後記下它寫出的檔案（合併後的檔名優先）。
+
+            從目前位置錄製的 yt-dlp 被中斷時只留下 .part（HLS 為單一
+            MPEG-TS）且不會再接續，改名為最終檔名，讓這段內容能播放與後製。
+            """
+            nonlocal merged_path, download_path, first_data_at
+            path = merged_path or download_path
+            merged_path = download_path = None
+            if not path:
+                return
+            if (
+                not os.path.isfile(path)
+                and os.path.isfile(f"{path}.part")
+                and "--live-from-start" not in source_args
+            ):
+                try:
+                    os.replace(f"{path}.part", path)
+                except OSError as e:
+                    self.log(f"無法保留中斷前的錄製內容: {e}")
+            if path in fragment_trackers:
+                return
+            outputs.append(path)
+            fragment_trackers[path] = [fragments]
+            # 從目前位置錄製時，檔案長度應接近實際收到資料的時間；
+            # --live-from-start 會以高於即時的速度下載，無法估計
+            if (
+                first_data_at is not None
+                and "--live-from-start" not in source_args
+            ):
+                expected_durations[path] = last_data_at - first_data_at
+            first_data_at = None
+
+        def _restart_output(
+            reason: str, resume_at: Optional[float] = None
+        ) -> None:
+            """
+            準備重新啟動。--live-from-start 錄製時 yt-dlp 依 .part / .ytdl
+            從最後完成的片段接續；從目前位置錄製無法接續，改寫到新的 -rN
+            檔案並記錄缺口，不讓中斷的部分看起來是連續的。
+            resume_at（直播開始後的秒數）已知時改以 --live-from-start
+            從該處下載，不留缺口。
+            """
+            nonlocal output_path, command, fragments, source_args, source_url
+            if "--live-from-start" in source_args and not stream:
+                return
+            if resume_at is not None and not stream:
+                self.log(
+                    f"{reason}後改從直播開始後 {resume_at:.0f} 秒處重新下載"
+                )
+                _collect_output()
+                source_args = [
+                    "--live-from-start",
+                    "--download-sections",
+                    f"*{resume_at:.3f}-inf",
+                    "--wait-for-video",
+                    "5-60",
+                ]
+                source_url = video_url
+            else:
+                gap = time.monotonic() - last_data_at
+                self.restart_gaps.append(gap)
+                self.log(
+                    f"{reason}後無法從中斷處接續，從目前直播位置重新開始，"
+                    f"約缺少 {gap:.0f} 秒"
+                )
+                if stream:
+                    return
+                _collect_output()
+            fragments = FormatFragments()
+            output_path = os.path.join(
+                output_dir, f"%(title)s-%(id)s{suffix}-r{attempts}.%(ext)s"
+            )
+            command = self._live_record_command(
+                source_args, source_url, output_path
+            )
+
+        def _on_tick(proc: ChildProcess) -> None:
+            disk_meter.sample()
+            # 403 後 yt-dlp 會略過拿不到的片段繼續下載，立刻停止以免漏片段
+            if forbidden_at is not None and recover_forbidden:
+                proc.terminate()
+                return
+            if watchdog.check():
+                self.stall_count += 1
+                self.log(
+                    f"超過 {int(self.stall_timeout)} 秒沒有錄製進度，"
+                    "停止 yt-dlp 準備重新啟動"
+                )
+                proc.terminate()
+
+        try:
+            stall_restarts = 0
+            attempts = 0
+            while True:
+                forbidden_at = None
+                if not self._acquire_ytdlp_slot(
+                    url, PRIORITY_RECORD, self.stop_event
+                ):
+                    return False
+                if stream:
+                    # 重新啟動時寫到新的 -rN 檔案（分段時段號接續），
+                    # 已完成的檔案保持完整
+                    output_file = (
+                        f"{stream_base}{f'-r{attempts}' if attempts else ''}"
+                        f".{self.stream_container}"
+                    )
+                    if manifest is None:
+                        outputs.append(output_file)
+                    fragments = FormatFragments()
+                    fragment_trackers.setdefault(
+                        manifest.path if manifest else output_file, []
+                    ).append(fragments)
+                    media_time = 0.0
+                    child, returncode = self._record_stream_remux(
+                        command,
+                        output_file,
+                        _on_line,
+                        _on_tick,
+                        _on_progress,
+                        disk_meter,
+                        manifest,
+                    )
+                    if media_time:
+                        expected_durations[output_file] = media_time
+                else:
+                    # stop_event 設定後由監督執行緒立即結束 yt-dlp，
+                    # 不必等下一行輸出
+                    child = self.process_supervisor.spawn(
+                        command,
+                        _on_line,
+                        stop_event=self.stop_event,
+                        on_tick=_on_tick,
+                    )
+                    returncode = child.wait()
+                attempts += 1
+                self.ytdlp_cache.observe()
+                if self.stop_event.is_set() or returncode == 0:
+                    break
+
+                if forbidden_at is not None and recover_forbidden:
+                    if forbidden_attempts >= self.FORBIDDEN_MAX_RETRIES:
+                        self.forbidden_give_ups += 1
+                        self.log(
+                            f"HTTP 403 已連續恢復 {forbidden_attempts} 次仍失敗，"
+                            f"放棄: {url}"
+                        )
+                        break
+                    if recovering is None:
+                        recovering = ("403", forbidden_at)
+                    forbidden_attempts += 1
+                    self.forbidden_recoveries += 1
+                    delay = min(
+                        self.FORBIDDEN_BACKOFF_MAX,
+                        self.FORBIDDEN_BACKOFF_BASE
+                        * 2 ** (forbidden_attempts - 1),
+                    )
+                    self.log(
+                        f"{delay} 秒後進行第 {forbidden_attempts} 次 403 恢復: {url}"
+                    )
+                    if self.stop_event.wait(delay):
+                        break
+                    # 從目前位置錄製無法接續，改從中斷前的直播時間點下載，
+                    # 不必再擷取新的 info
+                    live_edge = "--live-from-start" not in source_args
+                    resume_at = (
+                        self._live_resume_offset(info, last_data_at)
+                        if live_edge and not stream
+                        else None
+                    )
+                    source_args, source_url, info_path = (
+                        self._refresh_after_forbidden(
+                            video_url,
+                            info_path,
+                            source_args,
+                            source_url,
+                            reextract=resume_at is None,
+                            purge_cache=retry_on_cache_error,
+                        )
+                    )
+                    # 重新組合命令以使用新匯出的 Cookie；--live-from-start
+                    # 錄製時輸出檔名不變，yt-dlp 依 .part / .ytdl 紀錄接續
+                    # 已下載的片段
+                    command = self._live_record_command(
+                        source_args, source_url, "-" if stream else output_path
+                    )
+                    if live_edge:
+                        _restart_output("HTTP 403", resume_at)
+                    from_start = (
+                        from_start and "--live-from-start" in source_args
+                    )
+                    watchdog = StallWatchdog(self.stall_timeout, armed=True)
+                    continue
+
+                if watchdog.stalled_at is not None:
+                    if stall_restarts >= self.STALL_MAX_RESTARTS:
+                        self.stall_give_ups += 1
+                        self.log(
+                            f"錄製停滯已重新啟動 {stall_restarts} 次，放棄: {url}"
+                        )
+                        break
+                    stall_restarts += 1
+                    self.stall_restarts += 1
+                    if recovering is None:
+                        recovering = ("stall", watchdog.stalled_at)
+                    _restart_output("錄製停滯")
+                    watchdog = StallWatchdog(self.stall_timeout, armed=True)
+                    self.log(f"重新啟動錄製（第 {stall_restarts} 次）: {url}")
+                    continue
+                break
+
+            if child.stopped and self.stop_event.is_set():
+                self.log("使用者要求停止錄製。")
+            if returncode == 0:
+                self._record_output_measurement(
+                    disk_meter,
+                    time.monotonic() - last_data_at,
+                    "分段輸出"
+                    if manifest
+                    else "即時轉封裝"
+                    if stream
+                    else "下載後合併",
+                )
+                self.log("錄製完成。")
+                ok = True
+                return True
+            elif not self.stop_event.is_set():
+                self.log(f"錄製結束，返回碼: {returncode}")
+            return False
+        except Exception as e:
+            self.log(f"錄製錯誤: {e}")
+            return False
+        finally:
+            if child is not None and not child.done:
+                child.terminate()
+                child.wait()
+            self.recording_progress.pop(url, None)
+            self._websub_notified.pop(url, None)
+            if manifest is not None:
+                self._finish_manifest(manifest, ok)
+            if not stream:
+                _collect_output()
+            self._report_fragment_gaps(
+                fragment_trackers, video_id, mappable=not stream and from_start
+            )
+            # 中斷的錄製已寫出的部分也照常後製；一般錄製未完成時只有 .part
+            for path in outputs:
+                if os.path.isfile(path) and os.path.getsize(path) > 0:
+                    self._postprocess(
+                        path,
+                        remux=stream,
+                        video_id=video_id,
+                        expected=expected_durations.get(path),
+                    )
+            if info_path:
+                try:
+                    os.remove(info_path)
+                except OSError:
+                    pass
+
+    def _live_record_command(
+        self,
+        source_args: list[str],
+        source_url: Optional[str],
+        output_path: str,
+    ) -> list[str]:
+        """
+        錄製直播用的 yt-dlp 命令列（每次呼叫都取得目前的 Cookie 檔）。
+
+        output_path 為 "-" 時 yt-dlp 把影音合成 MPEG-TS 寫到 stdout，
+        訊息與進度改寫到 stderr。
+        """
+        merge_args = (
+            [] if output_path == "-" else ["--merge-output-format", "mp4"]
+        )
+        # 移除 --concurrent-fragments 與 --no-part，避免大量 .part 檔
+        return self._build_ytdlp_command(
+            self._base_ytdlp_args()
+            + source_args
+            + ["-f", self.LIVE_FORMAT]
+            + merge_args
+            + [
+                "--hls-use-mpegts",
+                "--newline",
+                "--progress",
+            ]
+            + progress_template_args()
+            + [
+                "-o",
+                output_path,
+            ],
+            source_url,
+        )
+
+    def _record_stream_remux(
+        self,
+        command: list[str],
+        output_file: str,
+        on_line: Callable[[str], None],
+        on_tick: Callable[[ChildProcess], None],
+        on_progress: Callable[[ProgressUpdate], None],
+        disk_meter: DiskUsageMeter,
+        manifest: Optional[SegmentManifest] = None,
+    ) -> tuple[ChildProcess, int]:
+        """
+        yt-dlp 把合併好的 MPEG-TS 寫進管線，ffmpeg 同時以 -c copy 轉封裝成
+        output_file，資料只寫入磁碟一次。回傳 (yt-dlp 子行程, 返回碼)。
+        有 manifest 時改以 segment muxer 切成段落檔並更新清單。
+
+        yt-dlp 結束後 ffmpeg 讀到 EOF 就寫完檔案；yt-dlp 是被停止的，
+        或 ffmpeg 超過 STREAM_FINALIZE_TIMEOUT 秒仍未結束（例如 yt-dlp 的
+        ffmpeg 孫行程還握著管線），就要求 ffmpeg 結束，它仍會正常收尾。
+        """
+        ffmpeg = find_ffmpeg_executable()
+        if not ffmpeg:
+            raise FileNotFoundError("找不到 ffmpeg，無法即時轉封裝")
+        remux_command = (
+            [
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "warning",
+                "-nostats",
+                "-progress",
+                "pipe:1",
+                "-i",
+                "pipe:0",
+                "-map",
+                "0:v?",
+                "-map",
+                "0:a?",
+                "-c",
+                "copy",
+            ]
+            + self._remux_output_args(output_file, manifest)
+        )
+        parser = FfmpegProgressParser()
+        warnings = 0
+
+        def _on_remux_line(line: str) -> None:
+            nonlocal warnings
+            progress = parser.feed(line)
+            if progress is not None:
+                on_progress(progress)
+            elif not parser.is_progress_line(line) and warnings < 20:
+                # 損壞的封包等警告可能連續出現，只記錄前幾行
+                warnings += 1
+                self.log(f"[ffmpeg] {line}")
+
+        def _on_remux_tick(proc: ChildProcess) -> None:
+            disk_meter.sample()
+            if manifest is not None:
+                for segment in manifest.poll():
+                    self._on_segment_complete(manifest, segment)
+
+        read_fd, write_fd = os.pipe()
+        try:
+            remux = self.process_supervisor.spawn(
+                remux_command,
+                _on_remux_line,
+                stop_event=self.stop_event,
+                on_tick=_on_remux_tick,
+                stdin=read_fd,
+            )
+            try:
+                child = self.process_supervisor.spawn(
+                    command,
+                    on_line,
+                    stop_event=self.stop_event,
+                    on_tick=on_tick,
+                    stdout=write_fd,
+                )
+            except OSError:
+                remux.terminate()
+                remux.wait()
+                raise
+        finally:
+            # 子行程各自持有一端；父行程不關閉的話 ffmpeg 永遠等不到 EOF
+            os.close(read_fd)
+            os.close(write_fd)
+        if manifest is None:
+            self.log(f"即時轉封裝到: {output_file}")
+        else:
+            self.log(
+                f"分段輸出到: {manifest.base}-seg*.{manifest.container}"
+                f"（每段 {manifest.segment_duration:g} 秒）"
+            )
+
+        returncode = child.wait()
+        if child.stopped:
+            remux.terminate()
+        remux_returncode = remux.wait(self.STREAM_FINALIZE_TIMEOUT)
+        if remux_returncode is None:
+            self.log(
+                f"ffmpeg 在 yt-dlp 結束 {self.STREAM_FINALIZE_TIMEOUT} 秒後"
+                "仍未結束，要求它收尾"
+            )
+            remux.terminate()
+            remux_returncode = remux.wait()
+        if returncode == 0 and remux_returncode != 0 and not remux.stopped:
+            self.log(f"ffmpeg 轉封裝失敗，返回碼: {remux_returncode}")
+            returncode = remux_returncode
+        return child, returncode
+
+    def _remux_output_args(
+        self, output_file: str, manifest: Optional[SegmentManifest]
+    ) -> list[str]:
+        """ffmpeg 的輸出參數：單一檔案，或依 manifest 切段。"""
+        muxer, options = STREAM_FORMATS[self.stream_container]
+        if manifest is None:
+            args = ["-f", muxer]
+            for key, value in options.items():
+                args += [f"-{key}", value]
+            return args + ["-y", output_file]
+        args = [
+            "-f",
+            "segment",
+            "-segment_time",
+            str(manifest.segment_duration),
+            "-segment_format",
+            muxer,
+            "-reset_timestamps",
+            "1",
+            "-segment_start_number",
+            str(manifest.next_index),
+            "-segment_list",
+            manifest.begin_run(),
+            "-segment_list_type",
+            "csv",
+        ]
+        if options:
+            args += [
+                "-segment_format_options",
+                ":".join(f"{key}={value}" for key, value in options.items()),
+            ]
+        return args + ["-y", manifest.output_pattern]
+
+    def _on_segment_complete(
+        self, manifest: SegmentManifest, segment: Segment
+    ) -> None:
+        """一個段落檔寫完；通常在子行程監督執行緒上呼叫，需保持快速。"""
+        self.segments_completed += 1
+        self.log(
+            f"分段完成: {segment.file}（{segment.duration:.0f} 秒，"
+            f"{format_bytes(segment.size)}）"
+        )
+        self._postprocess(
+            os.path.join(manifest.directory, segment.file),
+            remux=True,
+            video_id=manifest.video_id,
+            expected=segment.duration,
+        )
+
+    def _postprocess(
+        self,
+        path: str,
+        remux: bool = False,
+        video_id: str = "",
+        expected: Optional[float] = None,
+    ) -> None:
+        """
+        把完成的輸出檔交給後製行程池：（轉封裝 →）完整性檢查 → 縮圖，
+        同時交給驗證 worker 完整讀過一次。
+
+        remux 表示檔案是即時轉封裝的 fragmented MP4，postprocess_remux
+        開啟時先轉成一般 MP4。expected 為預期長度（秒），None 表示不檢查。
+        """
+        processor = self.postprocessor
+        verifier = self.verifier
+        if processor is None and verifier is None:
+            return
+        ffmpeg = find_ffmpeg_executable()
+        ffprobe = find_ffmpeg_executable("ffprobe")
+        if not ffmpeg or not ffprobe:
+            if not self._postprocess_warned:
+                self._postprocess_warned = True
+                self.log("找不到 ffmpeg / ffprobe，略過後製")
+            return
+        name = os.path.basename(path)
+
+        def _probe(job: Optional[PostJob] = None) -> None:
+            if job is not None and not job.ok:
+                self.log(f"轉封裝失敗，保留原檔: {name} {job.result['error']}")
+            if processor is not None:
+                processor.submit(JOB_PROBE, ffprobe, path, on_done=_after_probe)
+            if verifier is not None:
+                verifier.submit(
+                    JOB_VERIFY,
+                    ffprobe,
+                    path,
+                    expected,
+                    self.VERIFY_GAP_THRESHOLD,
+                    on_done=_after_verify,
+                )
+
+        def _after_probe(job: PostJob) -> None:
+            if not job.ok:
+                self.log(
+                    f"完整性檢查未通過: {name} {job.result.get('error') or ''}"
+                )
+                return
+            if self.thumbnails:
+                processor.submit(
+                    JOB_THUMBNAIL,
+                    ffmpeg,
+                    path,
+                    (job.result["duration"] or 0) / 2,
+                    on_done=_after_thumbnail,
+                )
+
+        def _after_thumbnail(job: PostJob) -> None:
+            if not job.ok:
+                self.log(f"無法擷取縮圖: {name} {job.result['error']}")
+
+        def _after_verify(job: PostJob) -> None:
+            result = job.result or {}
+            verdict = result.get("verdict")
+            if verdict is None:
+                # ffprobe 無法執行或逾時等，不代表檔案有問題
+                self.log(f"無法驗證: {name} {result.get('error') or ''}")
+                return
+            try:
+                self.recording_index.record_verification(path, video_id, result)
+            except Exception as e:
+                self.log(f"無法寫入驗證結果: {e}")
+            if verdict == VERDICT_OK:
+                return
+            issues = "、".join(result["issues"])
+            if result["needs_refetch"]:
+                self.log(f"驗證未通過，需要重新下載: {name}（{issues}）")
+            elif verdict == VERDICT_WARNING:
+                self.log(
+                    f"驗證有警告: {name}（{issues}，缺口 {result['gaps']} 處 / "
+                    f"{result['gap_seconds']} 秒）"
+                )
+
+        if (
+            processor is not None
+            and remux
+            and self.postprocess_remux
+            and path.endswith(".mp4")
+        ):
+            processor.submit(JOB_REMUX, ffmpeg, path, on_done=_probe)
+        else:
+            _probe()
+
+    def _report_fragment_gaps(
+        self,
+        trackers: dict[str, list[FormatFragments]],
+        video_id: str,
+        mappable: bool,
+    ) -> None:
+        """記錄每個輸出缺少的片段；能對應到直播時間的缺口排入補抓。"""
+        for path, items in trackers.items():
+            if not any(tracker.highest for tracker in items):
+                continue
+            self.fragment_outputs += 1
+            # 同一個輸出續錄（--live-from-start 接續）時片段編號相同，合併計算
+            runs = merge_fragment_runs(
+                run for tracker in items for run in tracker.missing_runs()
+            )
+            if not runs:
+                continue
+            count = sum(last - first + 1 for first, last in runs)
+            self.fragment_gap_outputs += 1
+            self.fragment_gaps += count
+            state = BACKFILL_PENDING if mappable else BACKFILL_UNMAPPABLE
+            backfill = (
+                state == BACKFILL_PENDING
+                and self.backfiller is not None
+                and bool(video_id)
+                and os.path.isfile(path)
+            )
+            self.log(
+                f"片段缺口: {os.path.basename(path)} 缺少 {count} 個片段"
+                f"（第 {describe_fragment_runs(runs)} 個）"
+                + ("，稍後補抓" if backfill else "")
+            )
+            if not video_id:
+                continue
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            try:
+                self.recording_index.record_fragment_gaps(
+                    path, video_id, url, runs, state
+                )
+            except Exception as e:
+                self.log(f"無法寫入片段缺口: {e}")
+            if backfill:
+                self.backfiller.schedule(
+                    BackfillTask(path, video_id, url, runs),
+                    self.BACKFILL_DELAY,
+                )
+
+    def _run_backfill(self, task: BackfillTask) -> str:
+        """
+        在補抓執行緒上補一個檔案的缺口：找出缺口位置 → 下載缺少的
+        時間範圍 → 接回原檔。回傳補抓狀態（BACKFILL_PENDING 表示稍後重試）。
+        """
+        name = os.path.basename(task.path)
+        if not os.path.isfile(task.path):
+            self.log(f"補抓略過，檔案已不存在: {name}")
+            return BACKFILL_FAILED
+        ffmpeg = find_ffmpeg_executable()
+        ffprobe = find_ffmpeg_executable("ffprobe")
+        if not ffmpeg or not ffprobe:
+            self.log(f"找不到 ffmpeg / ffprobe，無法補抓: {name}")
+            return BACKFILL_FAILED
+
+        # 片段編號只說明缺了多少；接回的位置以檔案實際的時間戳記缺口為準
+        result = self._wait_post_job(
+            JOB_VERIFY, ffprobe, task.path, None, self.VERIFY_GAP_THRESHOLD
+        )
+        if result is None or "gap_ranges" not in result:
+            return BACKFILL_PENDING
+        ranges = result["gap_ranges"]
+        if not ranges:
+            self.log(f"補抓略過，檔案中找不到時間戳記缺口: {name}")
+            return BACKFILL_FAILED
+
+        self.log(
+            f"開始補抓: {name}（{task.gap_fragments} 個片段，"
+            f"{len(ranges)} 處缺口，第 {task.attempts + 1} 次）"
+        )
+        root = os.path.splitext(task.path)[0]
+        patches: list[tuple[float, float, str]] = []
+        for number, (start, end) in enumerate(ranges):
+            patch = f"{root}.backfill{number}.mp4"
+            patches.append((start, end, patch))
+            if not self._download_section(task.url, start, end, patch):
+                self._remove_files([patch for _, _, patch in patches])
+                return BACKFILL_PENDING
+
+        result = self._wait_post_job(JOB_SPLICE, ffmpeg, task.path, patches)
+        if result is None or not result.get("ok"):
+            if result is not None:
+                self.log(f"無法接回補抓的片段: {name} {result.get('error')}")
+            self._remove_files([patch for _, _, patch in patches])
+            return BACKFILL_PENDING
+        self.log(f"補抓完成: {name}（接回 {len(patches)} 處）")
+        # 重新檢查、驗證並更新縮圖
+        self._postprocess(task.path, video_id=task.video_id)
+        return BACKFILL_DONE
+
+    def _on_backfill_state(self, task: BackfillTask, state: str) -> None:
+        # 直接失敗的原因已由 _run_backfill 記錄，這裡只記錄重試用完的情況
+        if state == BACKFILL_FAILED and task.attempts:
+            self.log(
+                f"補抓失敗，放棄: {os.path.basename(task.path)}"
+                f"（已嘗試 {task.attempts} 次）"
+            )
+        elif state == BACKFILL_PENDING:
+            self.log(
+                f"{self.BACKFILL_RETRY_DELAY} 秒後重試補抓: "
+                f"{os.path.basename(task.path)}"
+            )
+        self.recording_index.update_backfill(task.path, state, task.attempts)
+
+    def _download_section(
+        self, url: str, start: float, end: float, output: str
+    ) -> bool:
+        """以 yt-dlp 下載直播（或結束後的存檔）的一段時間範圍。"""
+        stop_event = self.backfiller.stop_event
+        if not self._acquire_ytdlp_slot(url, PRIORITY_BACKGROUND, stop_event):
+            return False
+        try:
+            # 仍在直播時從 DVR 取得（--live-from-start），結束後使用存檔
+            command = self._build_ytdlp_command(
+                self._base_ytdlp_args()
+                + [
+                    "--live-from-start",
+                    "-f",
+                    self.LIVE_FORMAT,
+                    "--merge-output-format",
+                    "mp4",
+                    "--download-sections",
+                    f"*{start:.3f}-{end:.3f}",
+                    "--newline",
+                    "--no-progress",
+                    "-o",
+                    output,
+                ],
+                url,
+            )
+        except FileNotFoundError:
+            self.log("找不到 yt-dlp，無法補抓")
+            return False
+        errors: list[str] = []
+
+        def _on_line(line: str) -> None:
+            if line.startswith("ERROR:"):
+                errors.append(line)
+
+        returncode = self.process_supervisor.spawn(
+            command, _on_line, stop_event=stop_event
+        ).wait()
+        if returncode != 0 or not os.path.isfile(output):
+            if not stop_event.is_set():
+                self.log(
+                    f"補抓下載失敗（{start:.0f}–{end:.0f} 秒）: "
+                    f"{errors[-1] if errors else f'返回碼 {returncode}'}"
+                )
+            return False
+        return True
+
+    def _wait_post_job(
+        self, kind: str, executable: str, path: str, *args: Any
+    ) -> Optional[dict[str, Any]]:
+        """在補抓執行緒上等候一個後製工作；停止補抓時回傳 None。"""
+        done = threading.Event()
+        results: list[dict[str, Any]] = []
+
+        def _on_done(job: PostJob) -> None:
+            results.append(job.result)
+            done.set()
+
+        if (
+            self.postprocessor.submit(
+                kind, executable, path, *args, on_done=_on_done
+            )
+            is None
+        ):
+            return None
+        while not done.wait(1.0):
+            if self.backfiller.stop_event.is_set():
+                return None
+        return results[0]
+
+    @staticmethod
+    def _remove_files(paths: list[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _finish_manifest(self, manifest: SegmentManifest, ok: bool) -> None:
+        if ok:
+            state = STATE_COMPLETED
+        elif self.stop_event.is_set():
+            state = STATE_INTERRUPTED
+        else:
+            state = STATE_FAILED
+        try:
+            for segment in manifest.finish(state):
+                self._on_segment_complete(manifest, segment)
+        except OSError as e:
+            self.log(f"無法更新分段清單: {e}")
+            return
+        self.log(
+            f"分段清單: {manifest.path}（{len(manifest.segments)} 段，"
+            f"共 {manifest.total_duration():.0f} 秒）"
+        )
+
+    def _record_output_measurement(
+        self, disk_meter: DiskUsageMeter, finalize: float, mode: str
+    ) -> None:
+        """記錄正常結束的錄製的磁碟用量峰值與收尾時間（最後一筆資料 → 檔案完成）。"""
+        final_size = disk_meter.sample(force=True)
+        if not disk_meter.tokens:
+            return
+        self.output_measurements.append(
+            (disk_meter.peak, final_size, finalize)
+        )
+        self.log(
+            f"{mode}：收尾 {finalize:.1f} 秒，"
+            f"磁碟用量峰值 {format_bytes(disk_meter.peak)}"
+            f"（最終檔案 {format_bytes(final_size)}）"
+        )
+
+    def _refresh_after_forbidden(
+        self,
+        url: str,
+        info_path: Optional[str],
+        source_args: list[str],
+        source_url: Optional[str],
+        reextract: bool = True,
+        purge_cache: bool = True,
+    ) -> tuple[list[str], Optional[str], Optional[str]]:
+        """
+        403 後更新 Cookie、yt-dlp 快取與串流網址。url 為影片網址。
+
+        回傳新的 (source_args, source_url, info_path)。以 --load-info-json
+        錄製時重新擷取並寫入新的 info（換上新的格式網址）；擷取失敗則改由
+        yt-dlp 自行擷取。直接以網址錄製時 yt-dlp 重新啟動就會重新擷取。
+        reextract=False 表示呼叫端會改用其他來源，只移除舊的 info。
+        """
+        self.cookie_cache.invalidate("錄製時 HTTP 403")
+        if purge_cache:
+            self._purge_ytdlp_cache("錄製時發生 HTTP 403")
+        if not info_path:
+            return source_args, source_url, None
+
+        try:
+            os.remove(info_path)
+        except OSError:
+            pass
+        if not reextract:
+            return source_args, source_url, None
+        try:
+            fresh = self._extract_info(
+                url, timeout=60, priority=PRIORITY_RECORD, fresh=True
+            )
+            new_path = self._write_probe_info(fresh)
+            return ["--load-info-json", new_path], None, new_path
+        except Exception as e:
+            self.log(f"重新擷取串流網址失敗，改由 yt-dlp 自行擷取: {e}")
+            return ["--wait-for-video", "5-60"], url, None
+
+    def _live_resume_offset(
+        self, info: Optional[dict[str, Any]], last_data_at: float
+    ) -> Optional[float]:
+        """
+        把最後收到資料的時間（monotonic）換算成直播開始後的秒數，
+        往前多取 FORBIDDEN_RESUME_MARGIN 秒；不知道開播時間則回傳 None。
+        """
+        started = (info or {}).get("release_timestamp")
+        if not isinstance(started, (int, float)) or started <= 0:
+            return None
+        last_data = time.time() - (time.monotonic() - last_data_at)
+        return max(0.0, last_data - started - self.FORBIDDEN_RESUME_MARGIN)
+
+    # ------------------------------------------------------------------
+    # 多頻道監控
+    # ------------------------------------------------------------------
+
+    @property
+    def is_monitoring(self) -> bool:
+        return self.monitor_thread is not None and self.monitor_thread.is_alive()
+
+    def start_monitoring(
+        self,
+        channels: list[tuple[str, float]],
+        max_probes: int = 8,
+        max_records: int = 2,
+        adaptive: bool = True,
+        probe_budget: Optional[float] = None,
+    ) -> None:
+        """
+        開始在背景執行緒監控 channels（[(網址, 檢測間隔秒數), ...]）。
+
+        adaptive=True 時依預定直播時間與閒置情況調整檢測間隔
+        （見 ChannelScheduler），False 則固定使用設定的間隔。
+        有足夠開播歷史的頻道另依歷史時段分配檢測頻率（見 CadencePlanner）；
+        probe_budget 為所有頻道每小時的檢測次數上限，預設等於以設定間隔
+        固定檢測的用量。
+        """
+        if self.is_monitoring:
+            return
+        self.stop_event.clear()
+        self.recording_pool = RecordingPool(max_workers=max_records, log=self.log)
+        self._base_intervals = dict(channels)
+        self.cadence_planner = None
+        if adaptive:
+            budget = probe_budget or sum(
+                3600.0 / interval for _, interval in channels
+            )
+            self.cadence_planner = CadencePlanner(self.channel_history, budget)
+            self.cadence_planner.set_channels(dict(channels))
+        self.scheduler = ChannelScheduler(
+            probe=self.probe_channel,
+            on_live=self._on_channel_live,
+            max_concurrency=max_probes,
+            log=self.log,
+            on_wait=self._on_scheduler_wait,
+            adaptive=adaptive,
+            cadence=(
+                self.cadence_planner.delay if self.cadence_planner else None
+            ),
+            probe_batch=self.probe_channels,
+            batch_size=self.probe_batch_size,
+        )
+        for url, interval in channels:
+            self.scheduler.add_channel(url, self._poll_interval(url))
+            channel_id = self._channel_ids.get(url)
+            if self.websub and channel_id:
+                self.websub.subscribe(channel_id)
+        self.log(
+            f"開始監控 {len(channels)} 個頻道 "
+            f"(同時檢測上限: {max_probes}, 同時錄製上限: {max_records})"
+        )
+        self._check_probe_rate(channels)
+        self.monitor_thread = threading.Thread(
+            target=self.monitor_loop,
+            daemon=True,
+        )
+        self.monitor_thread.start()
+
+    def _check_probe_rate(self, channels: list[tuple[str, float]]) -> None:
+        """
+        以設定的間隔檢測所有頻道所需的 yt-dlp 呼叫次數超過限流上限時警告。
+        限流不會隨頻道數調整，頻道多時須調高每分鐘上限或拉長檢測間隔，
+        否則檢測都在限流佇列中等待，實際間隔遠長於設定。
+        """
+        demand = sum(60.0 / max(1.0, interval) for _, interval in channels)
+        limit = min(
+            per_minute for per_minute, _ in self.rate_limiter.rates.values()
+        )
+        if demand > limit:
+            self.log(
+                f"以設定的間隔檢測 {len(channels)} 個頻道每分鐘最多需要"
+                f"約 {demand:.0f} 次 yt-dlp 呼叫，超過限流上限（每分鐘 "
+                f"{limit:g} 次）；請調高 rate_limit_per_minute 與 "
+                "account_rate_limit_per_minute，或拉長檢測間隔"
+            )
+
+    def stop_monitoring(self) -> None:
+        self.stop_event.set()
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.recording_pool:
+            self.recording_pool.shutdown()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """等待監控執行緒結束。"""
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout)
+
+    def monitor_loop(self) -> None:
+        """主監控迴圈：執行多頻道排程器直到停止。"""
+        try:
+            if self.scheduler:
+                self.scheduler.run()
+        except Exception as e:
+            self.log(f"監控迴圈錯誤: {e}")
+
+        self.log("監控已停止。")
+        self.on_status("就緒")
+
+    def enable_websub(
+        self,
+        callback_url: str,
+        listen_host: str = "127.0.0.1",
+        listen_port: int = 8765,
+        hub_url: str = HUB_URL,
+        secret: Optional[str] = None,
+    ) -> None:
+        """
+        啟動 WebSub 回呼伺服器（見 WebSubReceiver）。
+
+        頻道第一次完整檢測取得 channel ID 後即向 hub 訂閱；收到通知時
+        立即檢測該頻道。訂閱生效期間輪詢間隔放大 WEBSUB_POLL_FACTOR 倍。
+        無法開啟連接埠時丟 OSError。
+        """
+        if self.websub is not None:
+            return
+        self.websub = WebSubReceiver(
+            callback_url,
+            on_notify=self._on_websub_notify,
+            listen_host=listen_host,
+            listen_port=listen_port,
+            hub_url=hub_url,
+            secret=secret,
+            on_state=self._on_websub_state,
+            log=self.log,
+        )
+        self.log(
+            f"WebSub 回呼伺服器已啟動（{listen_host}:{self.websub.listen_port}）: "
+            f"{callback_url}"
+        )
+        for url, channel_id in list(self._channel_ids.items()):
+            if url in self._base_intervals:
+                self.websub.subscribe(channel_id)
+
+    def _channel_urls(self, channel_id: str) -> list[str]:
+        """監控中、屬於 channel_id 的頻道網址。"""
+        return [
+            url
+            for url, cid in list(self._channel_ids.items())
+            if cid == channel_id and url in self._base_intervals
+        ]
+
+    def _poll_interval(self, url: str) -> float:
+        interval = self._base_intervals[url]
+        channel_id = self._channel_ids.get(url)
+        if self.websub and channel_id and self.websub.is_active(channel_id):
+            return interval * self.WEBSUB_POLL_FACTOR
+        return interval
+
+    def _on_websub_notify(
+        self, channel_id: str, video_id: str, received_at: float
+    ) -> None:
+        for url in self._channel_urls(channel_id):
+            self._websub_notified[url] = received_at
+            # 通知代表 feed 已變更，下一次檢測直接做完整擷取且不用快取
+            self._last_full_probe.pop(url, None)
+            self.extract_cache.invalidate(url)
+            scheduler = self.scheduler
+            if scheduler and scheduler.probe_now(url):
+                self.websub_triggers += 1
+                self.log(f"收到 WebSub 通知（{video_id}），立即檢測: {url}")
+
+    def _on_websub_state(self, channel_id: str, active: bool) -> None:
+        scheduler = self.scheduler
+        if scheduler is None:
+            return
+        for url in self._channel_urls(channel_id):
+            scheduler.add_channel(url, self._poll_interval(url))
+
+    def _on_scheduler_wait(self, seconds: float) -> None:
+        self.on_status(f"等待下次檢測... 剩餘 {int(seconds)} 秒")
+
+    def _on_channel_live(self, channel: ChannelState) -> None:
+        """偵測到直播：交給錄製 worker 池，結束後冷卻再恢復檢測。"""
+
+        info, detected_at = channel.live_info, channel.live_detected_at
+        channel.live_info = None
+        if info and info.get("id"):
+            self._record_live_start(channel.url, info, detected_at)
+
+        def _record() -> None:
+            video_id = str(info.get("id") or "") if info else ""
+            part = 0
+            if video_id:
+                decision = self.recording_index.begin(
+                    video_id, channel.url, str(info.get("title") or "")
+                )
+                if decision.action == ACTION_SKIP:
+                    self.log(f"此直播已在錄製中，略過: {video_id}")
+                    return
+                if decision.action == ACTION_APPEND:
+                    part = decision.part
+                    self.log(
+                        f"此直播先前已錄製（{decision.previous_state}），"
+                        f"從目前位置續錄第 {part} 段: {video_id}"
+                    )
+
+            self.log(f"確認到直播信號，準備開始錄製: {channel.url}")
+            ok = False
+            try:
+                ok = self.record_live_stream(
+                    channel.url, info=info, detected_at=detected_at, part=part
+                )
+            finally:
+                if video_id:
+                    if ok:
+                        state = STATE_COMPLETED
+                    elif self.stop_event.is_set():
+                        state = STATE_INTERRUPTED
+                    else:
+                        state = STATE_FAILED
+                    self.recording_index.finish(video_id, state)
+                self.log(
+                    f"錄製結束，冷卻 {self.RECORD_COOLDOWN} 秒: {channel.url}"
+                )
+
+        def _done() -> None:
+            if self.scheduler:
+                self.scheduler.resume(channel.url, delay=self.RECORD_COOLDOWN)
+
+        pool = self.recording_pool
+        key = str(info.get("id") or channel.url) if info else channel.url
+        if pool is None or not pool.submit(key, channel.url, _record, _done):
+            self.log(f"錄製佇列已滿或已在錄製，稍後再檢測: {channel.url}")
+            if self.scheduler:
+                self.scheduler.resume(channel.url, delay=channel.interval)
+            return
+        if pool.queue_depth():
+            self.log(
+                f"錄製名額已滿，加入等候佇列（第 {pool.queue_depth()} 位）: "
+                f"{channel.url}"
+            )
+
+    def _record_live_start(
+        self, url: str, info: dict[str, Any], detected_at: Optional[float]
+    ) -> None:
+        """記錄開播時間：優先使用 YouTube 提供的實際開始時間。"""
+        detected_at = detected_at or time.time()
+        started_at = detected_at
+        release = info.get("release_timestamp")
+        if isinstance(release, (int, float)) and 0 < release <= detected_at:
+            started_at = float(release)
+        try:
+            self.channel_history.record_start(
+                url, str(info["id"]), started_at, detected_at
+            )
+        except Exception as e:
+            self.log(f"無法記錄開播時間: {e}")
+
+    def recording_status(self) -> Optional[dict[str, Any]]:
+        """錄製 worker 池的狀態；尚未開始監控時回傳 None。"""
+        pool = self.recording_pool
+        if pool is None:
+            return None
+        return {
+            "active": pool.active_count(),
+            "max_workers": pool.max_workers,
+            "queue_depth": pool.queue_depth(),
+            "workers": pool.status(),
+            "probes": self.scheduler.probe_stats() if self.scheduler else None,
+            "cadence": (
+                self.cadence_planner.summary() if self.cadence_planner else {}
+            ),
+            "progress": {
+                url: progress.as_dict()
+                for url, progress in list(self.recording_progress.items())
+            },
+            "light": (
+                dict(self.light_probe.stats(), skipped=self.light_skipped)
+                if self.light_probe
+                else None
+            ),
+            "rate_limit": self.rate_limiter.stats(),
+            "extract_cache": self.extract_cache.stats(),
+            "websub": self.websub_stats(),
+            "stalls": self.stall_stats(),
+            "forbidden": self.forbidden_stats(),
+            "output": self.output_stats(),
+            "postprocess": (
+                self.postprocessor.stats() if self.postprocessor else None
+            ),
+            "fragments": self.fragment_stats(),
+            "verify": (
+                dict(
+                    self.verifier.stats(),
+                    verdicts=self.recording_index.verification_summary(),
+                )
+                if self.verifier
+                else None
+            ),
+        }
+
+    def fragment_stats(self) -> dict[str, Any]:
+        """本次執行追蹤的片段缺口，以及索引中累計的補抓狀態。"""
+        return {
+            "outputs": self.fragment_outputs,
+            "with_gaps": self.fragment_gap_outputs,
+            "gap_fragments": self.fragment_gaps,
+            "index": self.recording_index.fragment_gap_summary(),
+            "backfill": self.backfiller.stats() if self.backfiller else None,
+        }
+
+    def output_stats(self) -> dict[str, Any]:
+        items = list(self.output_measurements)
+        finalize = [f for _, _, f in items]
+        ratios = [peak / final for peak, final, _ in items if final]
+        return {
+            "mode": (
+                f"segment-{self.stream_container}"
+                if self.segment_duration > 0
+                else f"stream-{self.stream_container}"
+                if self.stream_remux
+                else "merge"
+            ),
+            "segments": self.segments_completed,
+            "recordings": len(items),
+            "avg_finalize": (
+                round(sum(finalize) / len(finalize), 1) if finalize else None
+            ),
+            "max_finalize": round(max(finalize), 1) if finalize else None,
+            "max_peak_disk": max((p for p, _, _ in items), default=0),
+            # 磁碟用量峰值 / 最終檔案大小：合併時約為 2
+            "avg_peak_ratio": (
+                round(sum(ratios) / len(ratios), 2) if ratios else None
+            ),
+        }
+
+    def websub_stats(self) -> Optional[dict[str, Any]]:
+        if self.websub is None:
+            return None
+        times = list(self.websub_latencies)
+        return dict(
+            self.websub.stats(),
+            triggers=self.websub_triggers,
+            avg_latency=round(sum(times) / len(times), 1) if times else None,
+            max_latency=round(max(times), 1) if times else None,
+        )
+
+    def forbidden_stats(self) -> dict[str, Any]:
+        times = list(self.forbidden_recovery_times)
+        return {
+            "errors": self.forbidden_errors,
+            "attempts": self.forbidden_recoveries,
+            "recovered": self.forbidden_recovered,
+            "give_ups": self.forbidden_give_ups,
+            "total_recovery": round(sum(times), 1),
+            "max_recovery": round(max(times), 1) if times else None,
+        }
+
+    def stall_stats(self) -> dict[str, Any]:
+        times = list(self.stall_recovery_times)
+        gaps = list(self.restart_gaps)
+        return {
+            "stalls": self.stall_count,
+            "restarts": self.stall_restarts,
+            "give_ups": self.stall_give_ups,
+            "avg_recovery": round(sum(times) / len(times), 1) if times else None,
+            "max_recovery": round(max(times), 1) if times else None,
+            "gaps": len(gaps),
+            "lost_seconds": round(sum(gaps), 1),
+        }
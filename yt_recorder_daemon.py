@@ -0,0 +1,338 @@
+"""
+無介面常駐程式：讀取設定檔後持續監控並錄製直播，不需要 Tkinter / 桌面環境。
+
+用法：
+    python yt_recorder_daemon.py --config yt_recorder.json
+
+設定檔（JSON）範例：
+    {
+        "download_dir": "/data/yt_recorder",
+        "cookies_from_browser": "chrome",
+        "check_interval": 300,
+        "max_concurrent_probes": 8,
+        "max_concurrent_recordings": 2,
+        "log_dir": "/var/log/yt_recorder",
+        "progress_interval": 5,
+        "stall_timeout": 120,
+        "adaptive_polling": true,
+        "probe_budget_per_hour": 60,
+        "light_probe": true,
+        "rate_limit_per_minute": 30,
+        "account_rate_limit_per_minute": 20,
+        "probe_cache_ttl": 10,
+        "probe_batch_size": 5,
+        "reuse_probe_info": false,
+        "stream_remux": false,
+        "stream_container": "mp4",
+        "segment_duration": 0,
+        "postprocess_workers": 2,
+        "postprocess_remux": false,
+        "thumbnails": true,
+        "verify_recordings": true,
+        "backfill_fragments": true,
+        "websub_callback_url": "https://recorder.example.com/websub",
+        "websub_listen_port": 8765,
+        "websub_secret": "請換成隨機字串",
+        "channels": [
+            "https://www.youtube.com/@頻道A/live",
+            {"url": "https://www.youtube.com/@頻道B/live", "interval": 120}
+        ]
+    }
+
+websub_callback_url 是 WebSub hub 能連到的公開網址（經反向代理轉到本機
+websub_listen_port 的 /websub）；未設定時只使用輪詢。回呼伺服器預設只監聽
+127.0.0.1，不經反向代理直接對外時把 websub_listen_host 設為 "0.0.0.0"。
+websub_secret 用來驗證通知的簽章，未設定時每次啟動自動產生。
+websub_hub_url 可改用其他 hub（例如測試用的替身 hub）。
+
+rate_limit_per_minute（每個目的地主機）與 account_rate_limit_per_minute
+（每個帳號）限制所有 yt-dlp 呼叫的頻率，預設值不會隨頻道數增加。頻道很多時
+以 check_interval 檢測所需的次數（每分鐘約 頻道數 × 60 / check_interval）
+可能超過上限，檢測會在限流佇列中等待、實際間隔變長，啟動時會在日誌警告；
+這時調高這兩個值（例如 300 個頻道、每 300 秒檢測一次需要每分鐘 60 次以上），
+或拉長 check_interval。輕量檢測（light_probe）與 WebSub 會減少實際的呼叫次數。
+
+偵測到直播後預設立刻以 --live-from-start 重新擷取並從開播處錄製；
+reuse_probe_info 為 true 時改為直接使用檢測取得的資訊，開始得較快，
+但從目前直播位置開始，開播到偵測之間的內容會遺失。
+
+stream_remux 為 true 時錄製中即時以 ffmpeg 轉封裝成單一檔案
+（stream_container："mp4" 為 fragmented MP4，或 "mkv"），直播結束即可使用，
+但一律從目前直播位置開始錄製，不會從頭下載。segment_duration（秒）大於 0 時
+同樣即時轉封裝，但每隔這個秒數切成一個可獨立播放的檔案，並在旁邊維護
+*.manifest.json 段落清單，下游可以先處理已完成的段落。
+
+完成的檔案與段落由 postprocess_workers 個低優先順序的後製行程做完整性
+檢查（ffprobe）與縮圖（thumbnails）；postprocess_remux 為 true 時先把即時
+轉封裝的 fragmented MP4 轉成一般 MP4。postprocess_workers 為 0 時不做後製。
+
+verify_recordings 為 true 時，另一個低優先順序（含 I/O）的行程把每個輸出檔
+完整讀過一次，檢查時間戳記缺口、長度與影音同步；結果寫入錄製索引，
+需要重新下載的檔案會記錄在日誌中。
+
+錄製時 yt-dlp 略過的片段會記錄在日誌與錄製索引中。backfill_fragments 為
+true（且 postprocess_workers 大於 0）時，從頭錄製（--live-from-start）的
+檔案會在錄製結束後以背景優先順序補抓缺少的時間範圍並接回原檔。
+"""
+
+import argparse
+import json
+import multiprocessing
+import signal
+import sys
+from typing import Any
+
+from yt_recorder_core import (
+    STREAM_FORMATS,
+    RecorderEngine,
+    console_log,
+    validate_url,
+)
+from yt_recorder_log import create_file_logger
+from yt_recorder_websub import HUB_URL
+
+
+class ConfigError(Exception):
+    pass
+
+
+def load_config(path: str) -> dict[str, Any]:
+    """讀取並驗證設定檔，回傳補上預設值的設定。"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except OSError as e:
+        raise ConfigError(f"無法讀取設定檔: {e}")
+    except ValueError as e:
+        raise ConfigError(f"設定檔不是有效的 JSON: {e}")
+
+    if not isinstance(raw, dict):
+        raise ConfigError("設定檔最外層必須是物件")
+
+    config: dict[str, Any] = {
+        "download_dir": raw.get("download_dir"),
+        "cookies_from_browser": raw.get("cookies_from_browser"),
+        "check_interval": raw.get("check_interval", 300),
+        "max_concurrent_probes": raw.get("max_concurrent_probes", 8),
+        "max_concurrent_recordings": raw.get("max_concurrent_recordings", 2),
+        "log_dir": raw.get("log_dir"),
+        "progress_interval": raw.get("progress_interval", 1.0),
+        "stall_timeout": raw.get("stall_timeout", RecorderEngine.STALL_TIMEOUT),
+        "adaptive_polling": raw.get("adaptive_polling", True),
+        "probe_budget_per_hour": raw.get("probe_budget_per_hour"),
+        "light_probe": raw.get("light_probe", RecorderEngine.LIGHT_PROBE),
+        "rate_limit_per_minute": raw.get(
+            "rate_limit_per_minute", RecorderEngine.RATE_PER_MINUTE
+        ),
+        "account_rate_limit_per_minute": raw.get(
+            "account_rate_limit_per_minute",
+            RecorderEngine.ACCOUNT_RATE_PER_MINUTE,
+        ),
+        "probe_cache_ttl": raw.get(
+            "probe_cache_ttl", RecorderEngine.PROBE_CACHE_TTL
+        ),
+        "probe_batch_size": raw.get(
+            "probe_batch_size", RecorderEngine.PROBE_BATCH_SIZE
+        ),
+        "websub_callback_url": raw.get("websub_callback_url"),
+        "websub_listen_host": raw.get("websub_listen_host", "127.0.0.1"),
+        "websub_listen_port": raw.get("websub_listen_port", 8765),
+        "websub_secret": raw.get("websub_secret"),
+        "websub_hub_url": raw.get("websub_hub_url", HUB_URL),
+        "reuse_probe_info": raw.get(
+            "reuse_probe_info", RecorderEngine.REUSE_PROBE_INFO
+        ),
+        "stream_remux": raw.get("stream_remux", RecorderEngine.STREAM_REMUX),
+        "stream_container": raw.get(
+            "stream_container", RecorderEngine.STREAM_CONTAINER
+        ),
+        "segment_duration": raw.get(
+            "segment_duration", RecorderEngine.SEGMENT_DURATION
+        ),
+        "postprocess_workers": raw.get(
+            "postprocess_workers", RecorderEngine.POSTPROCESS_WORKERS
+        ),
+        "postprocess_remux": raw.get(
+            "postprocess_remux", RecorderEngine.POSTPROCESS_REMUX
+        ),
+        "thumbnails": raw.get("thumbnails", RecorderEngine.THUMBNAILS),
+        "verify_recordings": raw.get(
+            "verify_recordings", RecorderEngine.VERIFY_RECORDINGS
+        ),
+        "backfill_fragments": raw.get(
+            "backfill_fragments", RecorderEngine.BACKFILL_FRAGMENTS
+        ),
+    }
+
+    for key in (
+        "check_interval",
+        "max_concurrent_probes",
+        "max_concurrent_recordings",
+        "progress_interval",
+        "rate_limit_per_minute",
+        "account_rate_limit_per_minute",
+    ):
+        if not isinstance(config[key], (int, float)) or config[key] <= 0:
+            raise ConfigError(f"{key} 必須是正數")
+    stall_timeout = config["stall_timeout"]
+    if not isinstance(stall_timeout, (int, float)) or stall_timeout < 0:
+        raise ConfigError("stall_timeout 必須是非負數（0 表示停用）")
+    ttl = config["probe_cache_ttl"]
+    if not isinstance(ttl, (int, float)) or ttl < 0:
+        raise ConfigError("probe_cache_ttl 必須是非負數（0 表示只合併同時的擷取）")
+    segment = config["segment_duration"]
+    if not isinstance(segment, (int, float)) or (
+        segment != 0 and segment < 10
+    ):
+        raise ConfigError("segment_duration 必須是 0（不分段）或至少 10 秒")
+    workers = config["postprocess_workers"]
+    if not isinstance(workers, int) or workers < 0:
+        raise ConfigError("postprocess_workers 必須是非負整數（0 表示不做後製）")
+    budget = config["probe_budget_per_hour"]
+    if budget is not None and (
+        not isinstance(budget, (int, float)) or budget <= 0
+    ):
+        raise ConfigError("probe_budget_per_hour 必須是正數")
+    for key in (
+        "adaptive_polling",
+        "light_probe",
+        "reuse_probe_info",
+        "stream_remux",
+        "postprocess_remux",
+        "thumbnails",
+        "verify_recordings",
+        "backfill_fragments",
+    ):
+        if not isinstance(config[key], bool):
+            raise ConfigError(f"{key} 必須是 true 或 false")
+    for key in ("websub_callback_url", "websub_secret", "websub_hub_url"):
+        if config[key] is not None and not isinstance(config[key], str):
+            raise ConfigError(f"{key} 必須是字串")
+    if not isinstance(config["websub_listen_host"], str):
+        raise ConfigError("websub_listen_host 必須是字串")
+    if config["stream_container"] not in STREAM_FORMATS:
+        raise ConfigError(
+            "stream_container 必須是 "
+            + " / ".join(f'"{name}"' for name in STREAM_FORMATS)
+        )
+    batch = config["probe_batch_size"]
+    if not isinstance(batch, int) or batch < 1:
+        raise ConfigError("probe_batch_size 必須是正整數（1 表示不合併）")
+    port = config["websub_listen_port"]
+    if not isinstance(port, int) or not 0 < port < 65536:
+        raise ConfigError("websub_listen_port 必須是 1–65535 的整數")
+    if config["check_interval"] < 10:
+        raise ConfigError("check_interval 不能小於 10 秒")
+
+    channels: list[tuple[str, float]] = []
+    for entry in raw.get("channels") or []:
+        if isinstance(entry, str):
+            url, interval = entry, config["check_interval"]
+        elif isinstance(entry, dict) and isinstance(entry.get("url"), str):
+            url = entry["url"]
+            interval = entry.get("interval", config["check_interval"])
+        else:
+            raise ConfigError(f"無法辨識的頻道設定: {entry!r}")
+        if not validate_url(url):
+            raise ConfigError(f"無效的 YouTube 網址: {url}")
+        if not isinstance(interval, (int, float)) or interval < 10:
+            raise ConfigError(f"檢測間隔不能小於 10 秒: {url}")
+        channels.append((url, float(interval)))
+    if not channels:
+        raise ConfigError("設定檔中沒有任何頻道 (channels)")
+    config["channels"] = channels
+    return config
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="YouTube 直播自動錄製（無介面）")
+    parser.add_argument("--config", required=True, help="JSON 設定檔路徑")
+    parser.add_argument(
+        "--check-cookies",
+        action="store_true",
+        help="只檢查 Cookie 是否有效後結束",
+    )
+    opts = parser.parse_args(argv)
+
+    try:
+        config = load_config(opts.config)
+    except ConfigError as e:
+        console_log(f"設定檔錯誤: {e}")
+        return 2
+
+    # 完整日誌寫入輪替檔案，同時輸出到終端機
+    try:
+        file_logger = create_file_logger(config["log_dir"])
+    except OSError as e:
+        console_log(f"無法建立日誌檔，只輸出到終端機: {e}")
+        file_logger = None
+
+    def log(message: str) -> None:
+        console_log(message)
+        if file_logger is not None:
+            file_logger.info(message)
+
+    engine = RecorderEngine(
+        download_dir=config["download_dir"],
+        cookies_from_browser=config["cookies_from_browser"],
+        log=log,
+        progress_interval=float(config["progress_interval"]),
+        stall_timeout=float(config["stall_timeout"]),
+        light_probe=config["light_probe"],
+        rate_per_minute=float(config["rate_limit_per_minute"]),
+        account_rate_per_minute=float(config["account_rate_limit_per_minute"]),
+        probe_cache_ttl=float(config["probe_cache_ttl"]),
+        probe_batch_size=config["probe_batch_size"],
+        reuse_probe_info=config["reuse_probe_info"],
+        stream_remux=config["stream_remux"],
+        stream_container=config["stream_container"],
+        segment_duration=float(config["segment_duration"]),
+        postprocess_workers=config["postprocess_workers"],
+        postprocess_remux=config["postprocess_remux"],
+        thumbnails=config["thumbnails"],
+        verify_recordings=config["verify_recordings"],
+        backfill_fragments=config["backfill_fragments"],
+    )
+
+    if opts.check_cookies:
+        result = engine.check_cookies()
+        engine.close()
+        return 0 if result.ok else 1
+
+    def _stop(signum: int, frame: Any) -> None:
+        log("收到停止信號，正在停止監控...")
+        engine.stop_monitoring()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    log(f"下載路徑: {engine.download_dir}")
+    if config["websub_callback_url"]:
+        try:
+            engine.enable_websub(
+                config["websub_callback_url"],
+                listen_host=config["websub_listen_host"],
+                listen_port=config["websub_listen_port"],
+                hub_url=config["websub_hub_url"],
+                secret=config["websub_secret"],
+            )
+        except OSError as e:
+            log(f"無法啟動 WebSub 回呼伺服器，只使用輪詢: {e}")
+    engine.start_monitoring(
+        config["channels"],
+        max_probes=int(config["max_concurrent_probes"]),
+        max_records=int(config["max_concurrent_recordings"]),
+        adaptive=config["adaptive_polling"],
+        probe_budget=config["probe_budget_per_hour"],
+    )
+    # 以逾時方式等待，讓主執行緒能及時處理信號
+    while engine.is_monitoring:
+        engine.wait(timeout=1.0)
+    engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    # 後製行程池在打包後的執行檔中需要
+    multiprocessing.freeze_support()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,297 @@
+"""
+輕量 HTTP 檢測。
+
+完整的 yt-dlp 擷取（下載播放器 JS、解析所有格式）只為了得知頻道是否
+在直播，成本很高。LightProbe 先以保持連線的 HTTP 連線讀取頻道的 /live
+頁面（或 feeds/videos.xml），並帶上 ETag / If-Modified-Since；只有頁面
+狀態改變時，呼叫端才需要做完整擷取。
+"""
+
+import gzip
+import http.client
+import http.cookiejar
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from yt_recorder_ytdlp import USER_AGENT
+
+
+class HttpSession:
+    """
+    以 (scheme, host, port) 分組的 keep-alive 連線池（只用標準函式庫）。
+
+    cookie_file() 回傳 Netscape 格式 Cookie 檔路徑時，請求會帶上該檔的 Cookie。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_idle_per_host: int = 4,
+        cookie_file: Optional[Callable[[], Optional[str]]] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.cookie_file = cookie_file
+
+        self._lock = threading.Lock()
+        self._idle: dict[
+            tuple[str, str, int], list[http.client.HTTPConnection]
+        ] = {}
+        self._jar: Optional[http.cookiejar.MozillaCookieJar] = None
+        self._jar_path: Optional[str] = None
+
+        self.requests = 0
+        self.connections_opened = 0
+        self.bytes_received = 0
+
+    def request(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        method: str = "GET",
+        body: Optional[bytes] = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """送出請求並回傳 (狀態碼, 小寫標頭, 解壓後內容)；不跟隨轉址。"""
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        send_headers = {
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": "gzip",
+            "Accept-Language": "en-US,en;q=0.9",
+        }
+        cookie = self._cookie_header(url)
+        if cookie:
+            send_headers["Cookie"] = cookie
+        send_headers.update(headers or {})
+
+        # 閒置連線可能已被伺服器關閉，失敗時以新連線重試一次
+        for attempt in range(2):
+            conn = self._acquire(key, fresh=attempt > 0)
+            try:
+                conn.request(method, path, body=body, headers=send_headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+
+            self.requests += 1
+            self.bytes_received += len(data)
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            if response_headers.get("content-encoding") == "gzip" and data:
+                data = gzip.decompress(data)
+            return response.status, response_headers, data
+        raise OSError("HTTP 請求失敗")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _acquire(
+        self, key: tuple[str, str, int], fresh: bool = False
+    ) -> http.client.HTTPConnection:
+        if not fresh:
+            with self._lock:
+                conns = self._idle.get(key)
+                if conns:
+                    return conns.pop()
+        scheme, host, port = key
+        self.connections_opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(
+        self, key: tuple[str, str, int], conn: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def _cookie_header(self, url: str) -> Optional[str]:
+        path = self.cookie_file() if self.cookie_file else None
+        if not path:
+            return None
+        with self._lock:
+            if path != self._jar_path:
+                jar = http.cookiejar.MozillaCookieJar(path)
+                try:
+                    jar.load(ignore_discard=True, ignore_expires=True)
+                except (OSError, http.cookiejar.LoadError):
+                    return None
+                self._jar, self._jar_path = jar, path
+            request = urllib.request.Request(url)
+            self._jar.add_cookie_header(request)
+        return request.get_header("Cookie")
+
+
+@dataclass
+class LightResult:
+    # 與上次檢測相比頁面狀態是否改變（第一次檢測一律視為改變）
+    changed: bool
+    # 伺服器回應 304，內容沒有變
+    not_modified: bool = False
+    video_id: Optional[str] = None
+    live_now: bool = False
+    upcoming: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class _PageMemo:
+    target: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fingerprint: Optional[tuple] = None
+
+
+_CANONICAL_RE = re.compile(r'<link rel="canonical" href="([^"]+)"')
+_WATCH_ID_RE = re.compile(r"[?&]v=([\w-]{11})")
+_FEED_ENTRY_RE = re.compile(r"<yt:videoId>([\w-]{11})</yt:videoId>")
+
+
+def feed_url(channel_id: str) -> str:
+    return f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+
+
+def parse_live_page(html: str) -> tuple[Optional[str], bool, bool]:
+    """
+    從頻道 /live 頁面取出 (video ID, 是否正在直播, 是否為預定直播)。
+
+    頻道有直播或預定直播時，canonical 連結指向 watch?v=...；
+    沒有時指向頻道本身。
+    """
+    video_id = None
+    match = _CANONICAL_RE.search(html)
+    if match:
+        watch = _WATCH_ID_RE.search(match.group(1))
+        if watch:
+            video_id = watch.group(1)
+    live_now = '"isLiveNow":true' in html or '"isLive":true' in html
+    upcoming = '"isUpcoming":true' in html
+    return video_id, live_now, upcoming
+
+
+class LightProbe:
+    """
+    以 HTTP 讀取頻道頁面判斷「狀態是否改變」，不做完整擷取。
+
+    check(url) 讀取 /live 頁面；提供 channel_id 時改讀較小的
+    feeds/videos.xml（新影片、預定直播出現時會改變）。伺服器提供
+    ETag / Last-Modified 時以條件式請求取得 304，否則比較內容的摘要。
+    """
+
+    def __init__(
+        self,
+        session: Optional[HttpSession] = None,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.session = session or HttpSession()
+        self.log = log
+        self._lock = threading.Lock()
+        self._memo: dict[str, _PageMemo] = {}
+
+        self.checks = 0
+        self.not_modified = 0
+        self.changes = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def check(self, url: str, channel_id: Optional[str] = None) -> LightResult:
+        target = feed_url(channel_id) if channel_id else url
+        with self._lock:
+            memo = self._memo.setdefault(url, _PageMemo())
+            if memo.target != target:
+                # 來源改變（/live 頁面 ↔ feed）時驗證資訊不能沿用
+                memo.target, memo.etag, memo.last_modified = target, None, None
+            headers = {}
+            if memo.etag:
+                headers["If-None-Match"] = memo.etag
+            if memo.last_modified:
+                headers["If-Modified-Since"] = memo.last_modified
+
+        start = time.perf_counter()
+        self.checks += 1
+        try:
+            status, response_headers, body = self.session.request(
+                target, headers
+            )
+        except (http.client.HTTPException, OSError) as e:
+            self.errors += 1
+            return LightResult(changed=True, error=str(e))
+        finally:
+            self.total_seconds += time.perf_counter() - start
+
+        if status == 304:
+            self.not_modified += 1
+            return LightResult(changed=False, not_modified=True)
+        if status != 200:
+            self.errors += 1
+            return LightResult(changed=True, error=f"HTTP {status}")
+
+        text = body.decode("utf-8", errors="replace")
+        if channel_id:
+            ids = _FEED_ENTRY_RE.findall(text)
+            video_id = ids[0] if ids else None
+            live_now = upcoming = False
+            fingerprint: tuple = ("feed", tuple(ids))
+        else:
+            video_id, live_now, upcoming = parse_live_page(text)
+            fingerprint = ("live", video_id, live_now, upcoming)
+
+        with self._lock:
+            changed = fingerprint != memo.fingerprint
+            memo.fingerprint = fingerprint
+            memo.etag = response_headers.get("etag")
+            memo.last_modified = response_headers.get("last-modified")
+        if changed:
+            self.changes += 1
+        return LightResult(
+            changed=changed,
+            video_id=video_id,
+            live_now=live_now,
+            upcoming=upcoming,
+        )
+
+    def forget(self, url: str) -> None:
+        """下次檢測一律視為改變（例如錄製結束後）。"""
+        with self._lock:
+            self._memo.pop(url, None)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "checks": self.checks,
+            "not_modified": self.not_modified,
+            "changes": self.changes,
+            "errors": self.errors,
+            "connections": self.session.connections_opened,
+            "avg_ms": round(1000 * self.total_seconds / self.checks, 1)
+            if self.checks
+            else 0.0,
+        }
+
+    def close(self) -> None:
+        self.session.close()
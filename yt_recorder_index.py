@@ -0,0 +1,340 @@
+"""
+已錄製影片的持久化索引（SQLite）。
+
+記錄每個 video ID 的錄製狀態，讓監控在同一場直播再次被偵測到時
+（例如斷線後冷卻結束仍在直播）決定略過或從目前位置續錄，
+而不是再用 --live-from-start 從頭下載整場直播。
+
+另外記錄每個輸出檔的完整性驗證結果（見 yt_recorder_postprocess.verify_file），
+標出需要重新下載的錄製；以及錄製時 yt-dlp 略過的片段與補抓進度
+（見 yt_recorder_backfill），程式重新啟動後仍會繼續補抓。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+# 錄製狀態
+STATE_RECORDING = "recording"
+STATE_COMPLETED = "completed"
+STATE_INTERRUPTED = "interrupted"
+STATE_FAILED = "failed"
+
+# 完整性驗證結果
+VERDICT_OK = "ok"
+VERDICT_WARNING = "warning"
+VERDICT_DAMAGED = "damaged"
+
+# 片段缺口的補抓狀態
+BACKFILL_PENDING = "pending"
+BACKFILL_DONE = "backfilled"
+BACKFILL_FAILED = "failed"
+# 片段編號無法對應到直播時間（不是從頭錄製），只記錄缺口數
+BACKFILL_UNMAPPABLE = "unmappable"
+
+# begin() 的決策
+ACTION_FULL = "full"
+ACTION_APPEND = "append"
+ACTION_SKIP = "skip"
+
+
+def default_data_root() -> str:
+    """本程式的資料根目錄（索引等需要長期保存的檔案）。"""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    return os.path.join(base, "yt_recorder")
+
+
+@dataclass
+class RecordingDecision:
+    action: str
+    # 續錄的段號：0 為完整錄製，1 以後為續錄檔
+    part: int = 0
+    previous_state: Optional[str] = None
+
+
+class RecordingIndex:
+    """
+    video ID → 錄製狀態 的索引。
+
+    - 沒有紀錄：完整錄製（--live-from-start）
+    - 正在錄製：略過，避免同一場直播被重複錄製（例如多個頻道網址指向同一場）
+    - 其他狀態（已完成、中斷、失敗）但仍在直播：從目前位置續錄成新的段落檔
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(
+            default_data_root(), "recordings.sqlite3"
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recordings (
+                video_id    TEXT PRIMARY KEY,
+                channel_url TEXT,
+                title       TEXT,
+                state       TEXT NOT NULL,
+                parts       INTEGER NOT NULL DEFAULT 0,
+                started_at  REAL NOT NULL,
+                updated_at  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS verifications (
+                path          TEXT PRIMARY KEY,
+                video_id      TEXT,
+                verdict       TEXT NOT NULL,
+                needs_refetch INTEGER NOT NULL DEFAULT 0,
+                issues        TEXT,
+                duration      REAL,
+                expected      REAL,
+                gap_seconds   REAL,
+                verified_at   REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fragment_gaps (
+                path          TEXT PRIMARY KEY,
+                video_id      TEXT,
+                url           TEXT,
+                gap_fragments INTEGER NOT NULL,
+                runs          TEXT,
+                state         TEXT NOT NULL,
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                updated_at    REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        self.skipped = 0
+        self.appended = 0
+
+        self._recover_stale()
+
+    def _recover_stale(self) -> None:
+        """上次執行時仍標記為錄製中的項目，視為中斷。"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE recordings SET state = ?, updated_at = ? WHERE state = ?",
+                (STATE_INTERRUPTED, time.time(), STATE_RECORDING),
+            )
+            self._conn.commit()
+
+    def get(self, video_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, channel_url, title, state, parts, started_at,"
+                " updated_at FROM recordings WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = (
+            "video_id",
+            "channel_url",
+            "title",
+            "state",
+            "parts",
+            "started_at",
+            "updated_at",
+        )
+        return dict(zip(keys, row))
+
+    def begin(
+        self, video_id: str, channel_url: str, title: str = ""
+    ) -> RecordingDecision:
+        """決定如何錄製這個 video ID，並在需要錄製時標記為錄製中。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, parts FROM recordings WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO recordings (video_id, channel_url, title, state,"
+                    " parts, started_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?)",
+                    (video_id, channel_url, title, STATE_RECORDING, now, now),
+                )
+                self._conn.commit()
+                return RecordingDecision(ACTION_FULL)
+
+            state, parts = row
+            if state == STATE_RECORDING:
+                self.skipped += 1
+                return RecordingDecision(ACTION_SKIP, previous_state=state)
+
+            part = parts + 1
+            self._conn.execute(
+                "UPDATE recordings SET state = ?, parts = ?, updated_at = ?"
+                " WHERE video_id = ?",
+                (STATE_RECORDING, part, now, video_id),
+            )
+            self._conn.commit()
+            self.appended += 1
+            return RecordingDecision(
+                ACTION_APPEND, part=part, previous_state=state
+            )
+
+    def finish(self, video_id: str, state: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE recordings SET state = ?, updated_at = ? WHERE video_id = ?",
+                (state, time.time(), video_id),
+            )
+            self._conn.commit()
+
+    def record_verification(
+        self, path: str, video_id: str, result: dict
+    ) -> None:
+        """寫入一個檔案的驗證結果（同一路徑再次驗證時覆蓋）。"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verifications (path, video_id, verdict,"
+                " needs_refetch, issues, duration, expected, gap_seconds,"
+                " verified_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    video_id,
+                    result.get("verdict") or VERDICT_DAMAGED,
+                    int(bool(result.get("needs_refetch"))),
+                    json.dumps(result.get("issues") or [], ensure_ascii=False),
+                    result.get("duration"),
+                    result.get("expected"),
+                    result.get("gap_seconds"),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def needs_refetch(self) -> list[dict]:
+        """驗證未通過、需要重新下載的檔案。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, video_id, issues, verified_at FROM verifications"
+                " WHERE needs_refetch = 1 ORDER BY verified_at"
+            ).fetchall()
+        return [
+            {
+                "path": path,
+                "video_id": video_id,
+                "issues": json.loads(issues or "[]"),
+                "verified_at": verified_at,
+            }
+            for path, video_id, issues, verified_at in rows
+        ]
+
+    def verification_summary(self) -> dict[str, int]:
+        """各驗證結果的檔案數，以及需要重新下載的數量。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT verdict, COUNT(*), SUM(needs_refetch) FROM verifications"
+                " GROUP BY verdict"
+            ).fetchall()
+        summary = {
+            VERDICT_OK: 0,
+            VERDICT_WARNING: 0,
+            VERDICT_DAMAGED: 0,
+            "needs_refetch": 0,
+        }
+        for verdict, count, refetch in rows:
+            summary[verdict] = count
+            summary["needs_refetch"] += refetch or 0
+        return summary
+
+    def record_fragment_gaps(
+        self,
+        path: str,
+        video_id: str,
+        url: str,
+        runs: list[tuple[int, int]],
+        state: str,
+    ) -> None:
+        """寫入一個輸出檔缺少的片段區間 (first, last) 與補抓狀態。"""
+        gap_fragments = sum(last - first + 1 for first, last in runs)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fragment_gaps (path, video_id, url,"
+                " gap_fragments, runs, state, attempts, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                (
+                    path,
+                    video_id,
+                    url,
+                    gap_fragments,
+                    json.dumps([list(run) for run in runs]),
+                    state,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def update_backfill(self, path: str, state: str, attempts: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE fragment_gaps SET state = ?, attempts = ?, updated_at = ?"
+                " WHERE path = ?",
+                (state, attempts, time.time(), path),
+            )
+            self._conn.commit()
+
+    def pending_backfills(self) -> list[dict]:
+        """還沒補抓完成的缺口（程式重新啟動時重新排入）。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, video_id, url, gap_fragments, runs, attempts"
+                " FROM fragment_gaps WHERE state = ? ORDER BY updated_at",
+                (BACKFILL_PENDING,),
+            ).fetchall()
+        return [
+            {
+                "path": path,
+                "video_id": video_id,
+                "url": url,
+                "gap_fragments": gap_fragments,
+                "runs": [tuple(run) for run in json.loads(runs or "[]")],
+                "attempts": attempts,
+            }
+            for path, video_id, url, gap_fragments, runs, attempts in rows
+        ]
+
+    def fragment_gap_summary(self) -> dict[str, int]:
+        """有缺口的輸出檔數、缺少的片段總數，以及各補抓狀態的檔案數。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*), SUM(gap_fragments) FROM fragment_gaps"
+                " GROUP BY state"
+            ).fetchall()
+        summary = {
+            "recordings": 0,
+            "gap_fragments": 0,
+            BACKFILL_PENDING: 0,
+            BACKFILL_DONE: 0,
+            BACKFILL_FAILED: 0,
+            BACKFILL_UNMAPPABLE: 0,
+        }
+        for state, count, fragments in rows:
+            summary[state] = count
+            summary["recordings"] += count
+            summary["gap_fragments"] += fragments or 0
+        return summary
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,111 @@
+"""
+日誌管線。
+
+各執行緒（檢測、錄製、yt-dlp 輸出）只把訊息丟進佇列，不直接碰 GUI；
+介面端以固定頻率批次取出後一次寫入，並只保留最近 N 行。
+完整歷史另外寫入會自動輪替的日誌檔，不受畫面上的行數限制。
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+from typing import Optional
+
+from yt_recorder_index import default_data_root
+
+
+def default_log_dir() -> str:
+    return os.path.join(default_data_root(), "logs")
+
+
+def create_file_logger(
+    log_dir: Optional[str] = None,
+    max_bytes: int = 5 * 1024 * 1024,
+    backup_count: int = 10,
+) -> logging.Logger:
+    """
+    建立寫入輪替日誌檔的 logger（yt_recorder.log、.1、.2 …）。
+
+    重複呼叫會沿用同一個 logger，不會重複加入 handler。
+    """
+    log_dir = log_dir or default_log_dir()
+    os.makedirs(log_dir, exist_ok=True)
+
+    logger = logging.getLogger("yt_recorder")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, "yt_recorder.log"),
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S")
+        )
+        logger.addHandler(handler)
+    return logger
+
+
+class LogPipeline:
+    """
+    多執行緒寫入、單一消費者批次讀出的日誌佇列。
+
+    push() 可從任意執行緒呼叫且不會阻塞；drain() 由 GUI 計時器呼叫，
+    一次取出最多 max_batch 筆。佇列滿時丟棄最舊的訊息並計數，
+    避免介面卡住時記憶體無限制成長（日誌檔仍會保有完整內容）。
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 10000,
+        file_logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self.max_pending = max(1, int(max_pending))
+        self.file_logger = file_logger
+
+        self.pushed = 0
+        self.dropped = 0
+
+    def push(self, message: str) -> str:
+        """加入一則訊息，回傳加上時間戳記後的行。"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        line = f"[{timestamp}] {message}"
+        self._queue.put(line)
+        self.pushed += 1
+        if self.file_logger is not None:
+            try:
+                self.file_logger.info(message)
+            except Exception:
+                pass
+        # qsize() 只是近似值，超量時由寫入端丟掉最舊的幾筆
+        while self._queue.qsize() > self.max_pending:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.dropped += 1
+        return line
+
+    def drain(self, max_batch: int = 500) -> list[str]:
+        lines: list[str] = []
+        while len(lines) < max_batch:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pushed": self.pushed,
+            "dropped": self.dropped,
+            "pending": self.pending(),
+        }
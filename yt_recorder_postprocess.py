@@ -0,0 +1,668 @@
+"""
+錄製完成後的後製工作（轉封裝、完整性檢查、縮圖）。
+
+後製都是呼叫 ffmpeg / ffprobe 並解析輸出，若在錄製執行緒上直接執行，
+會拖慢錄製結束後的冷卻與下一場錄製。PostProcessor 把工作排進自己的
+佇列，交給獨立的行程池（ProcessPoolExecutor）以較低的優先順序執行，
+多核心可同時處理多個檔案，監控與錄製中的 yt-dlp 不受影響。
+
+工作函式（remux_file、probe_file、extract_thumbnail、verify_file、
+splice_file）在 worker 行程中執行，只接收可 pickle 的參數並回傳 dict。
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from yt_recorder_index import VERDICT_DAMAGED, VERDICT_OK, VERDICT_WARNING
+
+
+# 工作種類
+JOB_REMUX = "remux"
+JOB_PROBE = "probe"
+JOB_THUMBNAIL = "thumbnail"
+JOB_VERIFY = "verify"
+JOB_SPLICE = "splice"
+
+# worker 行程的 nice 值；Linux 未另外設定 I/O 優先順序時也會依此降低
+WORKER_NICE = 10
+
+
+def _init_worker() -> None:
+    if hasattr(os, "nice"):
+        try:
+            os.nice(WORKER_NICE)
+        except OSError:
+            pass
+
+
+def _run(command: list[str], timeout: float) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+        timeout=timeout,
+        shell=False,
+    )
+
+
+def _error_text(result: subprocess.CompletedProcess) -> str:
+    return result.stderr.decode("utf-8", errors="replace").strip()[-500:]
+
+
+def remux_file(
+    ffmpeg: str, path: str, timeout: float = 3600
+) -> dict[str, Any]:
+    """
+    把 fragmented MP4 轉成一般 MP4（moov 在檔頭，舊播放器與編輯軟體
+    都能正常讀取）。成功後取代原檔，失敗時保留原檔。
+    """
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.remux{ext}"
+    result = _run(
+        [
+            ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            path,
+            "-map",
+            "0",
+            "-c",
+            "copy",
+            "-movflags",
+            "+faststart",
+            "-y",
+            tmp,
+        ],
+        timeout,
+    )
+    if result.returncode != 0:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return {"ok": False, "error": _error_text(result)}
+    os.replace(tmp, path)
+    return {"ok": True, "size": os.path.getsize(path)}
+
+
+def probe_file(ffprobe: str, path: str, timeout: float = 300) -> dict[str, Any]:
+    """以 ffprobe 讀取容器資訊：能解析、有影像串流且長度大於 0 才算通過。"""
+    result = _run(
+        [
+            ffprobe,
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration,size,format_name:stream=codec_type,codec_name",
+            "-of",
+            "json",
+            path,
+        ],
+        timeout,
+    )
+    try:
+        data = json.loads(result.stdout or b"{}")
+    except ValueError:
+        data = {}
+    fmt = data.get("format") or {}
+    try:
+        duration = float(fmt.get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    streams = [
+        f"{s.get('codec_type')}:{s.get('codec_name')}"
+        for s in data.get("streams") or []
+    ]
+    ok = (
+        result.returncode == 0
+        and bool(duration)
+        and any(s.startswith("video:") for s in streams)
+    )
+    return {
+        "ok": ok,
+        "duration": duration,
+        "format": fmt.get("format_name"),
+        "streams": streams,
+        "error": _error_text(result) or None,
+    }
+
+
+def extract_thumbnail(
+    ffmpeg: str,
+    path: str,
+    at: float = 0.0,
+    width: int = 320,
+    timeout: float = 120,
+) -> dict[str, Any]:
+    """在 at 秒處擷取一張 JPEG 縮圖，存成與影片同名的 .jpg。"""
+    output = os.path.splitext(path)[0] + ".jpg"
+    result = _run(
+        [
+            ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-ss",
+            f"{max(0.0, at):.3f}",
+            "-i",
+            path,
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale={width}:-2",
+            "-y",
+            output,
+        ],
+        timeout,
+    )
+    if result.returncode != 0 or not os.path.exists(output):
+        return {"ok": False, "error": _error_text(result)}
+    return {"ok": True, "thumbnail": output}
+
+
+# 驗證判定：長度比預期短超過這個比例（再加上固定寬限秒數）視為不完整
+SHORTFALL_RATIO = 0.05
+SHORTFALL_GRACE = 10.0
+# 時間戳記缺口總長超過這個秒數（或總長的 1%）視為需要重新下載
+MAX_GAP_SECONDS = 5.0
+# 影音串流的起訖時間相差超過這個秒數視為不同步
+MAX_AV_OFFSET = 1.0
+# 回傳的缺口位置上限
+MAX_GAP_RANGES = 100
+
+
+def _low_io_priority(command: list[str]) -> list[str]:
+    """Linux 上以 ionice 的 idle 等級執行，只使用閒置的磁碟頻寬。"""
+    if sys.platform.startswith("linux"):
+        ionice = shutil.which("ionice")
+        if ionice:
+            return [ionice, "-c", "3"] + command
+    return command
+
+
+def verify_file(
+    ffprobe: str,
+    path: str,
+    expected: Optional[float] = None,
+    gap_threshold: float = 1.0,
+    timeout: float = 4 * 3600,
+) -> dict[str, Any]:
+    """
+    從頭到尾讀一次檔案的所有封包，檢查：
+
+    - 容器能否完整解析（例如 moov 遺失或檔案被截斷）
+    - 長度與預期長度（expected 秒，None 表示不檢查）
+    - 各串流的時間戳記缺口（相鄰封包間隔超過 gap_threshold 秒）
+    - 影音串流的起訖時間是否一致
+
+    ffprobe 的輸出逐行處理，不會整個載入記憶體。回傳的 verdict 為
+    ok / warning / damaged，needs_refetch 表示應重新下載；gap_ranges 為
+    缺得最多的串流中各缺口的 [開始, 結束] 秒數（供補抓接回）。
+    """
+    command = _low_io_priority(
+        [
+            ffprobe,
+            "-v",
+            "error",
+            "-show_entries",
+            "packet=stream_index,pts_time,dts_time,duration_time"
+            ":stream=index,codec_type:format=duration",
+            "-of",
+            "compact",
+            path,
+        ]
+    )
+    tracks: dict[str, _Track] = {}
+    codec_types: dict[str, str] = {}
+    duration: Optional[float] = None
+    packets = 0
+    deadline = time.monotonic() + timeout
+    timed_out = False
+
+    with tempfile.TemporaryFile() as errors:
+        proc = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=errors,
+            stdin=subprocess.DEVNULL,
+            shell=False,
+        )
+        for raw in proc.stdout:
+            fields = dict(
+                item.split("=", 1)
+                for item in raw.decode("utf-8", errors="replace")
+                .strip()
+                .split("|")[1:]
+                if "=" in item
+            )
+            section = raw.split(b"|", 1)[0]
+            if section == b"packet":
+                packets += 1
+                _track_packet(tracks, fields, gap_threshold)
+                if packets % 10000 == 0 and time.monotonic() > deadline:
+                    timed_out = True
+                    proc.kill()
+                    break
+            elif section == b"stream":
+                codec_types[fields.get("index", "")] = fields.get(
+                    "codec_type", ""
+                )
+            elif section == b"format":
+                duration = _float(fields.get("duration"))
+        returncode = proc.wait()
+        errors.seek(0)
+        error_lines = [
+            line
+            for line in errors.read().decode("utf-8", errors="replace").splitlines()
+            if line.strip()
+        ]
+
+    if timed_out:
+        # 沒有讀完不能下結論，不給判定
+        return {"ok": False, "error": f"驗證逾時（{timeout:.0f} 秒）"}
+
+    issues: list[str] = []
+    needs_refetch = False
+    if returncode != 0 or not packets or duration is None:
+        issues.append("invalid_container")
+        needs_refetch = True
+
+    if duration is not None and expected:
+        if duration < expected * (1 - SHORTFALL_RATIO) - SHORTFALL_GRACE:
+            issues.append("short")
+            needs_refetch = True
+
+    # 影音通常在同一處一起缺，以缺得最多的串流為準，不重複計算
+    worst = max(
+        tracks.values(), key=lambda track: track.gap_seconds, default=_Track()
+    )
+    gaps = len(worst.gap_ranges)
+    gap_seconds = worst.gap_seconds
+    max_gap = max((track.max_gap for track in tracks.values()), default=0.0)
+    if gaps:
+        issues.append("gaps")
+        if gap_seconds > max(MAX_GAP_SECONDS, 0.01 * (duration or 0)):
+            needs_refetch = True
+
+    av_offset = _av_offset(tracks, codec_types)
+    if av_offset is not None and av_offset > MAX_AV_OFFSET:
+        issues.append("av_desync")
+    if error_lines and "invalid_container" not in issues:
+        issues.append("stream_errors")
+
+    if needs_refetch:
+        verdict = VERDICT_DAMAGED
+    elif issues:
+        verdict = VERDICT_WARNING
+    else:
+        verdict = VERDICT_OK
+    return {
+        "ok": not needs_refetch,
+        "verdict": verdict,
+        "needs_refetch": needs_refetch,
+        "issues": issues,
+        "duration": duration,
+        "expected": expected,
+        "packets": packets,
+        "gaps": gaps,
+        "gap_seconds": round(gap_seconds, 3),
+        "max_gap": round(max_gap, 3),
+        "gap_ranges": [
+            [round(start, 3), round(end, 3)]
+            for start, end in worst.gap_ranges[:MAX_GAP_RANGES]
+        ],
+        "av_offset": round(av_offset, 3) if av_offset is not None else None,
+        "error": "\n".join(error_lines[-5:]) or None,
+    }
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class _Track:
+    """verify_file 中一個串流的時間戳記統計。"""
+
+    first: float = 0.0
+    # 目前為止封包的最晚結束時間
+    end: float = 0.0
+    gap_seconds: float = 0.0
+    max_gap: float = 0.0
+    gap_ranges: list[tuple[float, float]] = field(default_factory=list)
+
+
+def _track_packet(
+    tracks: dict[str, _Track],
+    fields: dict[str, str],
+    gap_threshold: float,
+) -> None:
+    # 封包依解碼順序排列，B 影格的 pts 會前後跳動，因此優先使用 dts
+    at = _float(fields.get("dts_time"))
+    if at is None:
+        at = _float(fields.get("pts_time"))
+    if at is None:
+        return
+    end = at + (_float(fields.get("duration_time")) or 0.0)
+    track = tracks.get(fields.get("stream_index", ""))
+    if track is None:
+        tracks[fields.get("stream_index", "")] = _Track(first=at, end=end)
+        return
+    gap = at - track.end
+    if gap > gap_threshold:
+        track.gap_seconds += gap
+        track.max_gap = max(track.max_gap, gap)
+        track.gap_ranges.append((track.end, at))
+    track.end = max(track.end, end)
+
+
+def _av_offset(
+    tracks: dict[str, _Track], codec_types: dict[str, str]
+) -> Optional[float]:
+    """第一個影像串流與第一個聲音串流的起點、終點相差較大者（秒）。"""
+    video = audio = None
+    for index, track in tracks.items():
+        kind = codec_types.get(index)
+        if kind == "video" and video is None:
+            video = track
+        elif kind == "audio" and audio is None:
+            audio = track
+    if video is None or audio is None:
+        return None
+    return max(abs(video.first - audio.first), abs(video.end - audio.end))
+
+
+def _concat_quote(path: str) -> str:
+    # ffconcat 的單引號字串中，單引號寫成 '\''
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def splice_file(
+    ffmpeg: str,
+    path: str,
+    patches: list[tuple[float, float, str]],
+    timeout: float = 3600,
+) -> dict[str, Any]:
+    """
+    把補抓的內容接回檔案的缺口。
+
+    patches 為 (缺口開始秒數, 缺口結束秒數, 補抓檔)，秒數是原檔的時間。
+    以 concat demuxer 依序串接「原檔到缺口開始、補抓檔、原檔從缺口結束」，
+    不重新編碼（在關鍵影格切齊，接點可能有少許重疊）。成功後取代原檔並
+    刪除補抓檔，失敗時保留原檔。
+    """
+    root, ext = os.path.splitext(path)
+    listing = f"{root}.splice.ffconcat"
+    tmp = f"{root}.splice{ext}"
+    lines = ["ffconcat version 1.0"]
+    position: Optional[float] = None
+    for start, end, patch in sorted(patches):
+        lines.append(f"file {_concat_quote(path)}")
+        if position is not None:
+            lines.append(f"inpoint {position:.3f}")
+        lines += [f"outpoint {start:.3f}", f"file {_concat_quote(patch)}"]
+        position = end
+    lines.append(f"file {_concat_quote(path)}")
+    if position is not None:
+        lines.append(f"inpoint {position:.3f}")
+    try:
+        with open(listing, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        result = _run(
+            [
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                listing,
+                "-map",
+                "0",
+                "-c",
+                "copy",
+                "-movflags",
+                "+faststart",
+                "-y",
+                tmp,
+            ],
+            timeout,
+        )
+    finally:
+        try:
+            os.remove(listing)
+        except OSError:
+            pass
+    if result.returncode != 0 or not os.path.isfile(tmp):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return {"ok": False, "error": _error_text(result)}
+    os.replace(tmp, path)
+    for _, _, patch in patches:
+        try:
+            os.remove(patch)
+        except OSError:
+            pass
+    return {"ok": True, "error": None, "patches": len(patches)}
+
+
+_JOB_FUNCTIONS: dict[str, Callable[..., dict[str, Any]]] = {
+    JOB_REMUX: remux_file,
+    JOB_PROBE: probe_file,
+    JOB_THUMBNAIL: extract_thumbnail,
+    JOB_VERIFY: verify_file,
+    JOB_SPLICE: splice_file,
+}
+
+
+@dataclass
+class PostJob:
+    kind: str
+    # ffmpeg / ffprobe 執行檔
+    executable: str
+    path: str
+    args: tuple[Any, ...]
+    on_done: Optional[Callable[["PostJob"], None]] = None
+    queued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.result.get("ok"))
+
+
+class PostProcessor:
+    """
+    後製工作佇列與行程池。
+
+    submit() 把工作加入佇列；同時交給行程池的工作不超過 workers 個，
+    其餘在佇列中等候，因此可以準確回報等候中與執行中的數量。
+    on_done(job) 在工作結束時於背景執行緒上呼叫，可在其中提交後續工作
+    （例如檢查通過後擷取縮圖）。
+    """
+
+    # 各種工作最近的耗時樣本數
+    HISTORY = 100
+
+    def __init__(
+        self,
+        workers: int = 2,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.log = log
+        self._lock = threading.Lock()
+        self._queue: deque[PostJob] = deque()
+        self._running: dict[Future, PostJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+
+        self.completed = 0
+        self.failed = 0
+        # 工作種類 → 最近的執行秒數 / 等候秒數
+        self.durations: dict[str, deque[float]] = {}
+        self.waits: dict[str, deque[float]] = {}
+
+    def submit(
+        self,
+        kind: str,
+        executable: str,
+        path: str,
+        *args: Any,
+        on_done: Optional[Callable[[PostJob], None]] = None,
+    ) -> Optional[PostJob]:
+        """
+        加入一個工作，在 worker 行程中以 (executable, path, *args) 呼叫
+        對應的工作函式。已關閉時回傳 None。
+        """
+        if kind not in _JOB_FUNCTIONS:
+            raise ValueError(f"未知的後製工作: {kind}")
+        job = PostJob(kind, executable, path, args, on_done)
+        with self._lock:
+            if self._closed:
+                return None
+            self._queue.append(job)
+        self._dispatch()
+        return job
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def running(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            kinds = {}
+            for kind, times in self.durations.items():
+                samples = list(times)
+                waits = list(self.waits.get(kind) or [])
+                kinds[kind] = {
+                    "count": len(samples),
+                    "avg": round(sum(samples) / len(samples), 2),
+                    "max": round(max(samples), 2),
+                    "avg_wait": (
+                        round(sum(waits) / len(waits), 2) if waits else 0.0
+                    ),
+                }
+            return {
+                "workers": self.workers,
+                "queue_depth": len(self._queue),
+                "running": len(self._running),
+                "completed": self.completed,
+                "failed": self.failed,
+                "jobs": kinds,
+            }
+
+    def close(self) -> None:
+        """捨棄等候中的工作；執行中的工作在背景自行結束。"""
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                if (
+                    self._closed
+                    or not self._queue
+                    or len(self._running) >= self.workers
+                ):
+                    return
+                job = self._queue.popleft()
+                if self._executor is None:
+                    # 第一次需要時才啟動 worker 行程
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, initializer=_init_worker
+                    )
+                job.started_at = time.monotonic()
+                try:
+                    future = self._executor.submit(
+                        _JOB_FUNCTIONS[job.kind],
+                        job.executable,
+                        job.path,
+                        *job.args,
+                    )
+                except RuntimeError as e:
+                    # 行程池已損壞（例如 worker 被強制結束），下次重新建立
+                    self._executor = None
+                    job.result = {"ok": False, "error": str(e)}
+                    future = None
+                else:
+                    self._running[future] = job
+            if future is None:
+                self._finish(job)
+            else:
+                future.add_done_callback(self._on_future_done)
+
+    def _on_future_done(self, future: Future) -> None:
+        with self._lock:
+            job = self._running.pop(future, None)
+        if job is None:
+            return
+        if future.cancelled():
+            job.result = {"ok": False, "error": "已取消"}
+        else:
+            error = future.exception()
+            job.result = (
+                {"ok": False, "error": str(error)}
+                if error is not None
+                else future.result()
+            )
+        self._finish(job)
+        self._dispatch()
+
+    def _finish(self, job: PostJob) -> None:
+        job.finished_at = time.monotonic()
+        with self._lock:
+            if job.ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.durations.setdefault(
+                job.kind, deque(maxlen=self.HISTORY)
+            ).append(job.duration)
+            self.waits.setdefault(job.kind, deque(maxlen=self.HISTORY)).append(
+                (job.started_at or job.finished_at) - job.queued_at
+            )
+        if job.on_done is not None:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                self.log(f"後製回呼錯誤: {e}")
@@ -0,0 +1,215 @@
+"""
+對外請求的全域限流。
+
+檢測、Cookie 檢查、下載與錄製都會讓 yt-dlp 連到 YouTube；各自獨立發出時，
+多個頻道同時到期就會在同一秒內湧出大量請求，容易被回應 429 / 403。
+RateLimiter 以 token bucket 限制每個目的地（主機）與每個帳號（Cookie 來源）
+的請求速率，所有呼叫依優先順序排隊取得 token。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import Any, Callable, Optional
+
+
+# 優先順序（數字小的先取得 token）
+PRIORITY_RECORD = 0
+PRIORITY_PROBE = 1
+PRIORITY_BACKGROUND = 2
+
+
+def destination_key(url: Optional[str]) -> str:
+    """以主機區分目的地；youtube.com 的各子網域共用同一個 bucket。"""
+    host = (urllib.parse.urlsplit(url).hostname or "") if url else ""
+    if host == "youtu.be" or host.endswith("youtube.com"):
+        host = "youtube.com"
+    return f"host:{host or 'unknown'}"
+
+
+def account_key(account: Optional[str]) -> str:
+    return f"account:{account or 'anonymous'}"
+
+
+class TokenBucket:
+    """每秒補充 rate 個 token，最多累積 burst 個。"""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距離有一個 token 的秒數（0 表示現在就有）。"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    多個 token bucket 的共用佇列。
+
+    acquire(keys) 同時向 keys 中每個 bucket 各取一個 token；所有呼叫依
+    (priority, 到達順序) 排隊，只有隊首會取得 token，後到的請求不會插隊
+    搶走隊首等待中的 token。rates 為 key 前綴（"host"、"account"）→
+    (每分鐘次數, burst)，未列出的前綴不限流。
+    排隊的請求達到 backlog_warning 個時以 log 警告（之後每加倍一次再警告），
+    代表請求速率超過上限、檢測會比設定的間隔慢；佇列清空後重新計算。
+    """
+
+    # 取消等待（stop_event）的檢查間隔（秒）
+    POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        rates: dict[str, tuple[float, float]],
+        log: Optional[Callable[[str], None]] = None,
+        backlog_warning: int = 10,
+    ) -> None:
+        self.rates = dict(rates)
+        self.log = log
+        self.backlog_warning = max(1, int(backlog_warning))
+        self._warn_depth = self.backlog_warning
+        self._buckets: dict[str, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._waiters: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._closed = False
+
+        self.acquired = 0
+        self.delayed = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: deque[float] = deque(maxlen=100)
+        self.backlog_warnings = 0
+        self.max_queue_depth = 0
+
+    def acquire(
+        self,
+        keys: list[str],
+        priority: int = PRIORITY_PROBE,
+        stop_event: Optional[threading.Event] = None,
+    ) -> Optional[float]:
+        """
+        阻塞到取得 token，回傳等待秒數；stop_event 設定時放棄並回傳 None。
+        close() 之後不再限流。
+        """
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            self._check_backlog()
+            # 優先順序較高的新請求可能成為隊首，讓原本的隊首重新判斷
+            self._cond.notify_all()
+            try:
+                while True:
+                    if self._closed:
+                        break
+                    if stop_event is not None and stop_event.is_set():
+                        self.cancelled += 1
+                        return None
+                    now = time.monotonic()
+                    timeout: Optional[float] = None
+                    if self._waiters[0] == ticket:
+                        buckets = [self._bucket(key) for key in keys]
+                        wait = max(
+                            (b.wait_time(now) for b in buckets if b),
+                            default=0.0,
+                        )
+                        if wait <= 0:
+                            for bucket in buckets:
+                                if bucket:
+                                    bucket.take()
+                            break
+                        timeout = wait
+                    if stop_event is not None:
+                        timeout = min(
+                            timeout or self.POLL_INTERVAL, self.POLL_INTERVAL
+                        )
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                if not self._waiters:
+                    self._warn_depth = self.backlog_warning
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.acquired += 1
+            if waited >= 0.01:
+                self.delayed += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.recent_waits.append(waited)
+        return waited
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._waiters)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            recent = list(self.recent_waits)
+            return {
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self.max_queue_depth,
+                "backlog_warnings": self.backlog_warnings,
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "cancelled": self.cancelled,
+                "avg_wait": (
+                    round(self.total_wait / self.acquired, 2)
+                    if self.acquired
+                    else 0.0
+                ),
+                "recent_max_wait": round(max(recent), 2) if recent else 0.0,
+                "max_wait": round(self.max_wait, 2),
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _check_backlog(self) -> None:
+        depth = len(self._waiters)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        if depth < self._warn_depth:
+            return
+        self._warn_depth = depth * 2
+        self.backlog_warnings += 1
+        if self.log is not None:
+            limits = "、".join(
+                f"{prefix} 每分鐘 {per_minute:g} 次"
+                for prefix, (per_minute, _) in self.rates.items()
+            )
+            self.log(
+                f"限流佇列持續增長：{depth} 個請求等待中（{limits}），"
+                "實際檢測頻率會低於設定的間隔，可考慮調高每分鐘請求上限"
+            )
+
+    def _bucket(self, key: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self.rates.get(key.split(":", 1)[0])
+            if rate is None:
+                return None
+            per_minute, burst = rate
+            bucket = self._buckets[key] = TokenBucket(per_minute / 60.0, burst)
+        return bucket
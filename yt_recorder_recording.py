@@ -0,0 +1,915 @@
+"""
+直播錄製的執行管理。
+
+RecordingPool：固定上限的錄製 worker 與等候佇列，監控迴圈只負責把
+錄製工作交進來，不會被錄製卡住；每個 worker 的狀態可隨時查詢。
+
+另外提供 yt-dlp 進度輸出的解析：以 --progress-template 讓 yt-dlp 每行輸出
+一個 JSON 物件，取代對人類可讀文字做字串比對；Throttle 用來限制
+狀態更新的頻率，避免高位元率直播每秒數十行進度把介面塞滿。
+
+ProcessSupervisor：以單一執行緒（selectors）讀取所有 yt-dlp 子行程的輸出，
+並定時檢查停止要求，子行程完全沒有輸出時也能立刻停止。
+
+FragmentTracker：記錄一個輸出實際取得的片段編號，找出 yt-dlp 略過的片段；
+FormatFragments 依格式分開記錄。
+"""
+
+import json
+import os
+import queue
+import re
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Iterable, Optional
+
+
+# 進度行的前綴，用來與 yt-dlp 其他輸出區分
+PROGRESS_PREFIX = "[yt-rec-progress] "
+
+_PROGRESS_FIELDS = (
+    "status",
+    "downloaded_bytes",
+    "total_bytes",
+    "total_bytes_estimate",
+    "speed",
+    "eta",
+    "elapsed",
+    "fragment_index",
+    "fragment_count",
+)
+
+
+def progress_template_args() -> list[str]:
+    """讓 yt-dlp 以單行 JSON 輸出下載進度的參數（搭配 --newline）。"""
+    # 欄位不存在時 yt-dlp 會輸出 NA，以 |null 讓它仍是合法 JSON
+    body = ",".join(
+        f'"{name}":%(progress.{name}|null)j' for name in _PROGRESS_FIELDS
+    )
+    # 影音分開下載時兩個格式的進度交錯輸出，以 format_id 區分
+    body += ',"format_id":%(info.format_id|null)j'
+    return ["--progress-template", f"download:{PROGRESS_PREFIX}{{{body}}}"]
+
+
+@dataclass
+class ProgressUpdate:
+    status: str = ""
+    downloaded_bytes: int = 0
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None
+    eta: Optional[float] = None
+    elapsed: Optional[float] = None
+    fragment_index: Optional[int] = None
+    fragment_count: Optional[int] = None
+    # 已輸出的媒體時間（秒）；ffmpeg 轉封裝的進度才有
+    media_time: Optional[float] = None
+    # 正在下載的格式（yt-dlp 的 format_id）
+    format_id: Optional[str] = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "downloaded_bytes": self.downloaded_bytes,
+            "total_bytes": self.total_bytes,
+            "speed": self.speed,
+            "eta": self.eta,
+            "elapsed": self.elapsed,
+            "fragment_index": self.fragment_index,
+            "fragment_count": self.fragment_count,
+            "media_time": self.media_time,
+            "format_id": self.format_id,
+        }
+
+    def describe(self) -> str:
+        """狀態列用的簡短描述，例如「512.0 MiB, 2.3 MiB/s, 片段 1024」。"""
+        parts: list[str] = []
+        # 分段輸出時 ffmpeg 沒有總大小，只顯示媒體時間
+        if self.downloaded_bytes or self.media_time is None:
+            parts.append(format_bytes(self.downloaded_bytes))
+        if self.media_time is not None:
+            m, s = divmod(int(self.media_time), 60)
+            parts.append(f"媒體 {m // 60:02d}:{m % 60:02d}:{s:02d}")
+        if self.speed:
+            parts.append(f"{format_bytes(self.speed)}/s")
+        if self.fragment_index is not None:
+            parts.append(f"片段 {self.fragment_index}")
+        if self.eta is not None and self.total_bytes:
+            parts.append(f"剩餘 {int(self.eta)} 秒")
+        return ", ".join(parts)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def parse_progress_line(line: str) -> Optional[ProgressUpdate]:
+    """解析 progress_template_args() 產生的進度行；不是進度行時回傳 None。"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        data = json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    total = _number(data.get("total_bytes"))
+    if total is None:
+        total = _number(data.get("total_bytes_estimate"))
+    fragment_index = _number(data.get("fragment_index"))
+    fragment_count = _number(data.get("fragment_count"))
+    format_id = data.get("format_id")
+    return ProgressUpdate(
+        status=str(data.get("status") or ""),
+        downloaded_bytes=int(_number(data.get("downloaded_bytes")) or 0),
+        total_bytes=int(total) if total is not None else None,
+        speed=_number(data.get("speed")),
+        eta=_number(data.get("eta")),
+        elapsed=_number(data.get("elapsed")),
+        fragment_index=(
+            int(fragment_index) if fragment_index is not None else None
+        ),
+        fragment_count=(
+            int(fragment_count) if fragment_count is not None else None
+        ),
+        format_id=str(format_id) if format_id is not None else None,
+    )
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+class Throttle:
+    """限制事件頻率：ready() 在距離上次放行至少 interval 秒時回傳 True。"""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = max(0.0, float(interval))
+        self._last = float("-inf")
+        self.allowed = 0
+        self.suppressed = 0
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if now - self._last >= self.interval:
+            self._last = now
+            self.allowed += 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class StallWatchdog:
+    """
+    偵測錄製停滯：已下載位元組、片段索引與媒體時間都沒有變化超過 timeout 秒。
+
+    在第一次看到進度後才開始計時（--wait-for-video 等待開播時不算停滯），
+    armed=True 則從建立時就開始計時（例如重新啟動後）。
+    """
+
+    def __init__(self, timeout: float, armed: bool = False) -> None:
+        self.timeout = float(timeout)
+        self.armed = armed
+        self.last_progress_at = time.monotonic()
+        self.stalled_at: Optional[float] = None
+        self._last_key: Optional[tuple[Any, ...]] = None
+
+    def observe(self, progress: ProgressUpdate) -> bool:
+        """記錄一次進度，回傳是否有前進。"""
+        key = (
+            progress.downloaded_bytes,
+            progress.fragment_index,
+            progress.media_time,
+        )
+        if key == self._last_key:
+            return False
+        self._last_key = key
+        self.armed = True
+        self.last_progress_at = time.monotonic()
+        return True
+
+    def check(self, now: Optional[float] = None) -> bool:
+        """是否已停滯；第一次判定停滯時記下時間。"""
+        if not self.armed or self.timeout <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - self.last_progress_at < self.timeout:
+            return False
+        if self.stalled_at is None:
+            self.stalled_at = now
+        return True
+
+
+class FfmpegProgressParser:
+    """
+    解析 ffmpeg -progress 的輸出。
+
+    ffmpeg 每次回報輸出一組 key=value 行，以 progress=continue / end 結尾；
+    feed() 在一組結束時回傳 ProgressUpdate，其餘行回傳 None。
+    """
+
+    def __init__(self) -> None:
+        self._fields: dict[str, str] = {}
+
+    @staticmethod
+    def is_progress_line(line: str) -> bool:
+        key, sep, _ = line.partition("=")
+        return bool(sep) and key.isidentifier()
+
+    def feed(self, line: str) -> Optional[ProgressUpdate]:
+        if not self.is_progress_line(line):
+            return None
+        key, _, value = line.partition("=")
+        if key != "progress":
+            self._fields[key] = value.strip()
+            return None
+        fields, self._fields = self._fields, {}
+        out_time = _int_field(fields.get("out_time_us"))
+        return ProgressUpdate(
+            status="finished" if value.strip() == "end" else "downloading",
+            downloaded_bytes=_int_field(fields.get("total_size")) or 0,
+            media_time=out_time / 1e6 if out_time is not None else None,
+        )
+
+
+def _int_field(value: Optional[str]) -> Optional[int]:
+    # 還沒有資料時 ffmpeg 輸出 N/A
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# yt-dlp 重試後仍失敗、略過片段時的訊息，例如
+# "[download] Got error: HTTP Error 404: Not Found. Skipping fragment 17 ..."
+_SKIP_FRAGMENT_RE = re.compile(r"Skipping fragment (\d+)")
+
+
+class FragmentTracker:
+    """
+    一個輸出實際取得的片段編號（yt-dlp 的 fragment_index，從 1 起算）。
+
+    進度行帶有目前下載中的片段編號；yt-dlp 略過片段時（預設
+    --skip-unavailable-fragments）輸出檔會少一段而不報錯，由略過訊息
+    與編號的跳號找出缺口。取得的編號以連續區間保存，長時間直播也只佔
+    少量記憶體。只能偵測到最後取得的片段為止的缺口。
+    """
+
+    def __init__(self) -> None:
+        # 已看到的片段編號區間 [first, last]，依序排列
+        self.ranges: list[list[int]] = []
+        self.skipped: set[int] = set()
+
+    def observe(self, progress: ProgressUpdate) -> None:
+        if progress.fragment_index:
+            self.add(progress.fragment_index)
+
+    def observe_line(self, line: str) -> bool:
+        """處理 yt-dlp 的略過訊息；是略過訊息時回傳 True。"""
+        match = _SKIP_FRAGMENT_RE.search(line)
+        if match is None:
+            return False
+        self.skipped.add(int(match.group(1)))
+        return True
+
+    def add(self, index: int) -> None:
+        # 幾乎都是依序前進：只需要看最後一個區間
+        if self.ranges:
+            last = self.ranges[-1]
+            if last[0] <= index <= last[1]:
+                return
+            if index == last[1] + 1:
+                last[1] = index
+                return
+            if index > last[1]:
+                self.ranges.append([index, index])
+                return
+        self.ranges.append([index, index])
+        self._merge()
+
+    @property
+    def highest(self) -> int:
+        return self.ranges[-1][1] if self.ranges else 0
+
+    def fetched(self) -> int:
+        seen = sum(last - first + 1 for first, last in self.ranges)
+        return seen - sum(1 for index in self.skipped if self._seen(index))
+
+    def missing(self) -> list[int]:
+        """缺少的片段編號：區間之間的跳號與被略過的片段。"""
+        missing = set(self.skipped)
+        previous = self.ranges[0][1] if self.ranges else 0
+        for first, last in self.ranges[1:]:
+            missing.update(range(previous + 1, first))
+            previous = last
+        return sorted(missing)
+
+    def missing_runs(self) -> list[tuple[int, int]]:
+        """缺少的片段合併成連續區間 (first, last)。"""
+        runs: list[tuple[int, int]] = []
+        for index in self.missing():
+            if runs and runs[-1][1] == index - 1:
+                runs[-1] = (runs[-1][0], index)
+            else:
+                runs.append((index, index))
+        return runs
+
+    def _seen(self, index: int) -> bool:
+        return any(first <= index <= last for first, last in self.ranges)
+
+    def _merge(self) -> None:
+        self.ranges.sort()
+        merged: list[list[int]] = []
+        for first, last in self.ranges:
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.ranges = merged
+
+
+class FormatFragments:
+    """
+    一個輸出各格式的 FragmentTracker，以 format_id 區分。
+
+    影音分開下載（--live-from-start）時，影像與聲音格式的進度交錯輸出，
+    各自的片段編號都從 1 起算；放在同一個 FragmentTracker 會互相填補
+    跳號而看不出缺口。略過訊息不帶格式，算在最近一次進度的格式上。
+    YouTube 直播同一編號的影像與聲音片段對應同一段時間，
+    任一格式缺少的片段都算作缺口。
+    """
+
+    def __init__(self) -> None:
+        self.trackers: dict[str, FragmentTracker] = {}
+        self._current: Optional[FragmentTracker] = None
+
+    def observe(self, progress: ProgressUpdate) -> None:
+        if progress.fragment_index:
+            self._current = self._tracker(progress.format_id or "")
+            self._current.add(progress.fragment_index)
+
+    def observe_line(self, line: str) -> bool:
+        """處理 yt-dlp 的略過訊息；是略過訊息時回傳 True。"""
+        tracker = self._current or self._tracker("")
+        return tracker.observe_line(line)
+
+    @property
+    def highest(self) -> int:
+        return max((t.highest for t in self.trackers.values()), default=0)
+
+    def missing_runs(self) -> list[tuple[int, int]]:
+        return merge_fragment_runs(
+            run for t in self.trackers.values() for run in t.missing_runs()
+        )
+
+    def _tracker(self, format_id: str) -> FragmentTracker:
+        tracker = self.trackers.get(format_id)
+        if tracker is None:
+            tracker = self.trackers[format_id] = FragmentTracker()
+        return tracker
+
+
+def merge_fragment_runs(
+    runs: Iterable[tuple[int, int]],
+) -> list[tuple[int, int]]:
+    """合併重疊或相鄰的片段區間。"""
+    merged: list[tuple[int, int]] = []
+    for first, last in sorted(runs):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def describe_fragment_runs(runs: list[tuple[int, int]], limit: int = 5) -> str:
+    """日誌用的片段區間，例如「17、40–42 等 4 處」。"""
+    parts = [
+        str(first) if first == last else f"{first}–{last}"
+        for first, last in runs[:limit]
+    ]
+    text = "、".join(parts)
+    if len(runs) > limit:
+        text += f" 等 {len(runs)} 處"
+    return text
+
+
+class DiskUsageMeter:
+    """
+    量測一場錄製在輸出資料夾中佔用的空間並記錄峰值。
+
+    檔名包含任一 watch() 登記字串的檔案都算在內（.part、片段暫存檔、
+    合併中的暫存檔與最終輸出）。sample() 最多每 interval 秒掃描一次。
+    """
+
+    def __init__(self, directory: str, interval: float = 5.0) -> None:
+        self.directory = directory
+        self.tokens: set[str] = set()
+        self.current = 0
+        self.peak = 0
+        self._throttle = Throttle(interval)
+
+    def watch(self, token: str) -> None:
+        self.tokens.add(token)
+
+    def sample(self, force: bool = False) -> int:
+        if not self.tokens or not (self._throttle.ready() or force):
+            return self.current
+        total = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if any(token in entry.name for token in self.tokens):
+                        try:
+                            total += entry.stat().st_size
+                        except OSError:
+                            pass
+        except OSError:
+            return self.current
+        self.current = total
+        self.peak = max(self.peak, total)
+        return total
+
+
+@dataclass
+class RecordingJob:
+    key: str
+    label: str
+    run: Callable[[], Any]
+    on_done: Optional[Callable[[], None]] = None
+    queued_at: float = 0.0
+
+
+@dataclass
+class WorkerStatus:
+    worker_id: int
+    state: str = "idle"
+    job_key: Optional[str] = None
+    label: Optional[str] = None
+    started_at: Optional[float] = None
+    jobs_done: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "worker_id": self.worker_id,
+            "state": self.state,
+            "job_key": self.job_key,
+            "label": self.label,
+            "elapsed": round(elapsed, 1),
+            "jobs_done": self.jobs_done,
+        }
+
+
+class RecordingPool:
+    """
+    有上限的錄製 worker 池。
+
+    submit() 不會阻塞：工作進入等候佇列，由最多 max_workers 個 worker
+    執行緒依序處理。同一個 key（通常是頻道網址或 video ID）已在佇列或
+    錄製中時拒絕重複加入；佇列已滿時也會拒絕，由呼叫端決定稍後重試。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(1, int(max_queue))
+        self.log = log
+
+        # 佇列本身不設上限（停止時的結束標記不能被擋住），上限在 submit() 檢查
+        self._queue: "queue.Queue[Optional[RecordingJob]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._keys: set[str] = set()
+        self._workers: list[WorkerStatus] = []
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+
+        self.rejected = 0
+
+    def submit(
+        self,
+        key: str,
+        label: str,
+        run: Callable[[], Any],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """加入錄製工作；重複或佇列已滿時回傳 False。"""
+        job = RecordingJob(key, label, run, on_done, time.time())
+        with self._lock:
+            if (
+                self._closed
+                or key in self._keys
+                or self._queue.qsize() >= self.max_queue
+            ):
+                self.rejected += 1
+                return False
+            self._queue.put(job)
+            self._keys.add(key)
+            self._ensure_workers()
+        return True
+
+    def _ensure_workers(self) -> None:
+        # 需要時才建立 worker，最多 max_workers 個
+        busy = sum(1 for w in self._workers if w.state != "idle")
+        idle = len(self._workers) - busy
+        if idle >= self._queue.qsize():
+            return
+        if len(self._workers) >= self.max_workers:
+            return
+        status = WorkerStatus(worker_id=len(self._workers) + 1)
+        self._workers.append(status)
+        thread = threading.Thread(
+            target=self._worker_loop,
+            args=(status,),
+            name=f"recorder-{status.worker_id}",
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _worker_loop(self, status: WorkerStatus) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            with self._lock:
+                status.state = "recording"
+                status.job_key = job.key
+                status.label = job.label
+                status.started_at = time.time()
+            try:
+                job.run()
+            except Exception as e:
+                self.log(f"錄製工作錯誤 ({job.label}): {e}")
+            finally:
+                with self._lock:
+                    status.state = "idle"
+                    status.job_key = None
+                    status.label = None
+                    status.started_at = None
+                    status.jobs_done += 1
+                    self._keys.discard(job.key)
+                if job.on_done:
+                    try:
+                        job.on_done()
+                    except Exception as e:
+                        self.log(f"錄製結束處理錯誤 ({job.label}): {e}")
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def status(self) -> list[dict[str, Any]]:
+        """每個 worker 目前的狀態。"""
+        with self._lock:
+            return [w.as_dict() for w in self._workers]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for w in self._workers if w.state != "idle")
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        不再接受新工作並丟棄仍在等候的工作。
+
+        進行中的錄製不在這裡中斷，由呼叫端的 stop_event 停止。
+        """
+        dropped = 0
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    self._keys.discard(job.key)
+                    dropped += 1
+        if dropped:
+            self.log(f"已取消 {dropped} 個等候中的錄製工作")
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class ChildProcess:
+    """由 ProcessSupervisor 管理的子行程。"""
+
+    def __init__(
+        self,
+        popen: subprocess.Popen,
+        on_line: Callable[[str], None],
+        stop_event: Optional[threading.Event],
+        on_tick: Optional[Callable[["ChildProcess"], None]],
+        output: Optional[IO[bytes]] = None,
+    ) -> None:
+        self.popen = popen
+        # 監督執行緒讀取的管線（預設為 stdout；stdout 另有去處時為 stderr）
+        self.output = output if output is not None else popen.stdout
+        self.pid = popen.pid
+        self.on_line = on_line
+        self.stop_event = stop_event
+        self.on_tick = on_tick
+
+        self.started_at = time.time()
+        self.last_output_at = self.started_at
+        self.lines = 0
+        self.returncode: Optional[int] = None
+        # 是否因停止要求 / terminate() 而結束
+        self.stopped = False
+
+        self._buffer = b""
+        self._eof = False
+        self._terminated_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """等待輸出讀完且行程結束，回傳返回碼（逾時回傳 None）。"""
+        self._done.wait(timeout)
+        return self.returncode
+
+    def terminate(self) -> None:
+        """要求結束；KILL_AFTER 秒後仍未結束則強制終止。"""
+        self.stopped = True
+        if self._terminated_at is None:
+            self._terminated_at = time.monotonic()
+            self._signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self._signal(signal.SIGKILL if os.name != "nt" else signal.SIGTERM)
+
+    def _signal(self, sig: int) -> None:
+        # 子行程在自己的行程群組中：連同 yt-dlp 啟動的 ffmpeg 一起結束，
+        # 避免孫行程在重新啟動後繼續寫入同一個 .part 檔
+        if os.name != "nt":
+            try:
+                os.killpg(self.pid, sig)
+                return
+            except OSError:
+                pass
+        try:
+            if sig == signal.SIGTERM:
+                self.popen.terminate()
+            else:
+                self.popen.kill()
+        except OSError:
+            pass
+
+
+class ProcessSupervisor:
+    """
+    所有子行程共用的輸出讀取迴圈。
+
+    每個子行程的 stdout 以非阻塞方式登記在同一個 selector 上，由一條
+    執行緒讀取並依行呼叫 on_line（在監督執行緒上執行，需保持快速）。
+    迴圈至少每 TICK 秒醒來一次：檢查 stop_event、呼叫 on_tick、
+    強制終止不回應 terminate 的行程。呼叫端只需 wait() 等待結果。
+    """
+
+    TICK = 0.5
+    KILL_AFTER = 5.0
+
+    def __init__(self, log: Callable[[str], None] = print) -> None:
+        self.log = log
+        self._lock = threading.Lock()
+        self._children: list[ChildProcess] = []
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Windows 的 selector 不支援管線，改為每個子行程一條讀取執行緒
+        self._use_selector = os.name != "nt"
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._registered: set[int] = set()
+        self._wake_event = threading.Event()
+        self._wake_r = self._wake_w = -1
+        if self._use_selector:
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            os.set_blocking(self._wake_w, False)
+
+        self.spawned = 0
+
+    def spawn(
+        self,
+        command: list[str],
+        on_line: Callable[[str], None],
+        stop_event: Optional[threading.Event] = None,
+        on_tick: Optional[Callable[[ChildProcess], None]] = None,
+        stdin: Optional[int] = None,
+        stdout: Optional[int] = None,
+    ) -> ChildProcess:
+        """
+        啟動子行程（stderr 併入 stdout）。啟動失敗時丟 OSError。
+
+        stdin / stdout 可指定檔案描述元（例如 os.pipe() 的兩端），讓兩個
+        子行程串接；指定 stdout 時改為讀取 stderr。子行程在新的行程群組中
+        執行，terminate() 會結束整個群組（包含孫行程）。
+        """
+        popen = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE if stdout is None else stdout,
+            stderr=subprocess.STDOUT if stdout is None else subprocess.PIPE,
+            stdin=subprocess.DEVNULL if stdin is None else stdin,
+            shell=False,
+            start_new_session=os.name != "nt",
+        )
+        output = popen.stdout if stdout is None else popen.stderr
+        if self._use_selector:
+            os.set_blocking(output.fileno(), False)
+        child = ChildProcess(popen, on_line, stop_event, on_tick, output)
+        with self._lock:
+            if self._closed:
+                popen.kill()
+                popen.wait()
+                raise OSError("ProcessSupervisor 已關閉")
+            self._children.append(child)
+            self.spawned += 1
+            self._ensure_thread()
+        if not self._use_selector:
+            threading.Thread(
+                target=self._read_blocking, args=(child,), daemon=True
+            ).start()
+        self._wake()
+        return child
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._children)
+
+    def close(self) -> None:
+        """結束所有子行程並停止監督執行緒。"""
+        with self._lock:
+            self._closed = True
+            children = list(self._children)
+        for child in children:
+            child.terminate()
+        self._wake()
+        if self._thread:
+            self._thread.join(self.KILL_AFTER + 4 * self.TICK)
+
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._loop, name="process-supervisor", daemon=True
+            )
+            self._thread.start()
+
+    def _wake(self) -> None:
+        if self._use_selector:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass
+        else:
+            self._wake_event.set()
+
+    def _loop(self) -> None:
+        if self._use_selector:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        try:
+            while True:
+                with self._lock:
+                    children = list(self._children)
+                    if self._closed and not children:
+                        break
+                if self._selector is not None:
+                    self._select(children)
+                else:
+                    self._wake_event.wait(self.TICK)
+                    self._wake_event.clear()
+                for child in children:
+                    self._check(child)
+        except Exception as e:
+            self.log(f"子行程監督迴圈錯誤: {e}")
+        finally:
+            if self._selector is not None:
+                self._selector.close()
+                self._selector = None
+                self._registered.clear()
+
+    def _select(self, children: list[ChildProcess]) -> None:
+        selector = self._selector
+        for child in children:
+            if not child._eof and id(child) not in self._registered:
+                selector.register(child.output, selectors.EVENT_READ, child)
+                self._registered.add(id(child))
+
+        for key, _ in selector.select(self.TICK):
+            if key.data is None:
+                try:
+                    os.read(self._wake_r, 4096)
+                except OSError:
+                    pass
+                continue
+            child = key.data
+            try:
+                data = os.read(child.output.fileno(), 65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            self._feed(child, data, eof=not data)
+            if not data:
+                self._unregister(child)
+
+    def _unregister(self, child: ChildProcess) -> None:
+        if self._selector is not None and id(child) in self._registered:
+            self._registered.discard(id(child))
+            try:
+                self._selector.unregister(child.output)
+            except (KeyError, ValueError):
+                pass
+
+    def _read_blocking(self, child: ChildProcess) -> None:
+        output = child.output
+        while True:
+            try:
+                data = output.read1(65536)
+            except (OSError, ValueError):
+                data = b""
+            if not data:
+                break
+            self._feed(child, data)
+        self._feed(child, b"", eof=True)
+        self._wake()
+
+    def _feed(self, child: ChildProcess, data: bytes, eof: bool = False) -> None:
+        if child._eof:
+            return
+        child._buffer += data
+        if data:
+            child.last_output_at = time.time()
+        # yt-dlp 以 \n 分行；ffmpeg 等以 \r 更新同一行
+        chunks = child._buffer.replace(b"\r", b"\n").split(b"\n")
+        child._buffer = b"" if eof else chunks.pop()
+        for chunk in chunks:
+            line = chunk.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            child.lines += 1
+            try:
+                child.on_line(line)
+            except Exception as e:
+                self.log(f"處理子行程輸出錯誤: {e}")
+        if eof:
+            child._eof = True
+
+    def _check(self, child: ChildProcess) -> None:
+        if child.done:
+            return
+        if (
+            child.stop_event is not None
+            and child.stop_event.is_set()
+            and child._terminated_at is None
+        ):
+            child.terminate()
+        if child.on_tick is not None and child._terminated_at is None:
+            try:
+                child.on_tick(child)
+            except Exception as e:
+                self.log(f"子行程定時檢查錯誤: {e}")
+
+        exited = child.popen.poll() is not None
+        if child._terminated_at is not None:
+            waited = time.monotonic() - child._terminated_at
+            if waited > self.KILL_AFTER and not (exited and child._eof):
+                # 行程本身或孫行程（例如 ffmpeg）仍未結束：強制結束整個群組
+                child.kill()
+                if exited and not child._eof:
+                    self._feed(child, b"", eof=True)
+
+        # 輸出讀完且行程已結束才算完成
+        if child._eof and exited:
+            self._unregister(child)
+            child.returncode = child.popen.returncode
+            try:
+                child.output.close()
+            except OSError:
+                pass
+            with self._lock:
+                if child in self._children:
+                    self._children.remove(child)
+            child._done.set()
@@ -0,0 +1,524 @@
+"""
+多頻道直播監控排程器。
+
+每個頻道各自有檢測間隔與下次到期時間，排程器以 asyncio 在單一執行緒中
+依到期順序喚醒，並用 Semaphore 限制同時進行的 is_live 檢測數量。
+沒有頻道到期時整個迴圈休眠到最近的到期時間，不做逐秒輪詢。
+
+檢測間隔會依檢測結果調整：已公布開始時間的預定直播先休眠到開始前不久，
+在預定時間前後密集檢測；長時間沒有直播的頻道逐步拉長間隔。
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Optional
+
+
+# yt-dlp 的 live_status
+LIVE_STATUS_LIVE = "is_live"
+LIVE_STATUS_UPCOMING = "is_upcoming"
+LIVE_STATUS_NOT_LIVE = "not_live"
+
+
+@dataclass
+class ProbeResult:
+    """
+    一次檢測的結果。
+
+    live 為 True 時 info 是可交給錄製重用的 info dict；
+    live_status 為 is_upcoming 時 release_timestamp（epoch 秒）為預定開始時間。
+    """
+
+    live: bool = False
+    info: Optional[dict[str, Any]] = None
+    live_status: Optional[str] = None
+    release_timestamp: Optional[float] = None
+    # 檢測失敗（網路、擷取錯誤），間隔依上次得知的狀態決定
+    error: bool = False
+
+    def __bool__(self) -> bool:
+        return self.live
+
+
+@dataclass
+class ChannelState:
+    """單一頻道的排程狀態。"""
+
+    url: str
+    interval: float
+    next_due: float = 0.0
+    probing: bool = False
+    paused: bool = False
+    last_checked: Optional[float] = None
+    last_live: Optional[bool] = None
+    probe_count: int = 0
+    error_count: int = 0
+    # 偵測到直播時檢測取得的 info dict 與時間（epoch 秒），交給錄製重用
+    live_info: Optional[dict[str, Any]] = None
+    live_detected_at: Optional[float] = None
+    # 最近一次檢測得到的 live_status / 預定開始時間（epoch 秒）
+    live_status: Optional[str] = None
+    release_timestamp: Optional[float] = None
+    # 連續沒有直播（也沒有預定直播）的檢測次數
+    idle_streak: int = 0
+    # 本輪（上次直播結束或開始監控以來）的起點與檢測次數
+    cycle_started: Optional[float] = None
+    cycle_probes: int = 0
+    # 相較固定間隔檢測，累計省下的檢測次數
+    probes_saved: int = 0
+    detections: int = 0
+    # 檢測進行中收到 probe_now()，結束後立刻再檢測一次
+    recheck: bool = False
+
+
+class ChannelScheduler:
+    """
+    以到期時間排序的 heap 排程多個頻道的直播檢測。
+
+    probe(url) 為同步函式（目前是 RecorderEngine.probe_channel），在大小為
+    max_concurrency 的執行緒池中執行，回傳值為真時代表正在直播；
+    回傳 dict 時視為檢測取得的 info，存入 channel.live_info；
+    回傳 ProbeResult 時另外依 live_status / release_timestamp 調整下次檢測。
+    偵測到直播時呼叫 on_live(channel)，該頻道會被暫停，直到外部呼叫 resume()。
+    probe_now(url) 讓頻道不等間隔立即檢測（收到推播通知時）。
+    有 probe_batch(urls)（回傳 {網址: 結果}）且 batch_size > 1 時，同時到期的
+    頻道每 batch_size 個合成一次呼叫，共用一個同時檢測名額。
+
+    adaptive=True 時的檢測間隔（interval 為頻道設定的基本間隔）：
+    - 預定直播：休眠到開始前 upcoming_lead 秒（最多休眠 max_upcoming_sleep，
+      以便發現時間變更），之後到開始後 upcoming_grace 秒內每 tight_interval 秒檢測
+    - 沒有直播：有 cadence(url, epoch) 且回傳秒數時採用（依歷史開播時段
+      學到的間隔），否則每次多乘 idle_backoff，最長為 interval * max_idle_factor
+    - 檢測失敗：依上次成功檢測得知的狀態（預定開始時間、學到的間隔、
+      目前的退避）決定，不計入沒有直播的連續次數
+    每次算出的間隔再乘上 1 ± jitter 的隨機倍數，避免間隔相同的頻道
+    一直在同一時刻到期、同時發出請求；預定直播的休眠不會因此超過
+    開始前 upcoming_lead 秒。
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[str], Any],
+        on_live: Callable[[ChannelState], None],
+        max_concurrency: int = 8,
+        log: Callable[[str], None] = print,
+        on_wait: Optional[Callable[[float], None]] = None,
+        adaptive: bool = True,
+        upcoming_lead: float = 120.0,
+        upcoming_grace: float = 1800.0,
+        tight_interval: float = 15.0,
+        max_upcoming_sleep: float = 3600.0,
+        idle_backoff: float = 1.5,
+        max_idle_factor: float = 4.0,
+        cadence: Optional[Callable[[str, float], Optional[float]]] = None,
+        jitter: float = 0.1,
+        probe_batch: Optional[Callable[[list[str]], dict[str, Any]]] = None,
+        batch_size: int = 1,
+    ) -> None:
+        self.probe = probe
+        self.probe_batch = probe_batch
+        self.batch_size = max(1, int(batch_size))
+        self.on_live = on_live
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.log = log
+        self.on_wait = on_wait
+
+        self.adaptive = adaptive
+        self.upcoming_lead = upcoming_lead
+        self.upcoming_grace = upcoming_grace
+        self.tight_interval = tight_interval
+        self.max_upcoming_sleep = max_upcoming_sleep
+        self.idle_backoff = idle_backoff
+        self.max_idle_factor = max_idle_factor
+        self.cadence = cadence
+        self.jitter = max(0.0, min(float(jitter), 0.5))
+
+        self._channels: dict[str, ChannelState] = {}
+        self._heap: list[tuple[float, int, ChannelState]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    # ------------------------------------------------------------------
+    # 頻道管理（可從任意執行緒呼叫）
+    # ------------------------------------------------------------------
+
+    def add_channel(
+        self, url: str, interval: float, delay: float = 0.0
+    ) -> ChannelState:
+        """新增頻道；已存在時只更新間隔。"""
+        with self._lock:
+            channel = self._channels.get(url)
+            if channel is not None:
+                channel.interval = float(interval)
+                return channel
+            channel = ChannelState(
+                url=url,
+                interval=float(interval),
+                next_due=time.monotonic() + delay,
+            )
+            self._channels[url] = channel
+            self._push(channel)
+        self._wake()
+        return channel
+
+    def remove_channel(self, url: str) -> None:
+        with self._lock:
+            # heap 中殘留的項目會在出列時因找不到頻道而被略過
+            self._channels.pop(url, None)
+        self._wake()
+
+    def channels(self) -> list[ChannelState]:
+        with self._lock:
+            return list(self._channels.values())
+
+    def pause(self, url: str) -> None:
+        """暫停檢測（例如錄製中）。"""
+        with self._lock:
+            channel = self._channels.get(url)
+            if channel is not None:
+                channel.paused = True
+
+    def resume(self, url: str, delay: float = 0.0) -> None:
+        """恢復檢測，delay 秒後再檢查一次。"""
+        with self._lock:
+            channel = self._channels.get(url)
+            if channel is None or not channel.paused:
+                return
+            channel.paused = False
+            channel.next_due = time.monotonic() + delay
+            if not channel.probing:
+                self._push(channel)
+        self._wake()
+
+    def probe_now(self, url: str) -> bool:
+        """
+        立即檢測（例如收到 WebSub 通知）。檢測進行中時於結束後再檢測一次；
+        頻道不存在或已暫停（錄製中）時回傳 False。
+        """
+        with self._lock:
+            channel = self._channels.get(url)
+            if channel is None or channel.paused:
+                return False
+            if channel.probing:
+                channel.recheck = True
+                return True
+            channel.next_due = time.monotonic()
+            self._push(channel)
+        self._wake()
+        return True
+
+    def probe_stats(self) -> dict[str, Any]:
+        """所有頻道的檢測次數與相較固定間隔省下的檢測次數。"""
+        with self._lock:
+            channels = list(self._channels.values())
+        detections = sum(c.detections for c in channels)
+        saved = sum(c.probes_saved for c in channels)
+        return {
+            "probes": sum(c.probe_count for c in channels),
+            "detections": detections,
+            "probes_saved": saved,
+            "saved_per_detection": (
+                round(saved / detections, 1) if detections else None
+            ),
+        }
+
+    def next_delay(
+        self, channel: ChannelState, result: ProbeResult, now_epoch: float
+    ) -> float:
+        """依檢測結果決定距離下次檢測的秒數。"""
+        base = channel.interval
+        if not self.adaptive:
+            return base
+        result = self._known_state(channel, result)
+
+        if (
+            result.live_status == LIVE_STATUS_UPCOMING
+            and result.release_timestamp
+        ):
+            until_start = result.release_timestamp - now_epoch
+            tight = min(base, self.tight_interval)
+            if until_start > self.upcoming_lead:
+                return min(
+                    until_start - self.upcoming_lead, self.max_upcoming_sleep
+                )
+            if until_start > -self.upcoming_grace:
+                return tight
+            # 預定時間已過很久仍未開播，回到一般間隔
+            return base
+
+        if result.live_status == LIVE_STATUS_UPCOMING:
+            # 預定直播但不知道開始時間
+            return base
+
+        if self.cadence is not None:
+            learned = self.cadence(channel.url, now_epoch)
+            if learned is not None:
+                return learned
+
+        return min(
+            base * self.idle_backoff ** channel.idle_streak,
+            base * self.max_idle_factor,
+        )
+
+    @staticmethod
+    def _known_state(channel: ChannelState, result: ProbeResult) -> ProbeResult:
+        """檢測失敗時改用頻道上次得知的狀態（_complete 失敗時不會覆寫）。"""
+        if not result.error:
+            return result
+        return ProbeResult(
+            live_status=channel.live_status,
+            release_timestamp=channel.release_timestamp,
+        )
+
+    def _upcoming_sleep_limit(
+        self, result: ProbeResult, now_epoch: float
+    ) -> Optional[float]:
+        """預定直播休眠到開始前 upcoming_lead 秒的上限；其他情況為 None。"""
+        if (
+            not self.adaptive
+            or result.live_status != LIVE_STATUS_UPCOMING
+            or not result.release_timestamp
+        ):
+            return None
+        until_lead = result.release_timestamp - now_epoch - self.upcoming_lead
+        return until_lead if until_lead > 0 else None
+
+    def _push(self, channel: ChannelState) -> None:
+        heapq.heappush(self._heap, (channel.next_due, next(self._seq), channel))
+
+    # ------------------------------------------------------------------
+    # 執行與停止
+    # ------------------------------------------------------------------
+
+    def run(self) -> None:
+        """在目前執行緒執行排程迴圈，直到 stop() 被呼叫。"""
+        self._stopping = False
+        asyncio.run(self._main())
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake()
+
+    def _wake(self) -> None:
+        loop, event = self._loop, self._wakeup
+        if loop is not None and event is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: set[asyncio.Task] = set()
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="probe",
+        ) as executor:
+            try:
+                while not self._stopping:
+                    for job in self._probe_jobs(semaphore, executor):
+                        task = asyncio.create_task(job)
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+
+                    timeout = self._seconds_until_next()
+                    if timeout is not None and timeout > 0 and self.on_wait:
+                        self.on_wait(timeout)
+
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                # 進行中的檢測不強制中斷，只等待其結束
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                self._loop = None
+                self._wakeup = None
+
+    def _probe_jobs(
+        self, semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor
+    ) -> list[Coroutine[Any, Any, None]]:
+        due = self._pop_due()
+        if self.probe_batch is None or self.batch_size <= 1 or len(due) <= 1:
+            return [
+                self._probe_channel(channel, semaphore, executor)
+                for channel in due
+            ]
+        return [
+            self._probe_batch(due[i : i + self.batch_size], semaphore, executor)
+            for i in range(0, len(due), self.batch_size)
+        ]
+
+    def _pop_due(self) -> list[ChannelState]:
+        now = time.monotonic()
+        due: list[ChannelState] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, channel = heapq.heappop(self._heap)
+                if self._channels.get(channel.url) is not channel:
+                    continue
+                # 提前檢測（probe_now）後留在 heap 中的舊項目
+                if due_at != channel.next_due:
+                    continue
+                if channel.paused or channel.probing:
+                    continue
+                channel.probing = True
+                due.append(channel)
+        return due
+
+    def _seconds_until_next(self) -> Optional[float]:
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    async def _probe_channel(
+        self,
+        channel: ChannelState,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        result: Any = None
+        async with semaphore:
+            if self._stopping:
+                channel.probing = False
+                return
+            try:
+                result = await loop.run_in_executor(
+                    executor, self.probe, channel.url
+                )
+            except Exception as e:
+                result = ProbeResult(error=True)
+                self.log(f"檢測直播狀態錯誤 ({channel.url}): {e}")
+        self._complete(channel, result)
+
+    async def _probe_batch(
+        self,
+        channels: list[ChannelState],
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+    ) -> None:
+        """同時到期的多個頻道以一次 probe_batch 呼叫檢測。"""
+        loop = asyncio.get_running_loop()
+        results: dict[str, Any] = {}
+        async with semaphore:
+            if self._stopping:
+                for channel in channels:
+                    channel.probing = False
+                return
+            try:
+                results = await loop.run_in_executor(
+                    executor, self.probe_batch, [c.url for c in channels]
+                )
+            except Exception as e:
+                results = {c.url: ProbeResult(error=True) for c in channels}
+                self.log(f"批次檢測直播狀態錯誤 ({len(channels)} 個頻道): {e}")
+        for channel in channels:
+            self._complete(channel, results.get(channel.url))
+
+    def _complete(self, channel: ChannelState, result: Any) -> None:
+        """記錄檢測結果、決定下次檢測時間；偵測到直播時呼叫 on_live。"""
+        if isinstance(result, ProbeResult):
+            probe_result = result
+        elif isinstance(result, dict):
+            probe_result = ProbeResult(
+                live=True, info=result, live_status=LIVE_STATUS_LIVE
+            )
+        else:
+            probe_result = ProbeResult(live=bool(result))
+
+        live = probe_result.live
+        now = time.monotonic()
+        now_epoch = time.time()
+        saved: Optional[tuple[int, int, Optional[float]]] = None
+        with self._lock:
+            # 前一次檢測得到的預定開始時間，用來計算開播到偵測的延遲
+            announced = channel.release_timestamp
+            channel.probing = False
+            channel.probe_count += 1
+            channel.last_checked = now
+            if probe_result.error:
+                # 檢測失敗不代表沒有直播：保留上次得知的狀態與預定開始時間
+                channel.error_count += 1
+            else:
+                channel.last_live = live
+                channel.live_status = probe_result.live_status
+                channel.release_timestamp = probe_result.release_timestamp
+
+            if channel.cycle_started is None:
+                channel.cycle_started = now
+            channel.cycle_probes += 1
+            if live or probe_result.live_status == LIVE_STATUS_UPCOMING:
+                channel.idle_streak = 0
+            elif not probe_result.error:
+                channel.idle_streak += 1
+
+            if live:
+                channel.paused = True
+                channel.live_info = probe_result.info
+                channel.live_detected_at = now_epoch
+                # 固定間隔檢測在同一段時間內需要的次數（含第一次）
+                baseline = 1 + int((now - channel.cycle_started) // channel.interval)
+                saved = (
+                    channel.cycle_probes,
+                    baseline,
+                    now_epoch - announced if announced else None,
+                )
+                channel.probes_saved += baseline - channel.cycle_probes
+                channel.detections += 1
+                channel.cycle_started = None
+                channel.cycle_probes = 0
+
+            delay = self.next_delay(channel, probe_result, now_epoch)
+            if self.jitter:
+                delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+                limit = self._upcoming_sleep_limit(
+                    self._known_state(channel, probe_result), now_epoch
+                )
+                if limit is not None:
+                    delay = min(delay, limit)
+            channel.next_due = now + delay
+            if channel.recheck:
+                channel.recheck = False
+                channel.next_due = now
+            if not channel.paused and self._channels.get(channel.url) is channel:
+                self._push(channel)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+        if saved is not None:
+            probes, baseline, delay = saved
+            if baseline >= probes:
+                diff = f"節省 {baseline - probes} 次"
+            else:
+                diff = f"多用 {probes - baseline} 次"
+            message = (
+                f"本次偵測到直播前共檢測 {probes} 次"
+                f"（固定間隔需 {baseline} 次，{diff}）"
+            )
+            if delay is not None:
+                message += f"，預定時間後 {max(0.0, delay):.0f} 秒偵測到"
+            self.log(f"{message}: {channel.url}")
+
+        if live and not self._stopping:
+            try:
+                self.on_live(channel)
+            except Exception as e:
+                self.log(f"啟動錄製失敗 ({channel.url}): {e}")
+                self.resume(channel.url, channel.interval)
@@ -0,0 +1,199 @@
+"""
+分段錄製的輸出清單。
+
+長時間直播寫成單一檔案時，搬移、檢查與後製都要等整場結束，合併失敗
+還會整個遺失。分段模式由 ffmpeg 的 segment muxer 每隔固定秒數切出一個
+可獨立播放的檔案；ffmpeg 每完成一段就在 segment list（CSV）追加一行，
+SegmentManifest 讀取新的行並維護每場直播的 JSON 清單（*.manifest.json），
+下游可以只處理清單中已完成的段落，錄製同時進行。
+"""
+
+import csv
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class Segment:
+    index: int
+    file: str
+    # 在該次 ffmpeg 輸入中的時間範圍（秒）；重新啟動後從 0 重新起算
+    start: float
+    end: float
+    size: int
+    # 第幾次啟動 ffmpeg（0 為第一次）
+    run: int
+    completed_at: float
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+class SegmentManifest:
+    """
+    一場直播的分段清單。
+
+    base 為不含副檔名的輸出路徑；段落檔為 base-seg00000.ext，清單為
+    base.manifest.json。每次啟動 ffmpeg 前呼叫 begin_run() 取得 segment
+    list 路徑，poll() 回傳新完成的段落，finish() 寫入最終狀態。
+    重新啟動後段號接續，不會覆蓋已完成的段落。
+    """
+
+    def __init__(
+        self,
+        base: str,
+        container: str,
+        segment_duration: float,
+        video_id: str,
+        title: str,
+        channel_url: str,
+        list_dir: str,
+    ) -> None:
+        self.base = base
+        self.container = container
+        self.segment_duration = segment_duration
+        self.video_id = video_id
+        self.title = title
+        self.channel_url = channel_url
+        self.list_dir = list_dir
+        self.path = f"{base}.manifest.json"
+        self.directory = os.path.dirname(base)
+
+        self.state = "recording"
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.segments: list[Segment] = []
+        self.runs = 0
+
+        self._list_path: Optional[str] = None
+        self._offset = 0
+        self._pending = b""
+        self._write()
+
+    @property
+    def output_pattern(self) -> str:
+        """ffmpeg 的段落檔名樣板（% 需跳脫）。"""
+        return f"{self.base.replace('%', '%%')}-seg%05d.{self.container}"
+
+    @property
+    def next_index(self) -> int:
+        return self.segments[-1].index + 1 if self.segments else 0
+
+    def begin_run(self) -> str:
+        """準備新一次 ffmpeg 的 segment list，回傳其路徑。"""
+        self._end_run()
+        os.makedirs(self.list_dir, exist_ok=True)
+        self._list_path = os.path.join(
+            self.list_dir,
+            f"{self.video_id or 'live'}-{int(time.time() * 1000)}.csv",
+        )
+        self._offset = 0
+        self._pending = b""
+        self.runs += 1
+        return self._list_path
+
+    def poll(self) -> list[Segment]:
+        """讀取 segment list 新增的行，回傳新完成的段落並更新清單。"""
+        if self._list_path is None:
+            return []
+        try:
+            with open(self._list_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return []
+        self._offset += len(data)
+        lines = (self._pending + data).split(b"\n")
+        # 最後一行可能還沒寫完
+        self._pending = lines.pop()
+
+        added: list[Segment] = []
+        for row in csv.reader(
+            line.decode("utf-8", errors="replace") for line in lines if line
+        ):
+            segment = self._parse_row(row)
+            if segment is not None:
+                self.segments.append(segment)
+                added.append(segment)
+        if added:
+            self._write()
+        return added
+
+    def finish(self, state: str) -> list[Segment]:
+        """讀完最後的段落並寫入最終狀態，回傳最後新增的段落。"""
+        added = self.poll()
+        self._end_run()
+        self.state = state
+        self.finished_at = time.time()
+        self._write()
+        return added
+
+    def total_duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "video_id": self.video_id,
+            "title": self.title,
+            "channel_url": self.channel_url,
+            "container": self.container,
+            "segment_duration": self.segment_duration,
+            "state": self.state,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total_duration": round(self.total_duration(), 3),
+            "segments": [
+                dict(asdict(segment), duration=round(segment.duration, 3))
+                for segment in self.segments
+            ],
+        }
+
+    # ------------------------------------------------------------------
+
+    def _parse_row(self, row: list[str]) -> Optional[Segment]:
+        # ffmpeg 的 CSV 格式：檔名,開始時間,結束時間
+        if len(row) < 3:
+            return None
+        try:
+            start, end = float(row[1]), float(row[2])
+        except ValueError:
+            return None
+        name = os.path.basename(row[0])
+        try:
+            size = os.path.getsize(os.path.join(self.directory, name))
+        except OSError:
+            size = 0
+        return Segment(
+            index=self.next_index,
+            file=name,
+            start=start,
+            end=end,
+            size=size,
+            run=self.runs - 1,
+            completed_at=time.time(),
+        )
+
+    def _end_run(self) -> None:
+        if self._list_path is None:
+            return
+        self.poll()
+        try:
+            os.remove(self._list_path)
+        except OSError:
+            pass
+        self._list_path = None
+
+    def _write(self) -> None:
+        # 先寫暫存檔再取代，讀取端不會看到寫到一半的清單
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
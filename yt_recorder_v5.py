@@ -1,20 +1,22 @@
+import multiprocessing
 import os
 
 # 抑制 macOS 上 Tkinter 的版本警告
 os.environ["TK_SILENCE_DEPRECATION"] = "1"
 
-import sys
-import shutil
-from pathlib import Path
-from typing import Optional
-
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, messagebox
-import subprocess
-import time
 import threading
-from datetime import datetime
-import re
+
+from yt_recorder_core import (
+    DEFAULT_COOKIE_TEST_URL,
+    RecorderEngine,
+    default_download_dir,
+    parse_channel_urls,
+    validate_url,
+)
+from yt_recorder_log import LogPipeline, create_file_logger
+from yt_recorder_recording import format_bytes
 
 
 class YTRecorderApp:
@@ -34,21 +36,10 @@ class YTRecorderApp:
     CURSOR_COLOR = "#ffffff"
     BORDER_COLOR = "#555555"
 
-    # User-Agent / Referer 及 403 workaround
-    USER_AGENT = (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/121.0.0.0 Safari/537.36"
-    )
-    REFERER = "https://www.youtube.com/"
-
-    # yt-dlp extractor 403 workaround
-    EXTRACTOR_ARGS = (
-        "youtube:player_client=default,web_safari;player_js_version=actual"
-    )
-
-    # 如果你使用的不是 Chrome 預設 Profile，可把這行改成例如 "chrome:Profile 1"
-    COOKIES_FROM_BROWSER = "chrome"
+    # 日誌區只保留最近的行數，完整紀錄見日誌檔
+    LOG_MAX_LINES = 2000
+    # 日誌批次寫入畫面的間隔（毫秒）
+    LOG_FLUSH_MS = 100
 
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
@@ -61,10 +52,17 @@ class YTRecorderApp:
         self.main_container = tk.Frame(self.root, bg=self.BG_COLOR)
         self.main_container.pack(fill="both", expand=True)
 
-        # 狀態 / 執行緒
+        # 狀態
         self.is_monitoring = False
-        self.monitor_thread: Optional[threading.Thread] = None
-        self.stop_event = threading.Event()
+
+        # 日誌：各執行緒只寫入佇列，由 _flush_logs 定時批次更新畫面
+        try:
+            file_logger = create_file_logger()
+        except OSError as e:
+            print(f"無法建立日誌檔: {e}")
+            file_logger = None
+        self.log_pipeline = LogPipeline(file_logger=file_logger)
+        self._log_dropped_shown = 0
 
         # UI 綁定的變數
         self.cookie_status_var = tk.StringVar(value="等待檢查...")
@@ -73,12 +71,20 @@ class YTRecorderApp:
         )
 
         self.check_interval_var = tk.StringVar(value="300")
+        self.max_probe_var = tk.StringVar(value="8")
+        self.max_record_var = tk.StringVar(value="2")
 
-        default_dir = os.path.join(
-            os.path.expanduser("~"), "Downloads", "yt_recorder_downloads"
-        )
+        default_dir = default_download_dir()
         self.download_dir = tk.StringVar(value=default_dir)
 
+        # 錄製核心（監控、檢測、錄製都在這裡，GUI 只負責顯示）
+        self.engine = RecorderEngine(
+            download_dir=default_dir,
+            log=self.log,
+            on_status=self._set_status,
+            on_error=self._show_error,
+        )
+
         self.channel_url = tk.StringVar(
             value="https://www.youtube.com/@Umitw46/live"
         )
@@ -93,86 +99,11 @@ class YTRecorderApp:
         self.root.bind("<Control-l>", lambda e: self.clear_logs())
         self.root.bind("<Control-L>", lambda e: self.clear_logs())
 
+        self.root.after(self.LOG_FLUSH_MS, self._flush_logs)
+
         # 啟動後自動做一次 Cookie 檢查（靜默）
         self.root.after(1000, lambda: self.check_cookies_thread(silent=True))
 
-    # ------------------------------------------------------------------
-    # 共用工具：yt-dlp 路徑與參數
-    # ------------------------------------------------------------------
-
-    def _get_ytdlp_executable(self) -> Optional[str]:
-        """
-        取得可用的 yt-dlp 執行檔路徑。
-
-        優先順序：
-        1. 打包後 .app 內的 yt-dlp
-        2. 與此 .py 同目錄的 yt-dlp
-        3. 系統 PATH 內的 yt-dlp
-        """
-        candidates: list[str] = []
-
-        # 1) 打包後 (.app / PyInstaller frozen)
-        try:
-            if getattr(sys, "frozen", False):
-                exe_dir = os.path.dirname(sys.executable)
-                # PyInstaller --add-binary "yt-dlp_macos:yt-dlp"
-                candidates.append(os.path.join(exe_dir, "yt-dlp"))
-
-                # 備用：.app/Contents/Resources/yt-dlp
-                app_exec = Path(sys.executable).resolve()
-                resources_path = app_exec.parents[1] / "Resources" / "yt-dlp"
-                candidates.append(str(resources_path))
-        except Exception:
-            pass
-
-        # 2) 開發模式：同目錄 yt-dlp
-        try:
-            script_dir = Path(__file__).resolve().parent
-            candidates.append(str(script_dir / "yt-dlp"))
-        except Exception:
-            pass
-
-        # 3) 系統 PATH
-        path_exe = shutil.which("yt-dlp")
-        if path_exe:
-            candidates.append(path_exe)
-
-        for p in candidates:
-            if p and os.path.exists(p) and os.access(p, os.X_OK):
-                return p
-
-        return None
-
-    def _base_ytdlp_args(self) -> list[str]:
-        """所有 yt-dlp 呼叫共用的 Anti-403 + Cookie 參數。"""
-        return [
-            "--ignore-config",
-            "--no-cache-dir",
-            "--cookies-from-browser",
-            self.COOKIES_FROM_BROWSER,
-            "--user-agent",
-            self.USER_AGENT,
-            "--referer",
-            self.REFERER,
-            "--extractor-args",
-            self.EXTRACTOR_ARGS,
-            "--remote-components",
-            "ejs:github",
-        ]
-
-    def _build_ytdlp_command(
-        self, extra_args: list[str], url: Optional[str] = None
-    ) -> list[str]:
-        """組合完整 yt-dlp 命令列。找不到執行檔時丟 FileNotFoundError。"""
-        exe = self._get_ytdlp_executable()
-        if not exe:
-            raise FileNotFoundError("yt-dlp executable not found")
-        cmd = [exe]
-        cmd.extend(extra_args)
-        if url:
-            cmd.append(url)
-        return cmd
-
     # ------------------------------------------------------------------
     # GUI 建立
     # ------------------------------------------------------------------
@@ -283,7 +214,7 @@ class YTRecorderApp:
 
         tk.Label(
             config_frame,
-            text="範例：https://www.youtube.com/@頻道名稱/live",
+            text="範例：https://www.youtube.com/@頻道名稱/live（多個頻道以逗號或空白分隔）",
             bg=self.BG_COLOR,
             fg="#aaaaaa",
             font=("", 9),
@@ -320,6 +251,44 @@ class YTRecorderApp:
             font=("", 9),
         ).pack(side="left", padx=8)
 
+        tk.Label(interval_frame, text="同時檢測:", **label_style).pack(
+            side="left", padx=(8, 0)
+        )
+
+        tk.Spinbox(
+            interval_frame,
+            from_=1,
+            to=64,
+            textvariable=self.max_probe_var,
+            width=5,
+            validate="key",
+            validatecommand=(self.root.register(self._validate_number), "%P"),
+            bg=self.ENTRY_BG,
+            fg=self.ENTRY_FG,
+            insertbackground=self.CURSOR_COLOR,
+            highlightbackground=self.BORDER_COLOR,
+            relief="flat",
+        ).pack(side="left", padx=8)
+
+        tk.Label(interval_frame, text="同時錄製:", **label_style).pack(
+            side="left", padx=(8, 0)
+        )
+
+        tk.Spinbox(
+            interval_frame,
+            from_=1,
+            to=16,
+            textvariable=self.max_record_var,
+            width=5,
+            validate="key",
+            validatecommand=(self.root.register(self._validate_number), "%P"),
+            bg=self.ENTRY_BG,
+            fg=self.ENTRY_FG,
+            insertbackground=self.CURSOR_COLOR,
+            highlightbackground=self.BORDER_COLOR,
+            relief="flat",
+        ).pack(side="left", padx=8)
+
         # 2. 影片測試下載
         test_frame = tk.LabelFrame(
             self.main_container,
@@ -454,6 +423,16 @@ class YTRecorderApp:
             cursor="hand2",
         ).pack(side="right")
 
+        tk.Button(
+            log_control_frame,
+            text="錄製狀態",
+            command=self.show_recording_status,
+            bg="#95a5a6",
+            fg="black",
+            padx=10,
+            cursor="hand2",
+        ).pack(side="right", padx=5)
+
         self.log_text = scrolledtext.ScrolledText(
             status_frame,
             height=15,
@@ -488,26 +467,38 @@ class YTRecorderApp:
         return value == "" or value.isdigit()
 
     def _validate_url(self, url: str) -> bool:
-        pattern = re.compile(r"^https?://(www\.)?youtube\.com/.+$")
-        return bool(pattern.match(url))
+        return validate_url(url)
 
     def log(self, message: str) -> None:
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        full_msg = f"[{timestamp}] {message}"
-
-        def _update() -> None:
+        """可從任意執行緒呼叫；實際寫入畫面由 _flush_logs 批次處理。"""
+        self.log_pipeline.push(message)
+
+    def _flush_logs(self) -> None:
+        lines = self.log_pipeline.drain()
+        dropped = self.log_pipeline.dropped
+        if dropped != self._log_dropped_shown:
+            lines.append(
+                f"（日誌過多，畫面略過 {dropped - self._log_dropped_shown} 則，"
+                "完整內容請見日誌檔）"
+            )
+            self._log_dropped_shown = dropped
+        if lines:
             self.log_text.config(state="normal")
-            self.log_text.insert(tk.END, full_msg + "\n")
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+            # 只保留最後 LOG_MAX_LINES 行（最後一行是空行）
+            total = int(self.log_text.index("end-1c").split(".")[0])
+            excess = total - 1 - self.LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
             self.log_text.see(tk.END)
             self.log_text.config(state="disabled")
 
-        self.root.after(0, _update)
-        self.root.after(
-            0,
-            lambda: self.status_label.config(
-                text=message[:100] + "..." if len(message) > 100 else message
-            ),
-        )
+            # 狀態列顯示最後一則訊息（去掉時間戳記）
+            last = lines[-1].split("] ", 1)[-1]
+            self.status_label.config(
+                text=last[:100] + "..." if len(last) > 100 else last
+            )
+        self.root.after(self.LOG_FLUSH_MS, self._flush_logs)
 
     def clear_logs(self) -> None:
         self.log_text.config(state="normal")
@@ -515,6 +506,14 @@ class YTRecorderApp:
         self.log_text.config(state="disabled")
         self.log("日誌已清除")
 
+    def _set_status(self, text: str) -> None:
+        """核心回呼：更新底部狀態列（可從任意執行緒呼叫）。"""
+        self.root.after(0, lambda: self.status_label.config(text=text))
+
+    def _show_error(self, title: str, message: str) -> None:
+        """核心回呼：顯示錯誤對話框（可從任意執行緒呼叫）。"""
+        self.root.after(0, lambda: messagebox.showerror(title, message))
+
     # ------------------------------------------------------------------
     # yt-dlp 更新、路徑選擇
     # ------------------------------------------------------------------
@@ -523,36 +522,8 @@ class YTRecorderApp:
         """嘗試更新內建或系統的 yt-dlp。"""
 
         def _update_thread() -> None:
-            self.log("正在更新 yt-dlp，請稍候...")
             try:
-                exe = self._get_ytdlp_executable()
-                if exe and os.path.basename(exe).startswith("yt-dlp"):
-                    # 優先更新內建二進位檔（支援 -U）
-                    result = subprocess.run(
-                        [exe, "-U"],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                    )
-                    if result.stdout.strip():
-                        self.log(result.stdout.strip())
-                    if result.stderr.strip():
-                        self.log(result.stderr.strip())
-                    self.log("更新程序已結束。")
-                else:
-                    # 備用：使用 pip 更新系統套件
-                    cmd = ["pip3", "install", "--upgrade", "yt-dlp"]
-                    result = subprocess.run(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                    )
-                    if result.stdout.strip():
-                        self.log(result.stdout.strip())
-                    if result.stderr.strip():
-                        self.log(result.stderr.strip())
-                    self.log("已嘗試透過 pip 更新 yt-dlp。")
+                self.engine.update_ytdlp()
                 self.root.after(
                     0,
                     lambda: messagebox.showinfo(
@@ -568,6 +539,7 @@ class YTRecorderApp:
         path = filedialog.askdirectory(initialdir=self.download_dir.get())
         if path:
             self.download_dir.set(path)
+            self.engine.download_dir = path
             self.log(f"已更改下載路徑: {path}")
 
     # ------------------------------------------------------------------
@@ -590,30 +562,8 @@ class YTRecorderApp:
         ).start()
 
     def _download_video_impl(self, url: str) -> None:
-        output_dir = self.download_dir.get()
-        try:
-            os.makedirs(output_dir, exist_ok=True)
-        except Exception as e:
-            self.log(f"無法建立資料夾: {e}")
-            return
-
-        output_path = os.path.join(output_dir, "%(title)s-%(id)s.%(ext)s")
-
         try:
-            command = self._build_ytdlp_command(
-                self._base_ytdlp_args()
-                + [
-                    "-f",
-                    "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                    "--merge-output-format",
-                    "mp4",
-                    "-o",
-                    output_path,
-                    "--newline",
-                    "--progress",
-                ],
-                url,
-            )
+            ok = self.engine.download_video(url)
         except FileNotFoundError:
             self.log("找不到 yt-dlp 可執行檔，請確認內建 yt-dlp 是否已正確打包。")
             self.root.after(
@@ -626,45 +576,15 @@ class YTRecorderApp:
             )
             return
 
-        try:
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                shell=False,
-                bufsize=1,
+        if ok:
+            self.root.after(
+                0,
+                lambda: messagebox.showinfo("成功", "影片下載完成。"),
             )
-
-            for line in process.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-                if "WARNING" in line and "Remote components" in line:
-                    continue
-                if "Destination:" in line or "Merging" in line:
-                    self.log(line)
-                elif "[download]" in line and "%" in line:
-                    self.log(line)
-
-            process.wait()
-            if process.returncode == 0:
-                self.log("測試影片下載完成。")
-                self.root.after(
-                    0,
-                    lambda: messagebox.showinfo("成功", "影片下載完成。"),
-                )
-            else:
-                self.log(f"下載失敗，返回碼: {process.returncode}")
-                self.root.after(
-                    0,
-                    lambda: messagebox.showerror("錯誤", "影片下載失敗，請檢查日誌。"),
-                )
-        except Exception as e:
-            self.log(f"下載錯誤: {e}")
+        else:
             self.root.after(
                 0,
-                lambda: messagebox.showerror("錯誤", f"下載錯誤: {e}"),
+                lambda: messagebox.showerror("錯誤", "影片下載失敗，請檢查日誌。"),
             )
 
     # ------------------------------------------------------------------
@@ -681,7 +601,7 @@ class YTRecorderApp:
     def _check_cookies_impl(self, silent: bool = False) -> None:
         test_url = self.cookie_test_url_var.get().strip()
         if not test_url:
-            test_url = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+            test_url = DEFAULT_COOKIE_TEST_URL
 
         if not self._validate_url(test_url):
             self.log("無效的 YouTube 網址")
@@ -692,12 +612,20 @@ class YTRecorderApp:
             self.log("正在檢查 Cookie 權限...")
         self._update_cookie_ui(False, "檢查中...", self.COLOR_WARNING)
 
-        try:
-            command = self._build_ytdlp_command(
-                self._base_ytdlp_args() + ["--print", "title"],
-                test_url,
-            )
-        except FileNotFoundError:
+        result = self.engine.check_cookies(test_url, verbose=not silent)
+        if result.ok:
+            title = result.title
+            msg = f"驗證成功 (標題: {title[:25]}...)"
+            self._update_cookie_ui(True, msg, self.COLOR_SUCCESS)
+            if not silent:
+                self.root.after(
+                    0,
+                    lambda: messagebox.showinfo(
+                        "驗證成功",
+                        f"Cookie 運作正常。\n\n影片標題：{title}",
+                    ),
+                )
+        elif result.reason == "not_found":
             self._update_cookie_ui(False, "找不到 yt-dlp", self.COLOR_ERROR)
             if not silent:
                 self.root.after(
@@ -708,43 +636,14 @@ class YTRecorderApp:
                         "請重新安裝或確認打包時已包含 yt-dlp。",
                     ),
                 )
-            return
-
-        try:
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=60,
-                shell=False,
-            )
-            if result.returncode == 0:
-                title = result.stdout.strip()
-                msg = f"驗證成功 (標題: {title[:25]}...)"
-                self._update_cookie_ui(True, msg, self.COLOR_SUCCESS)
-                if not silent:
-                    self.log(f"Cookie 有效，成功讀取影片: {title}")
-                    self.root.after(
-                        0,
-                        lambda: messagebox.showinfo(
-                            "驗證成功",
-                            f"Cookie 運作正常。\n\n影片標題：{title}",
-                        ),
-                    )
-            else:
-                stderr = result.stderr
-                self._update_cookie_ui(False, "存取失敗", self.COLOR_ERROR)
-                if "WARNING" not in stderr or "Remote components" not in stderr:
-                    self.log(f"Cookie 檢查失敗: {stderr[:100]}")
-                if not silent:
-                    self._show_cookie_error(stderr)
-        except subprocess.TimeoutExpired:
+        elif result.reason == "extraction":
+            self._update_cookie_ui(False, "存取失敗", self.COLOR_ERROR)
+            if not silent:
+                self._show_cookie_error(result.error)
+        elif result.reason == "timeout":
             self._update_cookie_ui(False, "檢查超時", self.COLOR_ERROR)
-            self.log("Cookie 檢查超時 (60 秒)")
-        except Exception as e:
+        else:
             self._update_cookie_ui(False, "錯誤", self.COLOR_ERROR)
-            self.log(f"未知錯誤: {e}")
 
     def _show_cookie_error(self, stderr: str) -> None:
         msg = "無法讀取影片資訊。\n\n"
@@ -799,228 +698,181 @@ class YTRecorderApp:
                     return
 
             # 驗證網址
-            url = self.channel_url.get().strip()
-            if not self._validate_url(url):
+            urls = parse_channel_urls(self.channel_url.get())
+            if not urls:
                 messagebox.showerror("錯誤", "請輸入有效的 YouTube 網址")
                 return
+            for url in urls:
+                if not self._validate_url(url):
+                    messagebox.showerror("錯誤", f"無效的 YouTube 網址：{url}")
+                    return
+
+            try:
+                max_probes = int(self.max_probe_var.get())
+            except ValueError:
+                max_probes = 8
+            try:
+                max_records = int(self.max_record_var.get())
+            except ValueError:
+                max_records = 2
 
             # 開始監控
             self.is_monitoring = True
-            self.stop_event.clear()
             self.btn_start.config(
                 text="停止監控 (Ctrl+S)",
                 bg=self.COLOR_DANGER,
             )
-            self.log(f"開始監控 (間隔: {interval} 秒)")
-            self.monitor_thread = threading.Thread(
-                target=self.monitor_loop,
-                daemon=True,
+            self.log(f"檢測間隔: {interval} 秒")
+            self.engine.start_monitoring(
+                [(url, interval) for url in urls],
+                max_probes=max_probes,
+                max_records=max_records,
             )
-            self.monitor_thread.start()
         else:
             # 停止監控
             self.is_monitoring = False
-            self.stop_event.set()
+            self.engine.stop_monitoring()
             self.btn_start.config(
                 text="開始自動監控 (Ctrl+S)",
                 bg=self.COLOR_PRIMARY,
             )
             self.log("正在停止監控...")
 
-    def is_live(self, url: str) -> bool:
-        """
-        檢查指定網址是否正在直播（包含會員直播，只要 Cookie 有權限）。
-
-        使用 yt-dlp 的 is_live 欄位作判斷。
-        """
-        try:
-            command = self._build_ytdlp_command(
-                self._base_ytdlp_args() + ["--print", "%(is_live)s"],
-                url,
+    def show_recording_status(self) -> None:
+        """在日誌列出每個錄製 worker 的狀態。"""
+        summary = self.engine.recording_status()
+        if summary is None:
+            self.log("尚未開始監控，沒有錄製 worker。")
+            return
+        self.log(
+            f"錄製 worker：進行中 {summary['active']} / 上限 "
+            f"{summary['max_workers']}，等候佇列 {summary['queue_depth']}"
+        )
+        probes = summary["probes"]
+        if probes:
+            self.log(
+                f"已檢測 {probes['probes']} 次，偵測到直播 "
+                f"{probes['detections']} 次，相較固定間隔共節省 "
+                f"{probes['probes_saved']} 次檢測"
             )
-        except FileNotFoundError:
-            self.log("找不到 yt-dlp，可執行檔遺失，無法檢測直播狀態。")
-            return False
-
-        try:
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=30,
-                shell=False,
+        light = summary["light"]
+        if light and light["checks"]:
+            self.log(
+                f"輕量檢測 {light['checks']} 次（平均 {light['avg_ms']} ms），"
+                f"略過完整擷取 {light['skipped']} 次"
             )
-            if result.returncode == 0:
-                flag = result.stdout.strip().lower()
-                if flag == "true":
-                    self.log("偵測到直播（可能包含會員直播）。")
-                    return True
-                else:
-                    self.log("目前無直播。")
-                    return False
-            else:
-                stderr = result.stderr.strip()
-                if "members-only" in stderr.lower():
-                    self.log("偵測到會員直播，但目前 Cookie 沒有權限。")
-                else:
-                    self.log(f"檢測直播狀態失敗: {stderr[:120]}")
-                return False
-        except subprocess.TimeoutExpired:
-            self.log("檢測直播狀態超時。")
-            return False
-        except Exception as e:
-            self.log(f"檢測直播狀態錯誤: {e}")
-            return False
-
-    def record_live_stream(self, url: str) -> None:
-        """錄製直播（不在日誌顯示進度，只更新底部狀態列）。"""
-        output_dir = self.download_dir.get()
-        try:
-            os.makedirs(output_dir, exist_ok=True)
-        except Exception as e:
-            self.log(f"無法建立資料夾: {e}")
-            return
-
-        output_path = os.path.join(output_dir, "%(title)s-%(id)s.%(ext)s")
-
-        try:
-            # 移除 --concurrent-fragments 與 --no-part，避免大量 .part 檔
-            command = self._build_ytdlp_command(
-                self._base_ytdlp_args()
-                + [
-                    "--live-from-start",
-                    "--wait-for-video",
-                    "5-60",
-                    "-f",
-                    "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                    "--merge-output-format",
-                    "mp4",
-                    "--hls-use-mpegts",
-                    "--newline",
-                    "--progress",
-                    "-o",
-                    output_path,
-                ],
-                url,
+        limit = summary["rate_limit"]
+        if limit["delayed"] or limit["queue_depth"]:
+            self.log(
+                f"yt-dlp 限流：排隊中 {limit['queue_depth']}"
+                f"（最多 {limit['max_queue_depth']}），"
+                f"延後 {limit['delayed']}/{limit['acquired']} 次，"
+                f"平均等待 {limit['avg_wait']} 秒，最長 {limit['max_wait']} 秒"
             )
-        except FileNotFoundError:
-            self.log("找不到 yt-dlp，可執行檔遺失，無法開始錄製直播。")
-            self.root.after(
-                0,
-                lambda: messagebox.showerror(
-                    "錯誤",
-                    "找不到內建 yt-dlp。\n\n"
-                    "請重新安裝或確認打包時已包含 yt-dlp。",
-                ),
+        cache = summary["extract_cache"]
+        if cache["hits"] or cache["coalesced"]:
+            self.log(
+                f"擷取快取：命中 {cache['hits']} 次，"
+                f"合併進行中的擷取 {cache['coalesced']} 次，"
+                f"實際擷取 {cache['misses']} 次"
             )
-            return
-
-        self.log("啟動直播錄製...")
-        process: Optional[subprocess.Popen] = None
-
-        try:
-            start_time = time.time()
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                shell=False,
-                bufsize=1,
+        websub = summary["websub"]
+        if websub:
+            self.log(
+                f"WebSub 訂閱生效 {websub['active']}/{websub['channels']}，"
+                f"通知 {websub['notifications']} 次"
+                f"（觸發檢測 {websub['triggers']} 次），"
+                f"通知到開始錄製平均 {websub['avg_latency'] or '-'} 秒"
             )
-
-            for line in process.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-                if "WARNING" in line and "Remote components" in line:
-                    continue
-
-                # 只記錄重要事件，不記錄 [download] 進度
-                if "Destination:" in line or "Merging" in line or "ERROR" in line:
-                    self.log(line)
-
-                if (
-                    "HTTP Error 403" in line
-                    and "Retrying" not in line
-                ):
-                    self.log("偵測到 HTTP 403，請嘗試更新 yt-dlp 或更換 IP。")
-
-                if self.stop_event.is_set():
-                    process.terminate()
-                    self.log("使用者要求停止錄製。")
-                    break
-
-                elapsed = int(time.time() - start_time)
-                h, rem = divmod(elapsed, 3600)
-                m, s = divmod(rem, 60)
-
-                def update_status() -> None:
-                    self.status_label.config(
-                        text=f"錄製中... {h:02d}:{m:02d}:{s:02d}"
+        for url, learned in summary["cadence"].items():
+            self.log(
+                f"  {url} 依 {learned['samples']} 次開播紀錄調整檢測間隔 "
+                f"{learned['min_interval']}–{learned['max_interval']} 秒"
+            )
+        stalls = summary["stalls"]
+        if stalls["stalls"]:
+            self.log(
+                f"停滯 {stalls['stalls']} 次，重新啟動 {stalls['restarts']} 次，"
+                f"放棄 {stalls['give_ups']} 次，"
+                f"平均恢復 {stalls['avg_recovery'] or '-'} 秒"
+                + (
+                    f"，{stalls['gaps']} 次無法接續（約缺少 "
+                    f"{stalls['lost_seconds']} 秒）"
+                    if stalls["gaps"]
+                    else ""
+                )
+            )
+        forbidden = summary["forbidden"]
+        if forbidden["errors"]:
+            self.log(
+                f"HTTP 403 {forbidden['errors']} 次，恢復嘗試 "
+                f"{forbidden['attempts']} 次，成功 {forbidden['recovered']} 次，"
+                f"放棄 {forbidden['give_ups']} 次，"
+                f"恢復共花 {forbidden['total_recovery']} 秒"
+            )
+        output = summary["output"]
+        if output["recordings"]:
+            self.log(
+                f"輸出（{output['mode']}）{output['recordings']} 場，"
+                f"收尾平均 {output['avg_finalize']} 秒 / 最長 "
+                f"{output['max_finalize']} 秒，磁碟用量峰值 / 檔案大小 "
+                f"{output['avg_peak_ratio'] or '-'} 倍，"
+                f"已完成分段 {output['segments']} 個"
+            )
+        post = summary["postprocess"]
+        if post and (post["completed"] or post["failed"] or post["running"]):
+            durations = "，".join(
+                f"{kind} 平均 {job['avg']} 秒"
+                for kind, job in sorted(post["jobs"].items())
+            )
+            self.log(
+                f"後製：等候 {post['queue_depth']}，執行中 {post['running']}，"
+                f"完成 {post['completed']}，失敗 {post['failed']}"
+                + (f"（{durations}）" if durations else "")
+            )
+        verify = summary["verify"]
+        if verify and (verify["completed"] or verify["failed"] or verify["running"]):
+            verdicts = verify["verdicts"]
+            self.log(
+                f"完整性驗證：等候 {verify['queue_depth']}，"
+                f"正常 {verdicts['ok']}，警告 {verdicts['warning']}，"
+                f"損壞 {verdicts['damaged']}，"
+                f"需要重新下載 {verdicts['needs_refetch']}"
+            )
+        fragments = summary["fragments"]
+        backfill = fragments["backfill"]
+        if fragments["with_gaps"] or (backfill and backfill["pending"]):
+            self.log(
+                f"片段缺口：{fragments['with_gaps']}/{fragments['outputs']} 個"
+                f"輸出有缺口，共缺 {fragments['gap_fragments']} 個片段"
+                + (
+                    f"；補抓等候 {backfill['pending']}，完成 {backfill['completed']}，"
+                    f"失敗 {backfill['failed']}，已補 {backfill['fragments']} 個片段"
+                    if backfill
+                    else ""
+                )
+            )
+        for status in summary["workers"]:
+            if status["state"] == "idle":
+                self.log(f"  #{status['worker_id']} 閒置")
+            else:
+                line = (
+                    f"  #{status['worker_id']} 錄製中 {status['label']} "
+                    f"({int(status['elapsed'])} 秒)"
+                )
+                progress = summary["progress"].get(status["label"])
+                if progress:
+                    line += (
+                        f" 已下載 {format_bytes(progress['downloaded_bytes'])}"
                     )
-
-                self.root.after(0, update_status)
-
-            process.wait()
-            if process.returncode == 0:
-                self.log("錄製完成。")
-            elif not self.stop_event.is_set():
-                self.log(f"錄製結束，返回碼: {process.returncode}")
-        except Exception as e:
-            self.log(f"錄製錯誤: {e}")
-        finally:
-            if process and process.poll() is None:
-                try:
-                    process.terminate()
-                    process.wait(timeout=5)
-                except Exception:
-                    process.kill()
-
-    def monitor_loop(self) -> None:
-        """主監控迴圈。"""
-        url = self.channel_url.get().strip()
-        while not self.stop_event.is_set():
-            try:
-                try:
-                    check_interval = int(self.check_interval_var.get())
-                except ValueError:
-                    check_interval = 120
-
-                self.log("檢測直播狀態中...")
-                if self.is_live(url):
-                    self.log("確認到直播信號，準備開始錄製...")
-                    time.sleep(3)
-                    self.record_live_stream(url)
-                    self.log("錄製結束，冷卻 60 秒...")
-                    for _ in range(60):
-                        if self.stop_event.is_set():
-                            break
-                        time.sleep(1)
-                else:
-                    for i in range(check_interval):
-                        if self.stop_event.is_set():
-                            break
-                        if i % 10 == 0:
-                            remaining = check_interval - i
-
-                            def update_waiting() -> None:
-                                self.status_label.config(
-                                    text=f"等待下次檢測... 剩餘 {remaining} 秒"
-                                )
-
-                            self.root.after(0, update_waiting)
-                        time.sleep(1)
-            except Exception as e:
-                self.log(f"監控迴圈錯誤: {e}")
-                time.sleep(30)
-
-        self.log("監控已停止。")
-        self.root.after(0, lambda: self.status_label.config(text="就緒"))
+                    if progress["speed"]:
+                        line += f"，{format_bytes(progress['speed'])}/s"
+                self.log(line)
 
 
 if __name__ == "__main__":
+    # 後製行程池在打包後的執行檔中需要
+    multiprocessing.freeze_support()
     try:
         root = tk.Tk()
         app = YTRecorderApp(root)
@@ -1031,6 +883,7 @@ if __name__ == "__main__":
             print("錯誤：無法啟動圖形介面 (No Display Found)")
             print("==============================")
             print("此程式為視窗應用程式，請在有桌面的 macOS 環境執行。")
+            print("無桌面環境請改用：python yt_recorder_daemon.py --config 設定檔.json")
             print("==============================\n")
         else:
             raise
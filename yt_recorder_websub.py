@@ -0,0 +1,395 @@
+"""
+WebSub（PubSubHubbub）推播接收。
+
+YouTube 頻道上傳新影片、建立預定直播或修改標題時，會透過 hub 把頻道
+feed 的更新推送到訂閱者的回呼網址。WebSubReceiver 在本機開一個 HTTP
+伺服器作為回呼，向 hub 訂閱各頻道的 feed，收到通知時呼叫 on_notify，
+讓排程器立刻檢測該頻道，而不必等下一次輪詢。
+
+推播不保證送達（直播開始本身也不一定會觸發通知），因此輪詢仍保留，
+只是在訂閱生效期間放慢。訂閱有租期，到期前由背景執行緒自動續訂。
+"""
+
+import hashlib
+import hmac
+import math
+import secrets
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from yt_recorder_http import HttpSession
+
+
+HUB_URL = "https://pubsubhubbub.appspot.com/subscribe"
+CALLBACK_PATH = "/websub"
+
+_ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_YT_NS = "{http://www.youtube.com/xml/schemas/2015}"
+
+
+def topic_url(channel_id: str) -> str:
+    """頻道 feed 在 hub 上的 topic。"""
+    return (
+        "https://www.youtube.com/xml/feeds/videos.xml?channel_id="
+        + urllib.parse.quote(channel_id)
+    )
+
+
+def channel_id_from_topic(topic: str) -> Optional[str]:
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(topic).query)
+    values = query.get("channel_id")
+    return values[0] if values else None
+
+
+def parse_notification(body: bytes) -> list[tuple[str, str]]:
+    """
+    從 hub 推送的 Atom 內容取出 [(channel ID, video ID), ...]。
+
+    影片被刪除時 hub 送的是 at:deleted-entry，不含 entry，回傳空清單。
+    """
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        return []
+    entries: list[tuple[str, str]] = []
+    for entry in root.iter(f"{_ATOM_NS}entry"):
+        channel_id = entry.findtext(f"{_YT_NS}channelId")
+        video_id = entry.findtext(f"{_YT_NS}videoId")
+        if channel_id and video_id:
+            entries.append((channel_id.strip(), video_id.strip()))
+    return entries
+
+
+def sign(secret: str, body: bytes) -> str:
+    """X-Hub-Signature 標頭的值（hub 以 HMAC-SHA1 簽署通知內容）。"""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+    return f"sha1={digest}"
+
+
+@dataclass
+class Subscription:
+    channel_id: str
+    # 已由 hub 驗證、仍在租期內
+    active: bool = False
+    # 租期到期時間（epoch 秒）
+    expires_at: Optional[float] = None
+    # 下次送出訂閱請求的時間（epoch 秒）
+    renew_at: float = 0.0
+    # 送出的訂閱請求等待 hub 驗證的期限（epoch 秒）；之外的驗證請求一律拒絕
+    pending_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+
+class WebSubReceiver:
+    """
+    WebSub 回呼伺服器與訂閱管理。
+
+    callback_url 是 hub 能連到的公開網址（通常經由反向代理或通道轉到
+    listen_host:listen_port 的 CALLBACK_PATH）。on_notify(channel_id,
+    video_id, received_at) 在伺服器執行緒上呼叫，只應做輕量處理；
+    on_state(channel_id, active) 在訂閱生效或失效時呼叫。
+    只接受以 secret 簽章正確的通知；沒有指定 secret 時自動產生一個隨機值
+    （重新啟動後隨訂閱請求換新）。超過 MAX_BODY 位元組的通知回應 413。
+    預設只監聽 127.0.0.1，由本機的反向代理或通道轉送。訂閱確認只在
+    送出訂閱請求後 RETRY_INTERVAL 秒內接受，避免任意請求讓訂閱看似生效。
+
+    close() 不會向 hub 取消訂閱，hub 在租期到期前仍會嘗試推送到原網址。
+    """
+
+    # 向 hub 要求的租期（秒）；hub 可能給較短的租期
+    LEASE_SECONDS = 5 * 86400
+    # 租期剩下這個比例時續訂
+    RENEW_MARGIN = 0.1
+    # 訂閱請求失敗或送出後遲遲沒有驗證時的重試間隔（秒）
+    RETRY_INTERVAL = 300
+    # 通知內容的大小上限（位元組）；hub 的 Atom 通知通常只有數 KB
+    MAX_BODY = 1 << 20
+    # 接受的租期下限（秒）；上限為 LEASE_SECONDS
+    MIN_LEASE_SECONDS = 60
+
+    def __init__(
+        self,
+        callback_url: str,
+        on_notify: Callable[[str, str, float], None],
+        listen_host: str = "127.0.0.1",
+        listen_port: int = 8765,
+        hub_url: str = HUB_URL,
+        secret: Optional[str] = None,
+        on_state: Optional[Callable[[str, bool], None]] = None,
+        session: Optional[HttpSession] = None,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.callback_url = callback_url
+        self.on_notify = on_notify
+        self.hub_url = hub_url
+        self.secret = secret or secrets.token_hex(20)
+        self.on_state = on_state
+        self.session = session or HttpSession()
+        self.log = log
+
+        self._lock = threading.Lock()
+        self._subscriptions: dict[str, Subscription] = {}
+        self._wakeup = threading.Event()
+        self._stopping = False
+
+        self.notifications = 0
+        self.bad_signatures = 0
+        self.oversized = 0
+        self.verifications = 0
+        self.rejected_verifications = 0
+
+        self._server = ThreadingHTTPServer(
+            (listen_host, listen_port), self._handler_class()
+        )
+        self._server.daemon_threads = True
+        self.listen_port = self._server.server_address[1]
+        self._server_thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="websub-server",
+            daemon=True,
+        )
+        self._renew_thread = threading.Thread(
+            target=self._renew_loop, name="websub-renew", daemon=True
+        )
+        self._server_thread.start()
+        self._renew_thread.start()
+
+    # ------------------------------------------------------------------
+    # 訂閱管理（可從任意執行緒呼叫）
+    # ------------------------------------------------------------------
+
+    def subscribe(self, channel_id: str) -> None:
+        """加入要訂閱的頻道；實際的訂閱請求由背景執行緒送出。"""
+        with self._lock:
+            if channel_id in self._subscriptions:
+                return
+            self._subscriptions[channel_id] = Subscription(channel_id)
+        self._wakeup.set()
+
+    def is_active(self, channel_id: str) -> bool:
+        with self._lock:
+            sub = self._subscriptions.get(channel_id)
+            return bool(sub and sub.active)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            subs = list(self._subscriptions.values())
+        return {
+            "channels": len(subs),
+            "active": sum(1 for s in subs if s.active),
+            "requests": sum(s.requests for s in subs),
+            "failures": sum(s.failures for s in subs),
+            "verifications": self.verifications,
+            "rejected_verifications": self.rejected_verifications,
+            "notifications": self.notifications,
+            "bad_signatures": self.bad_signatures,
+            "oversized": self.oversized,
+        }
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        self._server.shutdown()
+        self._server.server_close()
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # 送出訂閱請求與續訂
+    # ------------------------------------------------------------------
+
+    def _renew_loop(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            now = time.time()
+            due: list[str] = []
+            expired: list[str] = []
+            with self._lock:
+                for sub in self._subscriptions.values():
+                    if sub.active and sub.expires_at and sub.expires_at <= now:
+                        sub.active = False
+                        expired.append(sub.channel_id)
+                    if sub.renew_at <= now:
+                        # 沒有驗證回來時 RETRY_INTERVAL 後再送一次
+                        sub.renew_at = now + self.RETRY_INTERVAL
+                        due.append(sub.channel_id)
+                next_at = min(
+                    (s.renew_at for s in self._subscriptions.values()),
+                    default=now + self.RETRY_INTERVAL,
+                )
+
+            for channel_id in expired:
+                self.log(f"WebSub 訂閱已過期，恢復一般輪詢: {channel_id}")
+                self._notify_state(channel_id, False)
+            for channel_id in due:
+                if self._stopping:
+                    return
+                self._send_subscribe(channel_id)
+
+            self._wakeup.wait(max(1.0, next_at - time.time()))
+
+    def _send_subscribe(self, channel_id: str) -> None:
+        form = {
+            "hub.callback": self.callback_url,
+            "hub.topic": topic_url(channel_id),
+            "hub.mode": "subscribe",
+            "hub.verify": "async",
+            "hub.lease_seconds": str(self.LEASE_SECONDS),
+            "hub.secret": self.secret,
+        }
+        body = urllib.parse.urlencode(form).encode("ascii")
+        # hub 可能在回應之前就來驗證，先標記為等待驗證
+        with self._lock:
+            sub = self._subscriptions.get(channel_id)
+            if sub is None:
+                return
+            sub.pending_until = time.time() + self.RETRY_INTERVAL
+        try:
+            status, _, response = self.session.request(
+                self.hub_url,
+                {"Content-Type": "application/x-www-form-urlencoded"},
+                method="POST",
+                body=body,
+            )
+            error = None if 200 <= status < 300 else f"HTTP {status}"
+        except OSError as e:
+            error = str(e)
+            response = b""
+        with self._lock:
+            sub = self._subscriptions.get(channel_id)
+            if sub is None:
+                return
+            sub.requests += 1
+            if error:
+                sub.failures += 1
+                sub.pending_until = 0.0
+        if error:
+            detail = response.decode("utf-8", errors="replace").strip()[:100]
+            self.log(f"WebSub 訂閱請求失敗 ({channel_id}): {error} {detail}")
+
+    def _notify_state(self, channel_id: str, active: bool) -> None:
+        if self.on_state is None:
+            return
+        try:
+            self.on_state(channel_id, active)
+        except Exception as e:
+            self.log(f"WebSub 狀態回呼錯誤: {e}")
+
+    # ------------------------------------------------------------------
+    # 回呼伺服器
+    # ------------------------------------------------------------------
+
+    def _verify_intent(self, query: dict[str, list[str]]) -> Optional[str]:
+        """
+        hub 的訂閱確認：是我們要的 topic、且該頻道有等待驗證的訂閱請求時
+        回傳 challenge。租期限制在 MIN_LEASE_SECONDS–LEASE_SECONDS。
+        """
+        mode = (query.get("hub.mode") or [""])[0]
+        topic = (query.get("hub.topic") or [""])[0]
+        challenge = (query.get("hub.challenge") or [None])[0]
+        channel_id = channel_id_from_topic(topic)
+        if challenge is None or channel_id is None:
+            return None
+
+        with self._lock:
+            sub = self._subscriptions.get(channel_id)
+            if mode == "unsubscribe":
+                return challenge if sub is None else None
+            if mode != "subscribe" or sub is None:
+                return None
+            now = time.time()
+            raw_lease = (query.get("hub.lease_seconds") or [""])[0]
+            try:
+                lease = float(raw_lease or self.LEASE_SECONDS)
+            except ValueError:
+                lease = math.nan
+            if now > sub.pending_until or not math.isfinite(lease):
+                self.rejected_verifications += 1
+                return None
+            lease = min(max(lease, self.MIN_LEASE_SECONDS), self.LEASE_SECONDS)
+            sub.pending_until = 0.0
+            newly_active = not sub.active
+            sub.active = True
+            sub.expires_at = now + lease
+            sub.renew_at = now + lease * (1 - self.RENEW_MARGIN)
+            self.verifications += 1
+        self._wakeup.set()
+        if newly_active:
+            self.log(
+                f"WebSub 訂閱生效（租期 {lease / 3600:.0f} 小時）: {channel_id}"
+            )
+            self._notify_state(channel_id, True)
+        return challenge
+
+    def _receive(self, body: bytes, signature: Optional[str]) -> None:
+        received_at = time.time()
+        if not (
+            signature and hmac.compare_digest(sign(self.secret, body), signature)
+        ):
+            # 規範要求簽章錯誤時仍回 2xx，但忽略內容
+            self.bad_signatures += 1
+            return
+        self.notifications += 1
+        for channel_id, video_id in parse_notification(body):
+            try:
+                self.on_notify(channel_id, video_id, received_at)
+            except Exception as e:
+                self.log(f"處理 WebSub 通知錯誤 ({channel_id}): {e}")
+
+    def _handler_class(self) -> type:
+        receiver = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                parts = urllib.parse.urlsplit(self.path)
+                challenge = None
+                if parts.path == CALLBACK_PATH:
+                    challenge = receiver._verify_intent(
+                        urllib.parse.parse_qs(parts.query)
+                    )
+                if challenge is None:
+                    self._reply(404)
+                else:
+                    self._reply(200, challenge.encode("utf-8"))
+
+            def do_POST(self) -> None:
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= receiver.MAX_BODY:
+                    # 不讀取內容，回應後關閉連線
+                    if length > receiver.MAX_BODY:
+                        receiver.oversized += 1
+                    self.close_connection = True
+                    self._reply(413 if length > 0 else 400)
+                    return
+                body = self.rfile.read(length) if length else b""
+                if urllib.parse.urlsplit(self.path).path != CALLBACK_PATH:
+                    self._reply(404)
+                    return
+                receiver._receive(body, self.headers.get("X-Hub-Signature"))
+                self._reply(204)
+
+            def _reply(self, status: int, body: bytes = b"") -> None:
+                self.send_response(status)
+                if status != 204:
+                    self.send_header("Content-Type", "text/plain")
+                    self.send_header("Content-Length", str(len(body)))
+                if self.close_connection:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return _Handler
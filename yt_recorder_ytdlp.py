@@ -0,0 +1,994 @@
+"""
+yt-dlp 共用工具：執行檔路徑、共用參數、Cookie 快取、yt-dlp 快取資料夾、
+常駐的 yt-dlp worker 池，以及擷取結果的短期快取。
+
+worker 池中的每個 worker 是一個長駐的 Python 子行程，只 import 一次
+yt_dlp，並重複使用同一個 YoutubeDL 物件（extractor 與 Cookie 只載入一次），
+透過 stdin/stdout 的 JSON 行協定接收 extract 工作。
+無法使用時（找不到 yt_dlp 模組、打包後的執行檔等）由呼叫端改走
+原本每次啟動 yt-dlp 子行程的方式。
+"""
+
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+# User-Agent / Referer 及 403 workaround
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/121.0.0.0 Safari/537.36"
+)
+REFERER = "https://www.youtube.com/"
+
+# yt-dlp extractor 403 workaround
+EXTRACTOR_ARGS = (
+    "youtube:player_client=default,web_safari;player_js_version=actual"
+)
+
+
+def find_ytdlp_executable() -> Optional[str]:
+    """
+    取得可用的 yt-dlp 執行檔路徑。
+
+    優先順序：
+    1. 打包後 .app 內的 yt-dlp
+    2. 與此 .py 同目錄的 yt-dlp
+    3. 系統 PATH 內的 yt-dlp
+    """
+    candidates: list[str] = []
+
+    # 1) 打包後 (.app / PyInstaller frozen)
+    try:
+        if getattr(sys, "frozen", False):
+            exe_dir = os.path.dirname(sys.executable)
+            # PyInstaller --add-binary "yt-dlp_macos:yt-dlp"
+            candidates.append(os.path.join(exe_dir, "yt-dlp"))
+
+            # 備用：.app/Contents/Resources/yt-dlp
+            app_exec = Path(sys.executable).resolve()
+            resources_path = app_exec.parents[1] / "Resources" / "yt-dlp"
+            candidates.append(str(resources_path))
+    except Exception:
+        pass
+
+    # 2) 開發模式：同目錄 yt-dlp
+    try:
+        script_dir = Path(__file__).resolve().parent
+        candidates.append(str(script_dir / "yt-dlp"))
+    except Exception:
+        pass
+
+    # 3) 系統 PATH
+    path_exe = shutil.which("yt-dlp")
+    if path_exe:
+        candidates.append(path_exe)
+
+    for p in candidates:
+        if p and os.path.exists(p) and os.access(p, os.X_OK):
+            return p
+
+    return None
+
+
+def find_ffmpeg_executable(name: str = "ffmpeg") -> Optional[str]:
+    """
+    取得 ffmpeg（或同套件的 ffprobe）執行檔路徑：與 yt-dlp 同目錄者優先，
+    其次是系統 PATH。
+    """
+    ytdlp = find_ytdlp_executable()
+    if ytdlp:
+        for filename in (name, f"{name}.exe"):
+            candidate = os.path.join(os.path.dirname(ytdlp), filename)
+            if os.path.exists(candidate) and os.access(candidate, os.X_OK):
+                return candidate
+    return shutil.which(name)
+
+
+def default_cache_root() -> str:
+    """本程式的快取根目錄（Cookie 匯出檔等）。"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "yt_recorder")
+
+
+def base_ytdlp_args(
+    cookies_from_browser: str,
+    cookie_file: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> list[str]:
+    """
+    所有 yt-dlp 呼叫共用的 Anti-403 + Cookie 參數。
+
+    有 cookie_file（CookieCache 匯出的 cookies.txt）時直接使用，
+    否則每次由瀏覽器讀取 Cookie。
+    有 cache_dir（YtdlpCacheDir 管理的資料夾）時讓 yt-dlp 快取 player JS
+    與簽章函式，否則維持 --no-cache-dir。
+    """
+    if cookie_file:
+        cookie_args = ["--cookies", cookie_file]
+    else:
+        cookie_args = ["--cookies-from-browser", cookies_from_browser]
+    if cache_dir:
+        cache_args = ["--cache-dir", cache_dir]
+    else:
+        cache_args = ["--no-cache-dir"]
+    return [
+        "--ignore-config",
+        *cache_args,
+        *cookie_args,
+        "--user-agent",
+        USER_AGENT,
+        "--referer",
+        REFERER,
+        "--extractor-args",
+        EXTRACTOR_ARGS,
+        "--remote-components",
+        "ejs:github",
+    ]
+
+
+def info_expires_at(info: dict[str, Any]) -> Optional[float]:
+    """
+    info dict 中最早過期的 googlevideo 網址時間（epoch 秒）。
+
+    YouTube 的 manifest / 串流網址都帶有 expire 參數
+    （.../expire/1700000000/... 或 ?expire=1700000000）；找不到時回傳 None。
+    """
+    pattern = re.compile(r"[/?&]expire[/=](\d+)")
+    expiries: list[float] = []
+    for fmt in info.get("formats") or []:
+        for key in ("url", "manifest_url"):
+            match = pattern.search(str(fmt.get(key) or ""))
+            if match:
+                expiries.append(float(match.group(1)))
+    return min(expiries) if expiries else None
+
+
+def probe_info_is_fresh(
+    info: dict[str, Any],
+    fetched_at: float,
+    margin: float = 600,
+    max_age: float = 300,
+) -> bool:
+    """
+    檢測時取得的 info 是否還能直接交給錄製使用。
+
+    網址距離過期不到 margin 秒就視為失效；沒有 expire 資訊時
+    只接受 max_age 秒內取得的 info。
+    """
+    if not info.get("formats"):
+        return False
+    now = time.time()
+    expires = info_expires_at(info)
+    if expires is None:
+        return now - fetched_at <= max_age
+    return expires - now > margin
+
+
+# ----------------------------------------------------------------------
+# Cookie 快取
+# ----------------------------------------------------------------------
+
+# Chromium 系瀏覽器的使用者資料夾（相對於家目錄）
+_CHROMIUM_DIRS = {
+    "darwin": {
+        "chrome": "Library/Application Support/Google/Chrome",
+        "chromium": "Library/Application Support/Chromium",
+        "brave": "Library/Application Support/BraveSoftware/Brave-Browser",
+        "edge": "Library/Application Support/Microsoft Edge",
+    },
+    "linux": {
+        "chrome": ".config/google-chrome",
+        "chromium": ".config/chromium",
+        "brave": ".config/BraveSoftware/Brave-Browser",
+        "edge": ".config/microsoft-edge",
+    },
+}
+
+# 出現這些訊息代表 Cookie 已失效，需要重新匯出
+_AUTH_FAILURE_MARKERS = (
+    "sign in to confirm",
+    "cookies are no longer valid",
+    "login required",
+    "http error 401",
+)
+
+
+def is_auth_failure(stderr: str) -> bool:
+    lower = stderr.lower()
+    return any(marker in lower for marker in _AUTH_FAILURE_MARKERS)
+
+
+def parse_browser_spec(
+    spec: str,
+) -> tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """拆解 yt-dlp 的 BROWSER[+KEYRING][:PROFILE][::CONTAINER] 格式。"""
+    container = None
+    if "::" in spec:
+        spec, container = spec.split("::", 1)
+    profile = None
+    if ":" in spec:
+        spec, profile = spec.split(":", 1)
+    keyring = None
+    if "+" in spec:
+        spec, keyring = spec.split("+", 1)
+    return spec.lower(), keyring, profile or None, container or None
+
+
+class CookieCache:
+    """
+    將瀏覽器 Cookie 匯出一次成 Netscape cookies.txt，供所有 yt-dlp 呼叫共用。
+
+    以下情況會重新匯出：
+    - 瀏覽器 Cookie 資料庫的修改時間改變
+    - 超過 ttl 秒
+    - 呼叫端回報驗證失敗（report_failure）
+
+    每次匯出寫到新的檔名，舊檔保留一份給仍在執行中的行程使用；
+    檔名改變也讓 worker 池建立新的 YoutubeDL 重新載入 Cookie。
+    匯出失敗時 cookie_file() 回傳 None，呼叫端改用 --cookies-from-browser。
+    """
+
+    # 兩次因驗證失敗而重新匯出之間的最短間隔，避免連續失敗時反覆解密
+    MIN_REEXPORT_INTERVAL = 60.0
+    # 子行程匯出時使用的公開影片
+    EXPORT_PROBE_URL = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+
+    def __init__(
+        self,
+        browser_spec: str,
+        cache_dir: Optional[str] = None,
+        ttl: float = 6 * 3600,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.browser_spec = browser_spec
+        self.cache_dir = cache_dir or os.path.join(
+            default_cache_root(), "cookies"
+        )
+        self.ttl = ttl
+        self.log = log
+
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._exported_at = 0.0
+        self._source_mtime: Optional[float] = None
+        self._last_failed_export = 0.0
+
+        # 統計：exports 即解密瀏覽器 Cookie 資料庫的次數
+        self.exports = 0
+        self.export_failures = 0
+        self.hits = 0
+        self.invalidations = 0
+        self.last_export_seconds = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "exports": self.exports,
+            "export_failures": self.export_failures,
+            "hits": self.hits,
+            "invalidations": self.invalidations,
+            "last_export_seconds": round(self.last_export_seconds, 3),
+        }
+
+    def source_db_path(self) -> Optional[str]:
+        """瀏覽器 Cookie 資料庫路徑（目前只支援 Chromium 系，其餘回傳 None）。"""
+        browser, _, profile, _ = parse_browser_spec(self.browser_spec)
+        platform = "darwin" if sys.platform == "darwin" else "linux"
+        rel = _CHROMIUM_DIRS.get(platform, {}).get(browser)
+        if rel is None:
+            return None
+        if profile and os.path.isabs(profile):
+            profile_dir = Path(profile)
+        else:
+            profile_dir = Path.home() / rel / (profile or "Default")
+        for candidate in (
+            profile_dir / "Network" / "Cookies",
+            profile_dir / "Cookies",
+        ):
+            if candidate.exists():
+                return str(candidate)
+        return None
+
+    def _source_mtime_now(self) -> Optional[float]:
+        path = self.source_db_path()
+        if path is None:
+            return None
+        try:
+            mtimes = [os.path.getmtime(path)]
+            journal = path + "-journal"
+            if os.path.exists(journal):
+                mtimes.append(os.path.getmtime(journal))
+            return max(mtimes)
+        except OSError:
+            return None
+
+    def _is_fresh(self) -> bool:
+        if self._path is None or not os.path.exists(self._path):
+            return False
+        if time.time() - self._exported_at > self.ttl:
+            return False
+        mtime = self._source_mtime_now()
+        if mtime is not None and mtime != self._source_mtime:
+            return False
+        return True
+
+    def cookie_file(self) -> Optional[str]:
+        """回傳有效的 cookies.txt 路徑，必要時重新匯出；失敗回傳 None。"""
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._path
+            # 匯出剛失敗過就先不重試，直接讓呼叫端改用瀏覽器 Cookie
+            since_failure = time.time() - self._last_failed_export
+            if since_failure < self.MIN_REEXPORT_INTERVAL:
+                return None
+            return self._export()
+
+    def invalidate(self, reason: str = "") -> None:
+        with self._lock:
+            if self._path is None:
+                return
+            if time.time() - self._exported_at < self.MIN_REEXPORT_INTERVAL:
+                return
+            self._path = None
+            self.invalidations += 1
+        suffix = f" ({reason})" if reason else ""
+        self.log(f"Cookie 快取已失效，下次呼叫將重新匯出{suffix}")
+
+    def report_failure(self, stderr: str) -> None:
+        """呼叫端在 yt-dlp 失敗時呼叫；若為驗證失敗則讓快取失效。"""
+        if is_auth_failure(stderr):
+            self.invalidate("驗證失敗")
+
+    def _export(self) -> Optional[str]:
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        source_mtime = self._source_mtime_now()
+        path = os.path.join(
+            self.cache_dir, f"cookies-{int(time.time() * 1000)}.txt"
+        )
+        tmp = path + ".tmp"
+
+        start = time.perf_counter()
+        try:
+            if not self._export_in_process(tmp):
+                self._export_with_ytdlp(tmp)
+            if not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+                raise RuntimeError("匯出的 Cookie 檔為空")
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, path)
+        except Exception as e:
+            self.export_failures += 1
+            self._last_failed_export = time.time()
+            self.log(f"Cookie 匯出失敗，改用 --cookies-from-browser: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return None
+
+        self.last_export_seconds = time.perf_counter() - start
+        self.exports += 1
+        self._path = path
+        self._exported_at = time.time()
+        self._source_mtime = source_mtime
+        self.log(
+            f"已匯出瀏覽器 Cookie（第 {self.exports} 次，"
+            f"耗時 {self.last_export_seconds:.1f} 秒）"
+        )
+        self._cleanup(keep=path)
+        return path
+
+    def _export_in_process(self, dest: str) -> bool:
+        """本行程可 import yt_dlp 時直接解密匯出；否則回傳 False。"""
+        try:
+            from yt_dlp.cookies import extract_cookies_from_browser
+        except Exception:
+            return False
+        browser, keyring, profile, container = parse_browser_spec(
+            self.browser_spec
+        )
+        jar = extract_cookies_from_browser(
+            browser, profile, keyring=keyring, container=container
+        )
+        jar.save(dest, ignore_discard=True, ignore_expires=True)
+        return True
+
+    def _export_with_ytdlp(self, dest: str) -> None:
+        """
+        以 yt-dlp 子行程匯出。
+
+        同時指定 --cookies-from-browser 與 --cookies 時，yt-dlp 結束前會把
+        讀到的 Cookie 寫入 --cookies 指定的檔案。
+        """
+        exe = find_ytdlp_executable()
+        if not exe:
+            raise FileNotFoundError("yt-dlp executable not found")
+        subprocess.run(
+            [
+                exe,
+                "--ignore-config",
+                "--cookies-from-browser",
+                self.browser_spec,
+                "--cookies",
+                dest,
+                "--skip-download",
+                "--print",
+                "id",
+                self.EXPORT_PROBE_URL,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=120,
+        )
+
+    def _cleanup(self, keep: str) -> None:
+        """保留最新兩份匯出檔，其餘刪除。"""
+        try:
+            files = sorted(
+                (
+                    os.path.join(self.cache_dir, name)
+                    for name in os.listdir(self.cache_dir)
+                    if name.startswith("cookies-") and name.endswith(".txt")
+                ),
+                key=os.path.getmtime,
+            )
+        except OSError:
+            return
+        for old in files[:-2]:
+            if old != keep:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+# ----------------------------------------------------------------------
+# yt-dlp 快取資料夾
+# ----------------------------------------------------------------------
+
+# 過期的 player JS / 簽章快取造成的錯誤；出現在 ERROR 行時清除快取重試。
+# 同樣的字樣（以及 "Some formats may be missing"）以 WARNING 出現在
+# 成功的執行中很常見，不能據此清除
+_CACHE_SUSPECT_MARKERS = (
+    "http error 403",
+    "signature extraction failed",
+    "nsig extraction failed",
+    "unable to extract nsig",
+)
+
+
+class YtdlpCacheDir:
+    """
+    管理 yt-dlp 的 --cache-dir：限制總大小、依修改時間淘汰舊檔，
+    並在疑似快取造成的 403 時整個清除。
+
+    命中 / 未命中以每次呼叫後快取內容是否有新增或改動來判斷：
+    沒有變化代表 player JS 與簽章函式都直接取自快取。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.path = path or os.path.join(default_cache_root(), "ytdlp")
+        self.max_bytes = max_bytes
+        self.log = log
+
+        self._lock = threading.Lock()
+        self._known: Optional[dict[str, float]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.purges = 0
+        self.evictions = 0
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "purges": self.purges,
+            "evictions": self.evictions,
+        }
+
+    def _scan(self) -> dict[str, tuple[float, int]]:
+        files: dict[str, tuple[float, int]] = {}
+        for dirpath, _, filenames in os.walk(self.path):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                files[full] = (st.st_mtime, st.st_size)
+        return files
+
+    def observe(self) -> None:
+        """每次 yt-dlp 呼叫結束後呼叫：統計命中並維持大小上限。"""
+        with self._lock:
+            files = self._scan()
+            current = {path: mtime for path, (mtime, _) in files.items()}
+            if self._known is not None:
+                changed = any(
+                    self._known.get(path) != mtime
+                    for path, mtime in current.items()
+                )
+                if changed:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            self._known = current
+            self._enforce_limit(files)
+
+    def _enforce_limit(self, files: dict[str, tuple[float, int]]) -> None:
+        total = sum(size for _, size in files.values())
+        if total <= self.max_bytes:
+            return
+        for path, (_, size) in sorted(files.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+            if self._known is not None:
+                self._known.pop(path, None)
+
+    def should_purge(self, stderr: str) -> bool:
+        """
+        yt-dlp 的 ERROR 行看起來與過期快取有關（403 或簽章解析失敗）。
+        WARNING 等其他行不列入判斷。
+        """
+        for line in stderr.splitlines():
+            line = line.strip()
+            if not line.startswith("ERROR:"):
+                continue
+            lower = line.lower()
+            if any(marker in lower for marker in _CACHE_SUSPECT_MARKERS):
+                return True
+        return False
+
+    def purge(self, reason: str = "") -> None:
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+            self._known = None
+            self.purges += 1
+        suffix = f" ({reason})" if reason else ""
+        self.log(f"已清除 yt-dlp 快取{suffix}")
+
+
+# ----------------------------------------------------------------------
+# 常駐 worker 池
+# ----------------------------------------------------------------------
+
+
+def extract_batch_subprocess(
+    exe: str, args: list[str], urls: list[str], timeout: float
+) -> dict[str, Any]:
+    """
+    以一個 yt-dlp 子行程擷取多個網址（--dump-json --ignore-errors）。
+
+    yt-dlp 依序處理網址，每個網址輸出一行 JSON 或一行 ERROR；stderr 併入
+    stdout 以保持順序。JSON 依 original_url 對應回網址，ERROR 分給目前
+    順序上的下一個網址。回傳 {網址: info dict 或 ExtractionError}。
+    逾時丟 subprocess.TimeoutExpired。
+    """
+    result = subprocess.run(
+        [exe] + args + ["--dump-json", "--ignore-errors", "--"] + urls,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        timeout=timeout,
+    )
+    results: dict[str, Any] = {}
+    index = {url: i for i, url in enumerate(urls)}
+    position = 0
+    for line in result.stdout.splitlines():
+        if line.startswith("{"):
+            try:
+                info = json.loads(line)
+            except ValueError:
+                continue
+            i = index.get(info.get("original_url"), position)
+            if i < len(urls) and urls[i] not in results:
+                results[urls[i]] = info
+            position = max(position, i + 1)
+        elif line.startswith("ERROR:") and position < len(urls):
+            results[urls[position]] = ExtractionError(line)
+            position += 1
+    for url in urls:
+        results.setdefault(url, ExtractionError("yt-dlp 沒有輸出結果"))
+    return results
+
+
+class WorkerError(Exception):
+    """worker 本身失敗（無法啟動、逾時、中途結束），呼叫端應改走子行程。"""
+
+
+class ExtractionError(Exception):
+    """yt-dlp 回報的擷取錯誤，訊息內容等同子行程的 stderr。"""
+
+
+class ExtractionCancelled(Exception):
+    """停止監控時放棄等待限流的 token，擷取沒有執行。"""
+
+
+class _Worker:
+    """
+    一個 worker 子行程。stdout 由專用執行緒逐行讀入佇列，receive() 以
+    佇列的 timeout 等待回覆：回覆可能是數 MB 的一行 JSON，worker 也可能
+    寫到一半卡住，直接 readline() 會無視逾時；Windows 的管線也不能 select。
+    """
+
+    def __init__(self, python: str, generation: int) -> None:
+        self.process = subprocess.Popen(
+            [python, "-u", os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.jobs = 0
+        self.generation = generation
+        # 讀到的每一行；None 表示 stdout 已結束
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(
+            target=self._read_stdout, name="ytdlp-worker-reader", daemon=True
+        ).start()
+
+    def _read_stdout(self) -> None:
+        assert self.process.stdout is not None
+        try:
+            for line in self.process.stdout:
+                self._lines.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._lines.put(None)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, message: dict) -> None:
+        assert self.process.stdin is not None
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def receive(self, timeout: float) -> dict:
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError("worker 回應逾時")
+        if line is None:
+            raise WorkerError("worker 已結束")
+        return json.loads(line)
+
+    def close(self) -> None:
+        if self.alive():
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+
+
+class YtdlpWorkerPool:
+    """
+    固定大小的 yt-dlp worker 池。
+
+    extract() 是阻塞呼叫，可由多個執行緒同時使用；同時進行的工作數量
+    不超過 size。每個 worker 處理 max_jobs 個工作後重新啟動，避免記憶體
+    無限增長。
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        python: Optional[str] = None,
+        max_jobs: int = 200,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.size = max(1, int(size))
+        self.python = python or sys.executable
+        self.max_jobs = max_jobs
+        self.log = log
+
+        self._idle: "queue.LifoQueue[Optional[_Worker]]" = queue.LifoQueue()
+        for _ in range(self.size):
+            # None 代表尚未啟動的名額，第一次使用時才建立 worker
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self._disabled_reason: Optional[str] = None
+        if getattr(sys, "frozen", False):
+            self._disabled_reason = "打包後的執行檔不支援 worker 池"
+
+        self._generation = 0
+
+        self.jobs_done = 0
+        self.restarts = 0
+
+    @property
+    def available(self) -> bool:
+        return self._disabled_reason is None
+
+    def _disable(self, reason: str) -> None:
+        with self._lock:
+            if self._disabled_reason is None:
+                self._disabled_reason = reason
+                self.log(f"yt-dlp worker 池停用，改用子行程模式: {reason}")
+
+    def recycle(self) -> None:
+        """讓所有 worker 在下次使用前重新啟動（例如清除 yt-dlp 快取後）。"""
+        with self._lock:
+            self._generation += 1
+
+    def _spawn(self, timeout: float) -> _Worker:
+        worker = _Worker(self.python, self._generation)
+        try:
+            hello = worker.receive(timeout)
+        except (WorkerError, ValueError) as e:
+            worker.close()
+            raise WorkerError(f"worker 啟動失敗: {e}")
+        if not hello.get("ready"):
+            worker.close()
+            self._disable(hello.get("error", "未知原因"))
+            raise WorkerError(hello.get("error", "worker 無法使用"))
+        return worker
+
+    def extract(
+        self, args: list[str], url: str, timeout: float = 60
+    ) -> dict[str, Any]:
+        """
+        以 worker 執行 extract_info(download=False)，回傳 info dict。
+
+        yt-dlp 擷取失敗時丟 ExtractionError；worker 問題丟 WorkerError。
+        """
+        reply = self._request(
+            {"op": "extract", "args": args, "url": url}, timeout
+        )
+        if not reply.get("ok"):
+            raise ExtractionError(reply.get("error", ""))
+        return reply["info"]
+
+    def _request(self, message: dict, timeout: float) -> dict:
+        """取得閒置的 worker 送出一個工作並等待回覆。"""
+        if not self.available:
+            raise WorkerError(self._disabled_reason or "worker 池已停用")
+
+        worker = self._idle.get()
+        if worker is not None and worker.generation != self._generation:
+            worker.close()
+            worker = None
+        try:
+            if worker is None or not worker.alive():
+                worker = self._spawn(timeout)
+            worker.send(message)
+            reply = worker.receive(timeout)
+        except (WorkerError, OSError, ValueError) as e:
+            if worker is not None:
+                worker.process.kill()
+            self._idle.put(None)
+            raise WorkerError(str(e))
+
+        worker.jobs += 1
+        with self._lock:
+            self.jobs_done += 1
+        if worker.jobs >= self.max_jobs:
+            worker.close()
+            with self._lock:
+                self.restarts += 1
+            worker = None
+        self._idle.put(worker)
+        return reply
+
+    def extract_batch(
+        self, args: list[str], urls: list[str], timeout: float = 60
+    ) -> dict[str, Any]:
+        """
+        以同一個 worker、一次往返依序擷取多個網址。
+
+        回傳 {網址: info dict 或 ExtractionError}；timeout 為整批的上限。
+        worker 問題丟 WorkerError。
+        """
+        reply = self._request(
+            {"op": "extract_batch", "args": args, "urls": urls}, timeout
+        )
+        if not reply.get("ok"):
+            error = reply.get("error", "")
+            return {url: ExtractionError(error) for url in urls}
+        results: dict[str, Any] = {}
+        for url, item in zip(urls, reply.get("results") or []):
+            if item.get("ok"):
+                results[url] = item["info"]
+            else:
+                results[url] = ExtractionError(item.get("error", ""))
+        for url in urls:
+            results.setdefault(url, ExtractionError("worker 沒有回傳結果"))
+        return results
+
+    def close(self) -> None:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+class ExtractCache:
+    """
+    擷取結果的短期快取與 single-flight 合併。
+
+    get(key, extract) 在 ttl 秒內重複擷取同一個 key 時直接回傳上次的結果；
+    同一個 key 正在擷取時，後到的呼叫等待同一次擷取的結果（或例外），
+    不另外啟動 yt-dlp。只快取成功的結果。回傳的 info dict 由所有呼叫端
+    共用，不可修改。
+    """
+
+    MAX_ENTRIES = 256
+
+    def __init__(self, ttl: float = 10.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, dict[str, Any]]] = {}
+        self._inflight: dict[tuple, Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(
+        self, key: tuple, extract: Callable[[], dict[str, Any]]
+    ) -> dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            info = extract()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self.ttl > 0:
+                self._store(key, info)
+        future.set_result(info)
+        return info
+
+    def put(self, key: tuple, info: dict[str, Any]) -> None:
+        """放入從其他途徑（例如批次擷取）取得的結果。"""
+        if self.ttl > 0:
+            with self._lock:
+                self._store(key, info)
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """丟掉 url 的快取（key 第一個元素為 url）；不指定時全部丟掉。"""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k and k[0] == url]:
+                del self._entries[key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+            }
+
+    def _store(self, key: tuple, info: dict[str, Any]) -> None:
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now, info)
+        if len(self._entries) > self.MAX_ENTRIES:
+            for old in [
+                k for k, (at, _) in self._entries.items() if now - at >= self.ttl
+            ]:
+                del self._entries[old]
+            while len(self._entries) > self.MAX_ENTRIES:
+                # dict 依插入順序，最早的在前
+                del self._entries[next(iter(self._entries))]
+
+
+# ----------------------------------------------------------------------
+# worker 行程端
+# ----------------------------------------------------------------------
+
+
+def _worker_main() -> None:
+    # stdout 只保留給協定使用；yt-dlp 的任何輸出都導向 stderr
+    proto = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def reply(message: dict) -> None:
+        proto.write(json.dumps(message, default=str) + "\n")
+
+    try:
+        import yt_dlp
+    except Exception as e:
+        reply({"ready": False, "error": f"無法載入 yt_dlp: {e}"})
+        return
+
+    reply({"ready": True, "version": yt_dlp.version.__version__})
+
+    # 相同參數共用同一個 YoutubeDL（Cookie 只解密一次）；
+    # Cookie 匯出檔更新後參數會改變，舊的實例依建立順序淘汰
+    instances: dict[tuple, Any] = {}
+    max_instances = 4
+
+    def extract(ydl: Any, url: str) -> dict:
+        try:
+            info = ydl.extract_info(url, download=False)
+            return {"ok": True, "info": ydl.sanitize_info(info)}
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            return {"ok": False, "error": str(e)}
+
+    for line in sys.stdin:
+        try:
+            job = json.loads(line)
+            key = tuple(job["args"])
+            ydl = instances.get(key)
+            if ydl is None:
+                opts = yt_dlp.parse_options(job["args"]).ydl_opts
+                opts.update(quiet=True, noprogress=True, skip_download=True)
+                ydl = yt_dlp.YoutubeDL(opts)
+                instances[key] = ydl
+                while len(instances) > max_instances:
+                    instances.pop(next(iter(instances)))
+            if job.get("op") == "extract_batch":
+                # 單一網址失敗不影響同批的其他網址
+                results = [extract(ydl, url) for url in job["urls"]]
+                reply({"ok": True, "results": results})
+            else:
+                reply(extract(ydl, job["url"]))
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                break
+            reply({"ok": False, "error": str(e)})
+
+
+if __name__ == "__main__" and "--worker" in sys.argv:
+    _worker_main()